@@ -0,0 +1,406 @@
+# Benchmarks for the File Organizer backend
+# Run from the repository root: python main/benchmark.py --help
+# The suite times the hot paths on seeded synthetic catalogues and can
+# save its results as JSON to compare against a later run
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from time import perf_counter_ns
+
+from file_organizer import FileHashTable, FileOrganizer, HASH_FUNCTIONS
+
+# tree_module is a package at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tree_module.tree_module import FileSystemTree
+
+
+SCALES = (10**3, 10**4, 10**5)  # add 1e6 with --sizes, it takes a while
+OP_SAMPLE = 5000  # deletes and folder lookups timed per run
+QUERY_COUNT = 10  # substring searches per run (each walks the whole tree)
+REHASH_REPEATS = 5
+
+
+# Filename generators (seeded so runs are comparable)
+def camera_names(count, rng):
+    """IMG_0001.jpg, DSC_0002.JPG, ... as cameras name them"""
+    prefixes = ["IMG_", "DSC_", "DSCN", "PXL_2023"]
+    names = []
+    for i in range(count):
+        prefix = prefixes[i % len(prefixes)]
+        names.append(f"{prefix}{i // len(prefixes):04d}.{rng.choice(['jpg', 'JPG', 'png'])}")
+    return names
+
+def music_names(count, rng):
+    """Track-numbered music files"""
+    words = ["love", "night", "song", "blue", "road", "fire", "heart", "rain", "dance", "home"]
+    names = []
+    for i in range(count):
+        title = " ".join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+        names.append(f"{i % 20 + 1:02d} - {title.title()} {i}.mp3")
+    return names
+
+def document_names(count, rng):
+    """Office documents with dates and versions"""
+    stems = ["report", "invoice", "notes", "resume", "budget", "minutes", "draft"]
+    exts = ["pdf", "docx", "xlsx", "txt"]
+    names = []
+    for i in range(count):
+        names.append(f"{rng.choice(stems)}_{2015 + i % 10}_{i:05d}_v{rng.randint(1, 9)}.{rng.choice(exts)}")
+    return names
+
+def anagram_names(count, rng):
+    """Shuffled letters of the same stem, worst case for additive hashing"""
+    stem = list("filename")
+    names = set()
+    while len(names) < count:
+        rng.shuffle(stem)
+        names.add("".join(stem) + f"{rng.randint(0, 9)}.txt")
+    return list(names)
+
+FILENAME_SETS = {
+    'camera': camera_names,
+    'music': music_names,
+    'documents': document_names,
+    'anagrams': anagram_names,
+}
+
+
+# Hierarchy generators: (filename, folder_path) pairs, every pair unique
+def flat_hierarchy(count, rng):
+    """Everything in one folder"""
+    return [(name, "Inbox") for name in document_names(count, rng)]
+
+def deep_hierarchy(count, rng, depth=50):
+    """One chain of nested folders with files at every level"""
+    depth = max(1, min(depth, count // 10))
+    levels = ["/".join(f"level{i:02d}" for i in range(1, n + 1)) for n in range(1, depth + 1)]
+    return [(name, levels[i % depth]) for i, name in enumerate(document_names(count, rng))]
+
+def wide_hierarchy(count, rng, files_per_folder=10):
+    """Many sibling folders under the root, a few files in each"""
+    return [(name, f"folder{i // files_per_folder:06d}")
+            for i, name in enumerate(document_names(count, rng))]
+
+def realistic_hierarchy(count, rng):
+    """Photos by year and month, music by artist and album, documents
+    by area and project"""
+    photos = count // 2
+    music = count // 4
+    files = []
+    for i, name in enumerate(camera_names(photos, rng)):
+        files.append((name, f"Photos/{2015 + i % 10}/{i // 10 % 12 + 1:02d}"))
+    for i, name in enumerate(music_names(music, rng)):
+        files.append((name, f"Music/Artist {i // 200:04d}/Album {i // 20 % 10}"))
+    areas = ["Work", "Personal", "School", "Archive"]
+    for i, name in enumerate(document_names(count - photos - music, rng)):
+        files.append((name, f"Documents/{areas[i % len(areas)]}/Project {i // 100:05d}"))
+    return files
+
+HIERARCHIES = {
+    'flat': flat_hierarchy,
+    'deep': deep_hierarchy,
+    'wide': wide_hierarchy,
+    'realistic': realistic_hierarchy,
+}
+
+
+def probe_stats(table, names):
+    """Mean, p99 and max probe length of searches for names"""
+    lengths = sorted(table.probe_length(name) for name in names)
+    return {
+        'mean': sum(lengths) / len(lengths),
+        'p99': lengths[int(len(lengths) * 0.99) - 1],
+        'max': lengths[-1],
+    }
+
+def probe_length_benchmark(count=5000, seed=42):
+    """Compare probe lengths of every hash function on each filename set"""
+    results = {}
+    for set_name, generator in FILENAME_SETS.items():
+        names = generator(count, random.Random(seed))
+        for hash_name in HASH_FUNCTIONS:
+            table = FileHashTable(hash_func=hash_name)
+            for name in names:
+                table.insert(name, "Root/" + name)
+            results[(set_name, hash_name)] = probe_stats(table, names)
+    return results
+
+def probing_benchmark(size=16384, loads=(0.7, 0.85, 0.9), seed=42):
+    """Probe lengths of linear and Robin Hood probing at fixed load factors"""
+    results = {}
+    for load in loads:
+        names = document_names(int(size * load), random.Random(seed))
+        misses = [name + ".missing" for name in names[:1000]]
+        for mode in FileHashTable.PROBING_MODES:
+            table = FileHashTable(size, probing=mode, max_load=0.95)
+            for name in names:
+                table.insert(name, "Root/" + name)
+            results[(load, mode)] = {
+                'hit': probe_stats(table, names),
+                'miss': probe_stats(table, misses),
+            }
+    return results
+
+
+
+# Timing helpers
+def latency_stats(samples, seconds):
+    """Throughput and latency percentiles from per-call times in ns"""
+    samples = sorted(samples)
+    n = len(samples)
+    
+    def percentile(p):
+        return round(samples[min(n - 1, int(n * p))] / 1000, 3)
+    
+    return {
+        'ops': n,
+        'seconds': round(seconds, 6),
+        'ops_per_sec': round(n / seconds) if seconds else None,
+        'p50_us': percentile(0.50),
+        'p90_us': percentile(0.90),
+        'p99_us': percentile(0.99),
+        'max_us': round(samples[-1] / 1000, 3),
+    }
+
+def time_calls(func, calls):
+    """Call func(*args) for each args tuple, timing every call. The
+    throughput includes the clock reads, about 50 ns per call"""
+    gc.collect()
+    samples = []
+    start = perf_counter_ns()
+    for args in calls:
+        before = perf_counter_ns()
+        func(*args)
+        samples.append(perf_counter_ns() - before)
+    return latency_stats(samples, (perf_counter_ns() - start) / 1e9)
+
+def peak_memory(build):
+    """Peak bytes allocated while build() runs. tracemalloc slows every
+    allocation, so this is a separate run from the timed one"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        build()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def sample(items, count, rng):
+    return rng.sample(items, min(count, len(items)))
+
+def search_patterns(files, rng):
+    """Substrings of random file names, as a user would type them"""
+    patterns = []
+    for name, _ in sample(files, QUERY_COUNT, rng):
+        stem = name.rsplit('.', 1)[0]
+        start = rng.randrange(max(1, len(stem) - 4))
+        patterns.append(stem[start:start + rng.randint(3, 5)])
+    return patterns
+
+
+# Benchmarks: each returns {benchmark name: stats}
+def bench_hash_table(files, rng, memory=True):
+    """FileHashTable insert, search, rehash and delete by full path"""
+    names = [name for name, _ in files]
+    paths = [f"Root/{folder}/{name}" for name, folder in files]
+    
+    def build():
+        table = FileHashTable(key_by='filepath', hash_func='crc32')
+        for name, path in zip(names, paths):
+            table.insert(name, path)
+        return table
+    
+    results = {}
+    table = FileHashTable(key_by='filepath', hash_func='crc32')
+    results['FileHashTable.insert'] = time_calls(table.insert, zip(names, paths))
+    if memory:
+        results['FileHashTable.insert']['peak_bytes'] = peak_memory(build)
+    lookups = paths[:]
+    rng.shuffle(lookups)
+    results['FileHashTable.search'] = time_calls(table.search, ((path,) for path in lookups))
+    # A full rehash at the same capacity, as done to drop tombstones
+    results['FileHashTable.rehash'] = time_calls(lambda: table.resize(table.size),
+                                                 [()] * REHASH_REPEATS)
+    results['FileHashTable.rehash']['entries'] = table.count
+    results['FileHashTable.delete'] = time_calls(
+        table.delete, ((path,) for path in sample(paths, OP_SAMPLE, rng)))
+    return results
+
+def bench_organizer(files, rng, storage='objects', memory=True):
+    """FileOrganizer add_file, delete_file and search_files, and
+    find_folder on its tree"""
+    def build():
+        organizer = FileOrganizer(storage=storage)
+        for name, folder in files:
+            organizer.add_file(name, folder)
+        return organizer
+    
+    results = {}
+    organizer = FileOrganizer(storage=storage)
+    results['FileOrganizer.add_file'] = time_calls(organizer.add_file, files)
+    if memory:
+        results['FileOrganizer.add_file']['peak_bytes'] = peak_memory(build)
+    
+    folders = sorted({folder for _, folder in files})
+    find_folder = f"{type(organizer.tree).__name__}.find_folder"
+    results[find_folder] = time_calls(
+        organizer.tree.find_folder, ((path,) for path in sample(folders, OP_SAMPLE, rng)))
+    results['FileOrganizer.search_files'] = time_calls(
+        organizer.search_files, ((pattern,) for pattern in search_patterns(files, rng)))
+    results['FileOrganizer.delete_file'] = time_calls(
+        organizer.delete_file, sample(files, OP_SAMPLE, rng))
+    return results
+
+def bench_folder_search(files, rng):
+    """tree_module Folder.search_files, a walk over the whole tree"""
+    tree = FileSystemTree()
+    folders = {}
+    for name, path in files:
+        folder = folders.get(path)
+        if folder is None:
+            folder = folders[path] = tree.create_folder_path(path)
+        folder.add_file(name)
+    return {'Folder.search_files': time_calls(
+        tree.root.search_files, ((pattern,) for pattern in search_patterns(files, rng)))}
+
+def run_suite(sizes=SCALES, hierarchies=tuple(HIERARCHIES), storages=('objects',),
+              seed=42, memory=True, report=print):
+    """Run every benchmark on every hierarchy and size. Returns a list
+    of result records; report is called with each one as it completes"""
+    results = []
+    
+    def record(hierarchy, size, stats, **params):
+        for benchmark, values in stats.items():
+            entry = {'benchmark': benchmark, 'hierarchy': hierarchy, 'size': size, **params, **values}
+            results.append(entry)
+            if report:
+                report(entry)
+    
+    for hierarchy in hierarchies:
+        for size in sizes:
+            files = HIERARCHIES[hierarchy](size, random.Random(seed))
+            record(hierarchy, size, bench_hash_table(files, random.Random(seed), memory))
+            for storage in storages:
+                record(hierarchy, size, bench_organizer(files, random.Random(seed), storage, memory),
+                       storage=storage)
+            record(hierarchy, size, bench_folder_search(files, random.Random(seed)))
+    return results
+
+
+# Result files
+def result_key(entry):
+    return (entry['benchmark'], entry['hierarchy'], entry['size'], entry.get('storage'))
+
+def save_results(results, path, seed):
+    document = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'seed': seed,
+        },
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as out:
+        json.dump(document, out, indent=1)
+
+def load_results(path):
+    with open(path, encoding='utf-8') as source:
+        return json.load(source)['results']
+
+def compare_results(old, new):
+    """(key, old ops/s, new ops/s, change, old p99, new p99) for every
+    benchmark present in both runs"""
+    previous = {result_key(entry): entry for entry in old}
+    rows = []
+    for entry in new:
+        before = previous.get(result_key(entry))
+        if before and before['ops_per_sec'] and entry['ops_per_sec']:
+            change = entry['ops_per_sec'] / before['ops_per_sec'] - 1
+            rows.append((result_key(entry), before['ops_per_sec'], entry['ops_per_sec'],
+                         change, before['p99_us'], entry['p99_us']))
+    return rows
+
+
+def format_result(entry):
+    name = entry['benchmark'] + (f"[{entry['storage']}]" if 'storage' in entry else "")
+    line = (f"{entry['hierarchy']:<10} {entry['size']:>9,} {name:<38} {entry['ops_per_sec'] or 0:>12,}/s "
+            f"p50 {entry['p50_us']:>9.2f} p99 {entry['p99_us']:>10.2f} max {entry['max_us']:>11.2f} us")
+    if 'peak_bytes' in entry:
+        line += f"  peak {entry['peak_bytes'] / 2**20:,.1f} MiB"
+    return line
+
+def print_probe_lengths(count):
+    # The additive hash is quadratic on these sets, keep counts modest
+    print(f"Probe lengths for successful search ({count:,} names per set)")
+    print(f"{'set':<10} {'hash':<9} {'mean':>8} {'p99':>6} {'max':>6}")
+    for (set_name, hash_name), stats in probe_length_benchmark(count).items():
+        print(f"{set_name:<10} {hash_name:<9} {stats['mean']:>8.2f} {stats['p99']:>6} {stats['max']:>6}")
+    
+    print("\nLinear vs Robin Hood probing (16,384 slots, document names)")
+    print(f"{'load':<5} {'probing':<11} {'hit mean':>9} {'p99':>5} {'max':>5} {'miss mean':>10} {'p99':>5} {'max':>5}")
+    for (load, mode), stats in probing_benchmark().items():
+        hit, miss = stats['hit'], stats['miss']
+        print(f"{load:<5} {mode:<11} {hit['mean']:>9.2f} {hit['p99']:>5} {hit['max']:>5} "
+              f"{miss['mean']:>10.2f} {miss['p99']:>5} {miss['max']:>5}")
+
+
+def parse_list(text, convert=str):
+    return [convert(item) for item in text.split(',') if item]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="File Organizer benchmarks")
+    parser.add_argument('mode', nargs='?', choices=('suite', 'probes'), default='suite',
+                        help="timed suite (default) or hash probe-length comparison")
+    parser.add_argument('--sizes', default=",".join(map(str, SCALES)),
+                        help="comma-separated catalogue sizes")
+    parser.add_argument('--hierarchies', default=",".join(HIERARCHIES),
+                        help="comma-separated subset of " + ", ".join(HIERARCHIES))
+    parser.add_argument('--storage', default='objects',
+                        help="comma-separated FileOrganizer storage engines")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-memory', action='store_true', help="skip the peak memory runs")
+    parser.add_argument('--output', help="save the results to this JSON file")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare with")
+    parser.add_argument('--count', type=int, default=5000, help="names per set in probes mode")
+    args = parser.parse_args(argv)
+    
+    if args.mode == 'probes':
+        print_probe_lengths(args.count)
+        return
+    
+    hierarchies = parse_list(args.hierarchies)
+    storages = parse_list(args.storage)
+    for name in hierarchies:
+        if name not in HIERARCHIES:
+            parser.error(f"unknown hierarchy '{name}'")
+    for name in storages:
+        if name not in FileOrganizer.STORAGE_ENGINES:
+            parser.error(f"unknown storage engine '{name}'")
+    
+    results = run_suite(parse_list(args.sizes, lambda size: int(float(size))), hierarchies,
+                        storages, args.seed, memory=not args.no_memory,
+                        report=lambda entry: print(format_result(entry), flush=True))
+    if args.output:
+        save_results(results, args.output, args.seed)
+        print(f"\nSaved {len(results)} results to {args.output}")
+    if args.compare:
+        print(f"\nChange in throughput against {args.compare}")
+        for key, before, after, change, p99_before, p99_after in compare_results(
+                load_results(args.compare), results):
+            benchmark, hierarchy, size, storage = key
+            name = benchmark + (f"[{storage}]" if storage else "")
+            print(f"{hierarchy:<10} {size:>9,} {name:<38} {before:>12,} -> {after:>12,}/s "
+                  f"{change:>+8.1%}  p99 {p99_before:.2f} -> {p99_after:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+# Headless command-line interface for the File Organizer
+# Runs batch scripts against a FileOrganizer, one command per line, read
+# from files or streamed from stdin. Nothing here imports tkinter
+#
+#   python main/file_organizer.py --json - < commands.txt
+#   python main/file_organizer.py < commands.txt   (stdin is not a terminal)
+#   python main/cli.py --store script.txt
+
+import argparse
+import json
+import shlex
+import sys
+from datetime import datetime
+
+from file_organizer import COMPLETION_LIMIT, JOURNAL_PATH, SNAPSHOT_PATH, FileOrganizer
+
+
+HELP = """Commands (arguments with spaces go in quotes, # starts a comment):
+  mkdir FOLDER              create a folder and its parents
+  add PATH...               add files, e.g. add Documents/notes.txt
+  delete PATH               delete a file (a bare name must be unique)
+  search NAME|PATH          find a file by name or full path
+  find PATTERN [LIMIT]      files whose name contains PATTERN
+  complete PREFIX [LIMIT]   file names starting with PREFIX
+  query QUERY [LIMIT]       files matching a query, e.g.
+                            query "ext:pdf under:Documents NOT name:draft"
+  rename FOLDER NEW_NAME    rename a folder
+  move FOLDER DEST          move a folder under DEST
+  rmdir FOLDER              delete a folder and everything in it
+  stats [FOLDER]            folder, file and byte totals
+  info PATH                 size, modification time and type of a file
+  largest [FOLDER] [K]      the K largest imported files (default 10);
+                            a lone number is K, write Root/5 for a folder 5
+  newest [FOLDER] [K]       the K most recently modified imported files
+  since TIME [FOLDER]       imported files modified at or after TIME
+                            (YYYY-MM-DD[THH:MM[:SS]] or seconds since 1970)
+  sizes [FOLDER]            size histogram of each subfolder
+  duplicates [FOLDER]       imported files with identical content
+  import DIRECTORY [DEST]   import a real directory tree
+  export FILE               write every file path to FILE (- for stdout,
+                            or into the result with --json)
+  save [FILE]               write a snapshot
+  metrics [json|prometheus] hot-path metrics (needs --metrics)
+  help                      this list"""
+
+
+class CommandError(Exception):
+    """A command that could not run: unknown, or wrong arguments"""
+
+
+def relative_path(path):
+    """Path below the root; the 'Root/' prefix is optional"""
+    path = path.strip('/')
+    if path == "Root":
+        return ""
+    return path[5:] if path.startswith("Root/") else path
+
+def split_path(path):
+    """('folder/path', 'name') of a file path, folder_path below the root"""
+    folder_path, _, filename = path.strip('/').rpartition('/')
+    return relative_path(folder_path), filename
+
+
+class CommandRunner:
+    """Runs commands against an organizer. Each command returns
+    (success, message, result), result being data for JSON output.
+    With as_json, commands never write to stdout themselves"""
+    
+    def __init__(self, organizer, snapshot_path=SNAPSHOT_PATH, as_json=False):
+        self.organizer = organizer
+        self.snapshot_path = snapshot_path
+        self.as_json = as_json
+        self.commands = {
+            'mkdir': (self.mkdir, 1, 1),
+            'add': (self.add, 1, None),
+            'delete': (self.delete, 1, 1),
+            'search': (self.search, 1, 1),
+            'find': (self.find, 1, 2),
+            'complete': (self.complete, 1, 2),
+            'query': (self.query, 1, 2),
+            'rename': (self.rename, 2, 2),
+            'move': (self.move, 2, 2),
+            'rmdir': (self.rmdir, 1, 1),
+            'stats': (self.stats, 0, 1),
+            'info': (self.info, 1, 1),
+            'largest': (self.largest, 0, 2),
+            'newest': (self.newest, 0, 2),
+            'since': (self.since, 1, 2),
+            'sizes': (self.sizes, 0, 1),
+            'duplicates': (self.duplicates, 0, 1),
+            'import': (self.import_directory, 1, 2),
+            'export': (self.export, 1, 1),
+            'save': (self.save, 0, 1),
+            'metrics': (self.metrics, 0, 1),
+            'help': (self.help, 0, 0),
+        }
+    
+    def run(self, line):
+        """Run one script line. None for blank lines and comments"""
+        try:
+            words = shlex.split(line, comments=True)
+        except ValueError as error:
+            raise CommandError(f"Cannot parse line: {error}")
+        if not words:
+            return None
+        name, args = words[0].lower(), words[1:]
+        if name not in self.commands:
+            raise CommandError(f"Unknown command '{name}', try 'help'")
+        handler, least, most = self.commands[name]
+        if len(args) < least or (most is not None and len(args) > most):
+            raise CommandError(f"Wrong number of arguments for '{name}', try 'help'")
+        return handler(*args)
+    
+    def mkdir(self, path):
+        folder = self.organizer.create_folders(relative_path(path))
+        return True, f"Folder {folder.get_path()} ready", folder.get_path()
+    
+    def add(self, *paths):
+        if len(paths) == 1:
+            folder_path, filename = split_path(paths[0])
+            success, message = self.organizer.add_file(filename, folder_path)
+            return success, message, None
+        report = self.organizer.add_files([split_path(path)[::-1] for path in paths])
+        success = not (report['duplicates'] or report['failed'])
+        return success, (f"Added {report['added']} files, {report['duplicates']} duplicates, "
+                         f"{report['failed']} failed"), report
+    
+    def delete(self, path):
+        folder_path, filename = split_path(path)
+        if '/' in path.strip('/'):
+            success, message = self.organizer.delete_file(filename, "Root/" + folder_path)
+        else:
+            success, message = self.organizer.delete_file(filename)
+        return success, message, None
+    
+    def search(self, name):
+        success, message = self.organizer.search_file(name)
+        return success, message, None
+    
+    def find(self, pattern, limit=None):
+        matches = self.organizer.search_files(pattern, limit=int(limit) if limit else None)
+        paths = [match['full_path'] for match in matches]
+        message = "\n".join(paths) if paths else f"No files contain '{pattern}'"
+        return bool(paths), message, paths
+    
+    def complete(self, prefix, limit=None):
+        names = (self.organizer.complete_filename(prefix, int(limit)) if limit
+                 else self.organizer.complete_filename(prefix))
+        return bool(names), "\n".join(names) if names else f"No names start with '{prefix}'", names
+    
+    def query(self, query, limit=None):
+        paths = [match['full_path'] for match in self.organizer.query(query, int(limit) if limit else None)]
+        message = "\n".join(paths) if paths else f"No files match '{query}'"
+        return bool(paths), message, paths
+    
+    def rename(self, folder_path, new_name):
+        success, message = self.organizer.rename_folder(folder_path, new_name)
+        return success, message, None
+    
+    def move(self, folder_path, dest_path):
+        success, message = self.organizer.move_folder(folder_path, dest_path)
+        return success, message, None
+    
+    def rmdir(self, folder_path):
+        success, message = self.organizer.delete_folder(folder_path)
+        return success, message, None
+    
+    def stats(self, folder_path=None):
+        folder = self.organizer.tree
+        if folder_path is not None:
+            folder = self.organizer.get_folder(folder_path)
+            if folder is None:
+                return False, f"Folder '{folder_path}' not found", None
+        totals = self.organizer.get_statistics(folder)
+        message = (f"{folder.get_path()}: {totals['folders']} folders, {totals['files']} files, "
+                   f"{totals['bytes']:,} bytes")
+        return True, message, totals
+    
+    def info(self, path):
+        info = self.organizer.file_info(relative_path(path))
+        if info is None:
+            return False, f"File '{path}' not found", None
+        if info['mtime'] is None:
+            return True, f"{info['full_path']}: {info['type']}, no size or time recorded", info
+        modified = datetime.fromtimestamp(info['mtime']).isoformat(sep=' ', timespec='seconds')
+        return True, f"{info['full_path']}: {info['size']:,} bytes, modified {modified}, {info['type']}", info
+    
+    def _file_list(self, matches, field, empty):
+        if not matches:
+            return True, empty, []
+        if field == 'size':
+            lines = [f"{match['size']:>15,}  {match['full_path']}" for match in matches]
+        else:
+            lines = [f"{datetime.fromtimestamp(match['mtime']).isoformat(sep=' ', timespec='seconds')}  "
+                     f"{match['full_path']}" for match in matches]
+        return True, "\n".join(lines), matches
+    
+    def _scope_and_count(self, folder_path, k):
+        """(folder path below the root, k) of [FOLDER] [K] arguments. A
+        lone number is K: 'largest 5' means the 5 largest files overall"""
+        if k is None and folder_path is not None and folder_path.isdigit():
+            folder_path, k = None, folder_path
+        return folder_path and relative_path(folder_path), int(k) if k is not None else COMPLETION_LIMIT
+    
+    def largest(self, folder_path=None, k=None):
+        folder_path, k = self._scope_and_count(folder_path, k)
+        matches = self.organizer.largest_files(k, folder_path)
+        return self._file_list(matches, 'size', "No imported files here")
+    
+    def newest(self, folder_path=None, k=None):
+        folder_path, k = self._scope_and_count(folder_path, k)
+        matches = self.organizer.newest_files(k, folder_path)
+        return self._file_list(matches, 'mtime', "No imported files here")
+    
+    def since(self, when, folder_path=None):
+        try:
+            timestamp = float(when)
+        except ValueError:
+            timestamp = datetime.fromisoformat(when).timestamp()
+        matches = self.organizer.modified_since(timestamp, folder_path and relative_path(folder_path))
+        return self._file_list(matches, 'mtime', f"No imported files modified since {when}")
+    
+    def sizes(self, folder_path=None):
+        histograms = self.organizer.size_histogram(folder_path and relative_path(folder_path),
+                                                   by_folder=True)
+        if not histograms:
+            return True, "No imported files here", histograms
+        lines = []
+        for path, rows in histograms.items():
+            lines.append(f"{path}: {sum(row['files'] for row in rows)} files, "
+                         f"{sum(row['bytes'] for row in rows):,} bytes")
+            for row in rows:
+                lines.append(f"  {row['min']:>15,} - {row['max']:<15,} {row['files']:>8} files "
+                             f"{row['bytes']:>18,} bytes")
+        return True, "\n".join(lines), histograms
+    
+    def duplicates(self, folder_path=None):
+        report = self.organizer.find_duplicates(folder_path and relative_path(folder_path))
+        lines = []
+        for group in report['groups']:
+            lines.append(f"{len(group['files'])} copies of {group['size']:,} bytes, "
+                         f"{group['reclaimable']:,} reclaimable:")
+            lines.extend(f"  {path}" for path in group['files'])
+        lines.append(f"{len(report['groups'])} duplicate groups, {report['reclaimable']:,} bytes "
+                     f"reclaimable ({report['candidates']} candidates, {report['cache_hits']} cached "
+                     f"digests, {len(report['errors'])} unreadable)")
+        report['errors'] = [f"{path}: {error}" for path, error in report['errors']]
+        return True, "\n".join(lines), report
+    
+    def import_directory(self, directory, dest=None):
+        from scanner import DirectoryScanner  # threads, only needed here
+        scanner = DirectoryScanner(self.organizer, exclude=[".git", "__pycache__"], freeze=True)
+        report = scanner.scan(directory, dest)
+        message = (f"Imported {report['added']} files in {report['folders']} folders, "
+                   f"{report['duplicates']} duplicates, {len(report['errors'])} unreadable")
+        report['errors'] = [str(error) for error in report['errors']]
+        return True, message, report
+    
+    def _file_paths(self):
+        """Full path of every file, folder by folder from the root"""
+        order = [self.organizer.tree]
+        for folder in order:
+            order.extend(folder.subfolders)
+            prefix = folder.get_path() + "/"
+            for filename in folder.files:
+                yield prefix + filename
+    
+    def export(self, path):
+        if path == "-" and self.as_json:
+            # stdout carries the JSON lines: the paths go into the result
+            paths = list(self._file_paths())
+            return True, f"Exported {len(paths)} file paths", paths
+        out = sys.stdout if path == "-" else open(path, 'w', encoding='utf-8')
+        written = 0
+        try:
+            for file_path in self._file_paths():
+                out.write(file_path + "\n")
+                written += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        return True, f"Exported {written} file paths", written
+    
+    def save(self, path=None):
+        path = path or self.snapshot_path
+        self.organizer.save_snapshot(path)
+        return True, f"Saved snapshot to {path}", path
+    
+    def metrics(self, output_format='json'):
+        metrics = self.organizer.metrics
+        if metrics is None:
+            return False, "Metrics are off, run with --metrics", None
+        if output_format == 'prometheus':
+            return True, metrics.to_prometheus().rstrip("\n"), None
+        return True, metrics.to_json(indent=1), metrics.snapshot()
+    
+    def help(self):
+        return True, HELP, None
+
+
+def run_script(runner, lines, out, as_json=False, stop_on_error=False):
+    """Run the lines of a script, writing one result per command.
+    Returns the number of commands that failed"""
+    failures = 0
+    for number, line in enumerate(lines, 1):
+        try:
+            outcome = runner.run(line)
+            if outcome is None:
+                continue
+            success, message, result = outcome
+        except (CommandError, OSError, ValueError) as error:
+            success, message, result = False, str(error), None
+        
+        if as_json:
+            out.write(json.dumps({'line': number, 'command': line.strip(), 'ok': success,
+                                  'message': message, 'result': result}, default=str) + "\n")
+        else:
+            out.write(message + "\n" if success else f"error (line {number}): {message}\n")
+        out.flush()  # results stream out as commands complete
+        if not success:
+            failures += 1
+            if stop_on_error:
+                break
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="file_organizer",
+        description="Run File Organizer commands from scripts or stdin, without the GUI",
+        epilog=HELP, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('scripts', nargs='*',
+                        help="command files to run in order, - for stdin (the default)")
+    parser.add_argument('-c', '--command', action='append', default=[],
+                        help="run this command first (repeatable)")
+    parser.add_argument('--json', action='store_true', help="write results as JSON lines")
+    parser.add_argument('--store', action='store_true',
+                        help="work on the saved catalogue, journaling every change")
+    parser.add_argument('--snapshot', default=SNAPSHOT_PATH, help="snapshot file for --store and save")
+    parser.add_argument('--journal', default=JOURNAL_PATH, help="journal file for --store")
+    parser.add_argument('--storage', choices=FileOrganizer.STORAGE_ENGINES, default='objects')
+    parser.add_argument('--metrics', action='store_true', help="record hot-path metrics")
+    parser.add_argument('--stop-on-error', action='store_true', help="stop at the first failed command")
+    args = parser.parse_args(argv)
+    if not (args.scripts or args.command):
+        args.scripts = ['-']
+    
+    organizer = FileOrganizer(storage=args.storage)
+    if args.metrics:
+        organizer.enable_metrics()
+    if args.store:
+        organizer.open_store(args.snapshot, args.journal)
+    runner = CommandRunner(organizer, args.snapshot, as_json=args.json)
+    
+    failures = 0
+    try:
+        failures += run_script(runner, args.command, sys.stdout, args.json, args.stop_on_error)
+        for script in args.scripts:
+            if failures and args.stop_on_error:
+                break
+            if script == "-":
+                failures += run_script(runner, sys.stdin, sys.stdout, args.json, args.stop_on_error)
+            else:
+                with open(script, encoding='utf-8') as lines:
+                    failures += run_script(runner, lines, sys.stdout, args.json, args.stop_on_error)
+    finally:
+        organizer.close_store()
+    return 1 if failures else 0
+
+def run(argv=None):
+    """Entry point of file_organizer.py: the GUI when started from a
+    terminal with no arguments, the batch CLI when given arguments or
+    when commands are piped into stdin"""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv or sys.stdin is None or not sys.stdin.isatty():
+        return main(argv)
+    
+    print("🚀 Starting File Organizer GUI")
+    print("Group 8 - DSA Project")
+    print("=" * 50)
+    
+    from gui import FileOrganizerGUI
+    app = FileOrganizerGUI()
+    app.run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+# Array-backed name multimap and search indexes for compact storage
+# Each distinct lowercased file name gets an id in a NameTable, which
+# stores the names as UTF-8 in one bytearray. The copies of a name are
+# chained through the CompactTree's file rows, and the trigram, prefix
+# and extension indexes hold arrays of name ids instead of sets and
+# trie nodes of strings. Ids are handed out in order and not reused, so
+# each index catches up by indexing the ids issued since its last call;
+# removed names are skipped until the table is compacted, which
+# renumbers the live names and makes every index rebuild itself
+
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from heapq import merge
+from itertools import islice
+
+from compact_tree import HASH_MASK, NONE, _IdTable
+from gc_pause import gc_paused
+from search_index import extension, trigrams
+
+# Compact the NameTable once removed names hold more than this share of
+# its bytes (and at least COMPACT_MIN bytes)
+DEAD_RATIO = 0.5
+COMPACT_MIN = 1 << 16
+
+
+class NameTable:
+    """Distinct lowercased file names, numbered in order of arrival. A
+    removed name keeps its id and bytes, so arrays sorted by name stay
+    sorted, until compact() renumbers the live ones"""
+    
+    def __init__(self):
+        self.data = bytearray()
+        self.offset = array('Q')
+        self.length = array('I')
+        self.hashes = array('I')
+        self.live = bytearray()  # 1 while the name has a copy
+        self.table = _IdTable(self.hashes)  # live names by hash
+        self.count = 0  # live names
+        self.dead_bytes = 0
+        self.generation = 0  # bumped by compact(), which renumbers
+    
+    def __len__(self):
+        """Ids handed out, removed names included"""
+        return len(self.length)
+    
+    def name(self, name_id):
+        start = self.offset[name_id]
+        return self.data[start:start + self.length[name_id]].decode('utf-8')
+    
+    def find(self, name, name_hash=None):
+        """Id of a live name, or NONE"""
+        if name_hash is None:
+            name_hash = hash(name) & HASH_MASK
+        return self.table.find(name_hash, lambda name_id: self.name(name_id) == name)
+    
+    def add(self, name):
+        """Id of name, numbering it if it is not live"""
+        name_hash = hash(name) & HASH_MASK
+        name_id = self.find(name, name_hash)
+        if name_id != NONE:
+            return name_id
+        data = name.encode('utf-8')
+        name_id = len(self.length)
+        self.offset.append(len(self.data))
+        self.length.append(len(data))
+        self.hashes.append(name_hash)
+        self.live.append(1)
+        self.data += data
+        self.table.add(name_id)
+        self.count += 1
+        return name_id
+    
+    def remove(self, name_id):
+        self.live[name_id] = 0
+        self.table.remove(name_id)
+        self.count -= 1
+        self.dead_bytes += self.length[name_id]
+    
+    def live_ids(self):
+        live = self.live
+        return (name_id for name_id in range(len(live)) if live[name_id])
+    
+    def needs_compacting(self):
+        dead = self.dead_bytes
+        return dead >= COMPACT_MIN and dead > len(self.data) * DEAD_RATIO
+    
+    def compact(self):
+        """Renumber the live names from 0, dropping the removed ones.
+        Returns an array from old id to new id (NONE for removed names)"""
+        remap = array('i', [NONE]) * len(self)
+        data = bytearray()
+        offset = array('Q')
+        length = array('I')
+        hashes = array('I')
+        for name_id in self.live_ids():
+            remap[name_id] = len(length)
+            start = self.offset[name_id]
+            offset.append(len(data))
+            data += self.data[start:start + self.length[name_id]]
+            length.append(self.length[name_id])
+            hashes.append(self.hashes[name_id])
+        self.data, self.offset, self.length, self.hashes = data, offset, length, hashes
+        self.live = bytearray(b'\x01') * len(length)
+        self.table = _IdTable(hashes)
+        for name_id in range(len(length)):
+            self.table.add(name_id)
+        self.dead_bytes = 0
+        self.generation += 1
+        return remap
+
+
+class CompactLocations:
+    """basename (lowercased) -> {folder: filename} multimap over a
+    CompactTree, read like the dict FileOrganizer keeps for object
+    storage. A name's copies are a chain of file ids: first_copy per
+    name id, next_copy per file. add_copy and remove_copy read the
+    file's row, so they run while it is in the tree"""
+    
+    def __init__(self, store, name_table):
+        self.store = store
+        self.name_table = name_table
+        self.first_copy = array('i')  # name id -> file, NONE once removed
+        self.next_copy = array('i')  # file -> next file with its name
+    
+    def _chain(self, name_id):
+        file = self.first_copy[name_id]
+        while file != NONE:
+            yield file
+            file = self.next_copy[file]
+    
+    def get(self, name, default=None):
+        name_id = self.name_table.find(name)
+        if name_id == NONE:
+            return default
+        store = self.store
+        return {store.folder(store.file_folder[file]): store.file_name(file)
+                for file in self._chain(name_id)}
+    
+    def __getitem__(self, name):
+        copies = self.get(name)
+        if copies is None:
+            raise KeyError(name)
+        return copies
+    
+    def __contains__(self, name):
+        return self.name_table.find(name) != NONE
+    
+    def __len__(self):
+        return self.name_table.count
+    
+    def __iter__(self):
+        names = self.name_table
+        for name_id in names.live_ids():
+            yield names.name(name_id)
+    
+    def items(self):
+        for name in self:
+            yield name, self[name]
+    
+    def add_copy(self, name, folder, filename):
+        """Record a copy; True if it is the first with this name"""
+        return self.add_file_copy(name, self.store.find_file(folder.index, filename))
+    
+    def add_file_copy(self, name, file):
+        """add_copy for the tree's file row file"""
+        name_id = self.name_table.add(name)
+        if name_id == len(self.first_copy):
+            self.first_copy.append(NONE)
+        next_copy = self.next_copy
+        while len(next_copy) <= file:  # rows are numbered in order
+            next_copy.append(NONE)
+        first = self.first_copy[name_id]
+        next_copy[file] = first
+        self.first_copy[name_id] = file
+        return first == NONE
+    
+    def remove_copy(self, name, folder):
+        """Forget the copy in folder; True if it was the last one"""
+        name_id = self.name_table.find(name)
+        file_folder = self.store.file_folder
+        previous = NONE
+        file = self.first_copy[name_id]
+        while file_folder[file] != folder.index:
+            previous, file = file, self.next_copy[file]
+        if previous == NONE:
+            self.first_copy[name_id] = self.next_copy[file]
+        else:
+            self.next_copy[previous] = self.next_copy[file]
+        if self.first_copy[name_id] != NONE:
+            return False
+        self.name_table.remove(name_id)
+        if self.name_table.needs_compacting():
+            remap = self.name_table.compact()
+            first_copy = array('i', [NONE]) * len(self.name_table)
+            for old, new in enumerate(remap):
+                if new != NONE:
+                    first_copy[new] = self.first_copy[old]
+            self.first_copy = first_copy
+        return True
+
+
+class _NameIdIndex:
+    """Base of the indexes over a NameTable: tracks the next id to index
+    and starts over when the table has been renumbered"""
+    
+    def __init__(self, name_table):
+        self.name_table = name_table
+        self._next = 0  # first id not indexed yet
+        self._generation = name_table.generation
+        self._reset()
+    
+    def _catch_up(self):
+        names = self.name_table
+        if self._generation != names.generation:
+            self._reset()
+            self._next = 0
+            self._generation = names.generation
+        if self._next < len(names):
+            start, self._next = self._next, len(names)
+            live = names.live
+            new_ids = [name_id for name_id in range(start, len(names)) if live[name_id]]
+            if new_ids:
+                with gc_paused():  # nothing to collect, only large lists
+                    self._index(new_ids)
+    
+    def add_name(self, name):
+        """Index the names numbered since the last call (name among them)"""
+        self._catch_up()
+    
+    def add_names(self, names):
+        self._catch_up()
+    
+    def remove_name(self, name):
+        """Nothing to do: removed names are skipped while reading"""
+    
+    def _names(self, ids):
+        """Yield the live names among ids"""
+        names = self.name_table
+        live = names.live
+        for name_id in ids:
+            if live[name_id]:
+                yield names.name(name_id)
+
+
+class CompactTrigramIndex(_NameIdIndex):
+    """TrigramIndex over name ids: trigram -> array of the ids of the
+    names containing it. Candidates come from the shortest posting array
+    and are checked against the pattern, which also drops stale ids"""
+    
+    def _reset(self):
+        self._postings = {}
+    
+    def _index(self, new_ids):
+        grouped = defaultdict(list)  # trigram -> new ids containing it
+        name = self.name_table.name
+        for name_id in new_ids:
+            for gram in trigrams(name(name_id)):
+                grouped[gram].append(name_id)
+        postings = self._postings
+        for gram, ids in grouped.items():
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = array('I', ids)
+            else:
+                posting.extend(ids)
+    
+    def search(self, pattern):
+        """Yield the indexed names containing pattern (already lowercased)"""
+        self._catch_up()
+        grams = trigrams(pattern)
+        if grams:
+            postings = [self._postings.get(gram) for gram in grams]
+            if not all(postings):
+                return
+            ids = min(postings, key=len)
+        else:
+            ids = range(len(self.name_table))  # too short for trigrams: check every name
+        for name in self._names(ids):
+            if pattern in name:
+                yield name
+
+
+class CompactPrefixIndex(_NameIdIndex):
+    """Prefix completion over name ids: runs of ids sorted by name,
+    merged like PrefixTrie's bulk runs. Removed names keep their bytes,
+    so a run stays sorted; they are dropped when their run is merged"""
+    
+    def _reset(self):
+        self._runs = []  # arrays of ids sorted by name, longest first
+    
+    def _index(self, new_ids):
+        key = self.name_table.name
+        runs = self._runs
+        runs.append(array('I', sorted(new_ids, key=key)))
+        # Keep each run at least twice as long as the next one
+        while len(runs) > 1 and len(runs[-2]) < 2 * len(runs[-1]):
+            last = runs.pop()
+            live = self.name_table.live
+            runs[-1] = array('I', sorted((name_id for run in (runs[-1], last) for name_id in run
+                                          if live[name_id]), key=key))
+    
+    def complete(self, prefix, limit=10):
+        """The first limit names starting with prefix (already lowercased),
+        in sorted order"""
+        self._catch_up()
+        names = merge(*(self._run_names(run, prefix) for run in self._runs))
+        return list(islice(names, limit))
+    
+    def _run_names(self, run, prefix):
+        names = self.name_table
+        i = bisect_left(run, prefix, key=names.name)
+        live = names.live
+        while i < len(run):
+            name_id = run[i]
+            name = names.name(name_id)
+            if not name.startswith(prefix):
+                return
+            if live[name_id]:
+                yield name
+            i += 1
+
+
+class CompactExtensionIndex(_NameIdIndex):
+    """ExtensionIndex over name ids: extension -> array of name ids"""
+    
+    def _reset(self):
+        self._ids = {}
+    
+    def _index(self, new_ids):
+        grouped = defaultdict(list)
+        name = self.name_table.name
+        for name_id in new_ids:
+            grouped[extension(name(name_id))].append(name_id)
+        for ext, ids in grouped.items():
+            group = self._ids.get(ext)
+            if group is None:
+                self._ids[ext] = array('I', ids)
+            else:
+                group.extend(ids)
+    
+    def names(self, ext):
+        """Yield the indexed names with extension ext (lowercased)"""
+        self._catch_up()
+        yield from self._names(self._ids.get(ext, ()))
@@ -0,0 +1,665 @@
+# Compact array-backed folder tree for the File Organizer
+# The hierarchy is kept in parallel arrays (parent, first/last child,
+# next/previous sibling, name) and the files in packed arrays of their
+# own, with every name stored once as UTF-8 in a single bytearray.
+# CompactFolder handles offer the FolderTree API, so FileOrganizer can
+# run on either storage. Rows of deleted files and folders are reused,
+# and the name buffer is rewritten once most of it is dead. With compact
+# storage FileOrganizer's hash table and name indexes hold ids of these
+# rows too (CompactFileTable, compact_index)
+
+from array import array
+from bisect import bisect_left, insort
+
+NONE = -1
+EMPTY = -1
+DELETED = -2
+FREED = -2  # parent of a folder row on the free list
+HASH_MASK = 0xFFFFFFFF
+PATH_CACHE_SIZE = 65536  # cached folder paths before the cache is reset
+# The name buffer is rewritten without the bytes of removed and renamed
+# entries once they are more than this share of it (and at least
+# NAMES_COMPACT_MIN bytes)
+NAMES_DEAD_RATIO = 0.5
+NAMES_COMPACT_MIN = 1 << 16
+
+
+def _key_hash(parent, name):
+    return hash((parent, name)) & HASH_MASK
+
+
+class _IdTable:
+    """Open-addressing set of integer ids with linear probing. The hash
+    of each id lives in an array owned by the tree, so the table itself
+    is one array of ids"""
+    
+    def __init__(self, hashes):
+        self.hashes = hashes
+        self.slots = array('i', [EMPTY]) * 8
+        self.mask = 7
+        self.used = 0  # live ids and tombstones
+    
+    def find(self, key_hash, matches):
+        """The id with this hash for which matches(id) is true, or NONE"""
+        slots = self.slots
+        hashes = self.hashes
+        mask = self.mask
+        pos = key_hash & mask
+        while True:
+            entity = slots[pos]
+            if entity == EMPTY:
+                return NONE
+            if entity >= 0 and hashes[entity] == key_hash and matches(entity):
+                return entity
+            pos = (pos + 1) & mask
+    
+    def add(self, entity):
+        if (self.used + 1) * 10 > len(self.slots) * 7:
+            self._resize()
+        slots = self.slots
+        mask = self.mask
+        pos = self.hashes[entity] & mask
+        while slots[pos] >= 0:
+            pos = (pos + 1) & mask
+        if slots[pos] == EMPTY:
+            self.used += 1
+        slots[pos] = entity
+    
+    def remove(self, entity):
+        slots = self.slots
+        mask = self.mask
+        pos = self.hashes[entity] & mask
+        while slots[pos] != entity:
+            pos = (pos + 1) & mask
+        slots[pos] = DELETED
+    
+    def _resize(self):
+        """Rebuild without tombstones, at most 35% full"""
+        live = [entity for entity in self.slots if entity >= 0]
+        size = 8
+        while size * 35 < len(live) * 100:
+            size <<= 1
+        self.slots = slots = array('i', [EMPTY]) * size
+        self.mask = mask = size - 1
+        self.used = len(live)
+        hashes = self.hashes
+        for entity in live:
+            pos = hashes[entity] & mask
+            while slots[pos] != EMPTY:
+                pos = (pos + 1) & mask
+            slots[pos] = entity
+
+
+class CompactTree:
+    """Folder tree storage. Folder 0 is the root; folder and file ids are
+    indexes into the arrays below"""
+    
+    def __init__(self, root_name="Root"):
+        self.names = bytearray()  # UTF-8 names, addressed by offset/length
+        
+        # Folders
+        self.parent = array('i')
+        self.first_child = array('i')
+        self.last_child = array('i')
+        self.next_sibling = array('i')
+        self.prev_sibling = array('i')
+        self.folder_name_at = array('Q')
+        self.folder_name_len = array('I')
+        self.folder_hash = array('I')  # hash of (parent, name)
+        self.child_count = array('I')
+        self.first_file = array('i')
+        self.last_file = array('i')
+        self.file_count = array('I')
+        self.total_folders = array('I')  # subtree totals, this folder included
+        self.total_files = array('I')
+        self.total_bytes = array('Q')
+        
+        # Files, deleted ones chained through next_file for reuse
+        self.file_folder = array('i')
+        self.next_file = array('i')
+        self.prev_file = array('i')
+        self.file_name_at = array('Q')
+        self.file_name_len = array('I')
+        self.file_hash = array('I')  # hash of (folder, name)
+        self.file_size = array('Q')
+        self._free_file = NONE
+        # Last file found: a new file is looked up by the hash table and
+        # then by the name multimap
+        self._found = (NONE, None, NONE)
+        
+        # Folder rows of deleted subtrees are chained through next_sibling
+        # for reuse, once their files are gone
+        self._free_folder = NONE
+        self._detached = []  # removed subtrees not freed yet
+        self.dead_bytes = 0  # bytes of names no longer referenced
+        
+        self.children = _IdTable(self.folder_hash)  # (parent, name) -> folder
+        self.file_table = _IdTable(self.file_hash)  # (folder, name) -> file
+        self._paths = {}  # folder -> path, reset by renames and moves
+        self._sorted = {}  # folder -> files sorted by name, once requested
+        
+        self._new_folder(NONE, root_name)
+        self.root = CompactFolder(self, 0)
+    
+    def folder(self, index):
+        return CompactFolder(self, index)
+    
+    def _store_name(self, name):
+        data = name.encode('utf-8')
+        offset = len(self.names)
+        self.names += data
+        return offset, len(data)
+    
+    def folder_name(self, folder):
+        start = self.folder_name_at[folder]
+        return self.names[start:start + self.folder_name_len[folder]].decode('utf-8')
+    
+    def file_name(self, file):
+        start = self.file_name_at[file]
+        return self.names[start:start + self.file_name_len[file]].decode('utf-8')
+    
+    # Folders
+    
+    def _new_folder(self, parent, name):
+        """Add a folder as the last child of parent (no totals update),
+        in a freed row if there is one"""
+        if self._detached:
+            self._reclaim()
+        offset, length = self._store_name(name)
+        values = (parent, NONE, NONE, NONE, NONE, offset, length, _key_hash(parent, name),
+                  0, NONE, NONE, 0, 1, 0, 0)
+        columns = (self.parent, self.first_child, self.last_child, self.next_sibling,
+                   self.prev_sibling, self.folder_name_at, self.folder_name_len, self.folder_hash,
+                   self.child_count, self.first_file, self.last_file, self.file_count,
+                   self.total_folders, self.total_files, self.total_bytes)
+        folder = self._free_folder
+        if folder == NONE:
+            folder = len(self.parent)
+            for column, value in zip(columns, values):
+                column.append(value)
+        else:
+            self._free_folder = self.next_sibling[folder]
+            for column, value in zip(columns, values):
+                column[folder] = value
+        if parent != NONE:
+            self._link_child(parent, folder, name)
+        return folder
+    
+    def _link_child(self, parent, folder, name):
+        previous = self.last_child[parent]
+        self.prev_sibling[folder] = previous
+        self.next_sibling[folder] = NONE
+        if previous == NONE:
+            self.first_child[parent] = folder
+        else:
+            self.next_sibling[previous] = folder
+        self.last_child[parent] = folder
+        self.child_count[parent] += 1
+        self._index_child(parent, folder, name)
+    
+    def _unlink_child(self, folder):
+        parent = self.parent[folder]
+        previous, following = self.prev_sibling[folder], self.next_sibling[folder]
+        if previous == NONE:
+            self.first_child[parent] = following
+        else:
+            self.next_sibling[previous] = following
+        if following == NONE:
+            self.last_child[parent] = previous
+        else:
+            self.prev_sibling[following] = previous
+        self.child_count[parent] -= 1
+        self._unindex_child(parent, folder, self.folder_name(folder))
+    
+    def _index_child(self, parent, folder, name):
+        # The first of several same-named subfolders is the one found by name
+        if self.get_subfolder(parent, name) == NONE:
+            self.children.add(folder)
+    
+    def _unindex_child(self, parent, folder, name):
+        """Drop folder from the name index, keeping a same-named sibling"""
+        if self.get_subfolder(parent, name) != folder:
+            return
+        self.children.remove(folder)
+        for other in self.subfolders(parent):
+            if other != folder and self.folder_name(other) == name:
+                self.children.add(other)
+                break
+    
+    def subfolders(self, folder):
+        child = self.first_child[folder]
+        while child != NONE:
+            yield child
+            child = self.next_sibling[child]
+    
+    def get_subfolder(self, parent, name):
+        return self.children.find(
+            _key_hash(parent, name),
+            lambda folder: self.parent[folder] == parent and self.folder_name(folder) == name)
+    
+    def add_folder(self, parent, name):
+        folder = self._new_folder(parent, name)
+        self._add_totals(parent, 1, 0, 0)
+        return folder
+    
+    def _add_totals(self, folder, folders, files, size):
+        while folder != NONE:
+            self.total_folders[folder] += folders
+            self.total_files[folder] += files
+            self.total_bytes[folder] += size
+            folder = self.parent[folder]
+    
+    def rename(self, folder, new_name):
+        parent = self.parent[folder]
+        if parent != NONE:
+            self._unindex_child(parent, folder, self.folder_name(folder))
+        self.dead_bytes += self.folder_name_len[folder]
+        self.folder_name_at[folder], self.folder_name_len[folder] = self._store_name(new_name)
+        self.folder_hash[folder] = _key_hash(parent, new_name)
+        if parent != NONE:
+            self._index_child(parent, folder, new_name)
+        self._paths.clear()
+        self._compact_names_if_needed()
+    
+    def move_to(self, folder, new_parent):
+        """False if new_parent is the folder itself or below it"""
+        node = new_parent
+        while node != NONE:
+            if node == folder:
+                return False
+            node = self.parent[node]
+        
+        totals = (self.total_folders[folder], self.total_files[folder], self.total_bytes[folder])
+        old_parent = self.parent[folder]
+        if old_parent != NONE:
+            self._unlink_child(folder)
+            self._add_totals(old_parent, -totals[0], -totals[1], -totals[2])
+        name = self.folder_name(folder)
+        self.parent[folder] = new_parent
+        self.folder_hash[folder] = _key_hash(new_parent, name)
+        self._link_child(new_parent, folder, name)
+        self._add_totals(new_parent, *totals)
+        self._paths.clear()
+        return True
+    
+    def remove_subfolder(self, parent, folder):
+        """Detach folder and its subtree from parent. The caller then
+        removes their files; the rows are freed for reuse by the next
+        new folder after that"""
+        if self.parent[folder] != parent:
+            return False
+        self._unlink_child(folder)
+        self._add_totals(parent, -self.total_folders[folder], -self.total_files[folder],
+                         -self.total_bytes[folder])
+        self.parent[folder] = NONE
+        self._detached.append(folder)
+        return True
+    
+    def _reclaim(self):
+        """Put the rows of detached subtrees whose files are all removed
+        on the free list"""
+        waiting = []
+        for root in self._detached:
+            order = [root]
+            for folder in order:
+                order.extend(self.subfolders(folder))
+            if any(self.file_count[folder] for folder in order):
+                waiting.append(root)  # its files are still being removed
+                continue
+            for folder in order:
+                parent = self.parent[folder]
+                if parent != NONE and self.get_subfolder(parent, self.folder_name(folder)) == folder:
+                    self.children.remove(folder)
+                self.dead_bytes += self.folder_name_len[folder]
+                self.parent[folder] = FREED
+                self.next_sibling[folder] = self._free_folder
+                self._free_folder = folder
+                self._sorted.pop(folder, None)
+                self._paths.pop(folder, None)
+        self._detached = waiting
+        self._compact_names_if_needed()
+    
+    def _compact_names_if_needed(self):
+        dead = self.dead_bytes
+        if dead >= NAMES_COMPACT_MIN and dead > len(self.names) * NAMES_DEAD_RATIO:
+            self._compact_names()
+    
+    def _compact_names(self):
+        """Copy the names of the folder and file rows in use into a new
+        buffer, dropping the bytes nothing refers to"""
+        old = self.names
+        names = bytearray()
+        at, length = self.folder_name_at, self.folder_name_len
+        parent = self.parent
+        for folder in range(len(parent)):
+            if parent[folder] != FREED:
+                start = at[folder]
+                at[folder] = len(names)
+                names += old[start:start + length[folder]]
+        at, length = self.file_name_at, self.file_name_len
+        file_folder = self.file_folder
+        for file in range(len(file_folder)):
+            if file_folder[file] != NONE:
+                start = at[file]
+                at[file] = len(names)
+                names += old[start:start + length[file]]
+        self.names = names
+        self.dead_bytes = 0
+    
+    def get_path(self, folder):
+        path = self._paths.get(folder)
+        if path is not None:
+            return path
+        
+        missing = []
+        while folder != NONE and folder not in self._paths:
+            missing.append(folder)
+            folder = self.parent[folder]
+        path = self._paths.get(folder)
+        if len(self._paths) + len(missing) > PATH_CACHE_SIZE:
+            self._paths.clear()
+        for folder in reversed(missing):
+            name = self.folder_name(folder)
+            path = name if path is None else path + "/" + name
+            self._paths[folder] = path
+        return path
+    
+    def get_depth(self, folder):
+        depth = 0
+        folder = self.parent[folder]
+        while folder != NONE:
+            depth += 1
+            folder = self.parent[folder]
+        return depth
+    
+    # Files
+    
+    def files(self, folder):
+        file = self.first_file[folder]
+        while file != NONE:
+            yield file
+            file = self.next_file[file]
+    
+    def find_file(self, folder, name):
+        found = self._found
+        if found[0] == folder and found[1] == name:
+            return found[2]
+        # file_table.find inlined: this runs for every file added
+        key_hash = _key_hash(folder, name)
+        table = self.file_table
+        slots = table.slots
+        hashes = self.file_hash
+        file_folder = self.file_folder
+        mask = table.mask
+        pos = key_hash & mask
+        while True:
+            file = slots[pos]
+            if file == EMPTY:
+                return NONE
+            if (file >= 0 and hashes[file] == key_hash and file_folder[file] == folder
+                    and self.file_name(file) == name):
+                self._found = (folder, name, file)
+                return file
+            pos = (pos + 1) & mask
+    
+    def _new_file(self, folder, name, size):
+        """Append a file to folder (no duplicate check, no totals update)"""
+        offset, length = self._store_name(name)
+        previous = self.last_file[folder]
+        values = (folder, NONE, previous, offset, length, _key_hash(folder, name), size)
+        columns = (self.file_folder, self.next_file, self.prev_file, self.file_name_at,
+                   self.file_name_len, self.file_hash, self.file_size)
+        file = self._free_file
+        if file == NONE:
+            file = len(self.file_folder)
+            for column, value in zip(columns, values):
+                column.append(value)
+        else:
+            self._free_file = self.next_file[file]
+            for column, value in zip(columns, values):
+                column[file] = value
+        
+        if previous == NONE:
+            self.first_file[folder] = file
+        else:
+            self.next_file[previous] = file
+        self.last_file[folder] = file
+        self.file_count[folder] += 1
+        self.file_table.add(file)
+        return file
+    
+    def add_file(self, folder, name, size=0):
+        if self.find_file(folder, name) != NONE:
+            return False
+        self._new_file(folder, name, size)
+        ordered = self._sorted.get(folder)
+        if ordered is not None:
+            insort(ordered, name, key=str.lower)
+        self._add_totals(folder, 0, 1, size)
+        return True
+    
+    def add_files(self, folder, files):
+        """Add (name, size) pairs not in folder yet, with one totals update"""
+        ordered = self._sorted.get(folder)
+        total = 0
+        for name, size in files:
+            self._new_file(folder, name, size)
+            if ordered is not None:
+                insort(ordered, name, key=str.lower)
+            total += size
+        if files:
+            self._add_totals(folder, 0, len(files), total)
+    
+    def remove_file(self, folder, name):
+        file = self.find_file(folder, name)
+        if file == NONE:
+            return False
+        previous, following = self.prev_file[file], self.next_file[file]
+        if previous == NONE:
+            self.first_file[folder] = following
+        else:
+            self.next_file[previous] = following
+        if following == NONE:
+            self.last_file[folder] = previous
+        else:
+            self.prev_file[following] = previous
+        self.file_count[folder] -= 1
+        self.file_table.remove(file)
+        self._found = (NONE, None, NONE)
+        
+        ordered = self._sorted.get(folder)
+        if ordered is not None:
+            i = bisect_left(ordered, name.lower(), key=str.lower)
+            while ordered[i] != name:  # names equal ignoring case
+                i += 1
+            del ordered[i]
+        self._add_totals(folder, 0, -1, -self.file_size[file])
+        
+        # The row is reused by the next new file; its name bytes are
+        # dropped when the buffer is compacted
+        self.file_folder[file] = NONE
+        self.next_file[file] = self._free_file
+        self._free_file = file
+        self.dead_bytes += self.file_name_len[file]
+        self._compact_names_if_needed()
+        return True
+    
+    def sorted_files(self, folder):
+        ordered = self._sorted.get(folder)
+        if ordered is None:
+            ordered = self._sorted[folder] = sorted(
+                (self.file_name(file) for file in self.files(folder)), key=str.lower)
+        return ordered
+    
+    @classmethod
+    def from_snapshot(cls, snapshot, folder_fields, file_fields):
+        """Build a tree from a snapshot's arrays. Folder ids equal the
+        snapshot's folder numbers (both are breadth-first)"""
+        folders = snapshot.folders
+        files = snapshot.files
+        string = snapshot.string
+        tree = cls(string(folders[1]))
+        for number in range(1, snapshot.meta['folders']):
+            base = number * folder_fields
+            tree._new_folder(folders[base], string(folders[base + 1]))
+        sizes = snapshot.file_sizes
+        for number in range(snapshot.meta['folders']):
+            base = number * folder_fields
+            first, count = folders[base + 4], folders[base + 5]
+            for n in range(first, first + count):
+                tree._new_file(number, string(files[n * file_fields]), sizes[n] if sizes is not None else 0)
+        
+        totals = snapshot.totals
+        tree.total_folders = array('I', totals[0::2])
+        tree.total_files = array('I', totals[1::2])
+        if snapshot.folder_bytes is not None:
+            tree.total_bytes = array('Q', snapshot.folder_bytes)
+        return tree
+
+
+class CompactFolder:
+    """Handle on one folder of a CompactTree, with the FolderTree API.
+    Handles are created on demand and compare equal by folder id"""
+    
+    __slots__ = ('store', 'index')
+    
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+    
+    def __eq__(self, other):
+        return (isinstance(other, CompactFolder) and other.index == self.index
+                and other.store is self.store)
+    
+    def __hash__(self):
+        return self.index
+    
+    def __repr__(self):
+        return f"<CompactFolder {self.get_path()!r}>"
+    
+    @classmethod
+    def from_snapshot(cls, snapshot, folder_fields, file_fields):
+        """Root handle of a CompactTree built from a snapshot"""
+        return CompactTree.from_snapshot(snapshot, folder_fields, file_fields).root
+    
+    @property
+    def name(self):
+        return self.store.folder_name(self.index)
+    
+    @property
+    def folder_id(self):
+        return self.index
+    
+    @property
+    def parent(self):
+        parent = self.store.parent[self.index]
+        return None if parent == NONE else CompactFolder(self.store, parent)
+    
+    @property
+    def subfolders(self):
+        return [CompactFolder(self.store, child) for child in self.store.subfolders(self.index)]
+    
+    @property
+    def files(self):
+        store = self.store
+        return [store.file_name(file) for file in store.files(self.index)]
+    
+    @property
+    def total_folders(self):
+        return self.store.total_folders[self.index]
+    
+    @property
+    def total_files(self):
+        return self.store.total_files[self.index]
+    
+    @property
+    def total_bytes(self):
+        return self.store.total_bytes[self.index]
+    
+    def add_folder(self, folder_name):
+        return CompactFolder(self.store, self.store.add_folder(self.index, folder_name))
+    
+    def get_subfolder(self, folder_name):
+        """Return the direct subfolder with this name, or None"""
+        child = self.store.get_subfolder(self.index, folder_name)
+        return None if child == NONE else CompactFolder(self.store, child)
+    
+    def has_file(self, filename):
+        return self.store.find_file(self.index, filename) != NONE
+    
+    def add_file(self, filename, size=0):
+        return self.store.add_file(self.index, filename, size)
+    
+    def add_files(self, files):
+        """Add (filename, size) pairs for names not in this folder yet"""
+        self.store.add_files(self.index, files)
+    
+    def remove_file(self, filename):
+        return self.store.remove_file(self.index, filename)
+    
+    def file_size(self, filename):
+        """Size recorded for a file in this folder (0 if unknown)"""
+        file = self.store.find_file(self.index, filename)
+        return 0 if file == NONE else self.store.file_size[file]
+    
+    def sorted_files(self):
+        """Files ordered by name ignoring case, kept in order once built"""
+        return self.store.sorted_files(self.index)
+    
+    def find_folder(self, path):
+        """Find folder by path like 'Documents/Projects'"""
+        if not path or path == self.name:
+            return self
+        
+        current = self.index
+        for part in path.split('/'):
+            current = self.store.get_subfolder(current, part)
+            if current == NONE:
+                return None
+        return CompactFolder(self.store, current)
+    
+    def get_path(self):
+        """Get full path from root"""
+        return self.store.get_path(self.index)
+    
+    def get_depth(self):
+        return self.store.get_depth(self.index)
+    
+    def rename(self, new_name):
+        self.store.rename(self.index, new_name)
+    
+    def move_to(self, new_parent):
+        return self.store.move_to(self.index, new_parent.index)
+    
+    def remove_subfolder(self, child):
+        return self.store.remove_subfolder(self.index, child.index)
+    
+    def get_statistics(self):
+        """Folder, file and byte totals of this subtree, in O(1)"""
+        return {'folders': self.total_folders, 'files': self.total_files,
+                'bytes': self.total_bytes}
+    
+    def check_statistics(self):
+        """Recount every subtree and compare with the stored totals.
+        Returns the paths whose totals disagree (empty when consistent)"""
+        store = self.store
+        errors = []
+        order = [self.index]
+        for folder in order:
+            order.extend(store.subfolders(folder))
+        counted = {}
+        for folder in reversed(order):
+            totals = [1, 0, 0]
+            for file in store.files(folder):
+                totals[1] += 1
+                totals[2] += store.file_size[file]
+            for child in store.subfolders(folder):
+                child_totals = counted.pop(child)
+                for i in range(3):
+                    totals[i] += child_totals[i]
+            counted[folder] = totals
+            stored = [store.total_folders[folder], store.total_files[folder],
+                      store.total_bytes[folder]]
+            if totals != stored or store.file_count[folder] != sum(1 for _ in store.files(folder)):
+                errors.append(store.get_path(folder))
+        return errors
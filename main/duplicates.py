@@ -0,0 +1,241 @@
+# Duplicate content finder for the File Organizer
+# Works on files imported from disk, which have a size and a real path.
+# Candidates are narrowed in rounds, each more expensive than the last:
+# same size, then the same hash of the first and last EDGE_BLOCK bytes,
+# then the same digest of the whole content. Hashing runs in a process
+# pool; whole files are read through mmap in CHUNK_SIZE slices. Digests
+# are cached by (path, size, mtime), so a re-run only reads the files
+# that changed
+
+import hashlib
+import json
+import mmap
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+EDGE_BLOCK = 64 * 1024
+CHUNK_SIZE = 1 << 20
+CACHE_VERSION = 1
+# Below both of these a pool costs more to start than it saves
+PARALLEL_MIN_FILES = 64
+PARALLEL_MIN_BYTES = 64 << 20
+
+
+def edge_digest(path):
+    """Hash of the first and last EDGE_BLOCK bytes. For files of up to
+    2 * EDGE_BLOCK bytes that is the whole content"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as source:
+        size = os.fstat(source.fileno()).st_size
+        digest.update(source.read(EDGE_BLOCK))
+        if size > EDGE_BLOCK:
+            source.seek(max(EDGE_BLOCK, size - EDGE_BLOCK))
+            digest.update(source.read(EDGE_BLOCK))
+    return digest.hexdigest()
+
+def full_digest(path):
+    """Hash of the whole content, read through mmap one chunk at a time"""
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as source:
+        size = os.fstat(source.fileno()).st_size
+        if size:
+            with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mapped, 'madvise'):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                view = memoryview(mapped)
+                try:
+                    for start in range(0, size, CHUNK_SIZE):
+                        digest.update(view[start:start + CHUNK_SIZE])
+                finally:
+                    view.release()
+    return digest.hexdigest()
+
+HASHERS = {'edge': edge_digest, 'full': full_digest}
+
+def _hash_job(job):
+    """Pool worker: (kind, path) -> (digest, None) or (None, error)"""
+    kind, path = job
+    try:
+        return HASHERS[kind](path), None
+    except (OSError, ValueError) as error:
+        return None, str(error)
+
+
+class DigestCache:
+    """Edge and full digests by real path, valid while the file keeps
+    the size and mtime they were computed for. Saved as JSON"""
+    
+    KINDS = ('edge', 'full')
+    
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}  # real path -> [size, mtime, edge digest, full digest]
+        self.hits = 0
+        self._changed = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as source:
+                    data = json.load(source)
+                if data.get('version') == CACHE_VERSION:
+                    self.entries = data['entries']
+            except (OSError, ValueError, KeyError):
+                self.entries = {}  # unreadable cache: start over
+    
+    def get(self, path, size, mtime, kind):
+        entry = self.entries.get(path)
+        if entry is None or entry[0] != size or entry[1] != mtime:
+            return None
+        digest = entry[2 + self.KINDS.index(kind)]
+        if digest is not None:
+            self.hits += 1
+        return digest
+    
+    def put(self, path, size, mtime, kind, digest):
+        entry = self.entries.get(path)
+        if entry is None or entry[0] != size or entry[1] != mtime:
+            entry = self.entries[path] = [size, mtime, None, None]
+        entry[2 + self.KINDS.index(kind)] = digest
+        self._changed = True
+    
+    def save(self):
+        """Write the cache (atomically) if anything was added"""
+        if not (self.path and self._changed):
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as out:
+            json.dump({'version': CACHE_VERSION, 'entries': self.entries}, out)
+        os.replace(tmp_path, self.path)
+        self._changed = False
+
+
+class _Hasher:
+    """Runs hash jobs in this process or, for large batches, in a
+    process pool started on first need and shared by both rounds"""
+    
+    def __init__(self, workers, cancel):
+        self.workers = workers or os.cpu_count() or 1
+        self.cancel = cancel
+        self._pool = None
+    
+    def run(self, kind, files):
+        """Yield (file, digest, error) for each (path, size, mtime, ...) file"""
+        jobs = [(kind, file[0]) for file in files]
+        total_bytes = sum(file[1] for file in files)
+        parallel = self.workers > 1 and (len(jobs) >= PARALLEL_MIN_FILES
+                                         or total_bytes >= PARALLEL_MIN_BYTES)
+        if parallel and self._pool is None:
+            # Spawned, not forked: the organizer's process has threads
+            # (journal flusher, GUI worker) that a fork would copy mid-step
+            self._pool = ProcessPoolExecutor(self.workers,
+                                             mp_context=multiprocessing.get_context('spawn'))
+        if parallel:
+            chunksize = max(1, len(jobs) // (self.workers * 8))
+            results = self._pool.map(_hash_job, jobs, chunksize=chunksize)
+        else:
+            results = map(_hash_job, jobs)
+        for file, (digest, error) in zip(files, results):
+            if self.cancel is not None and self.cancel.is_set():
+                return
+            yield file, digest, error
+    
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+
+def _groups_of(files, key):
+    """Groups of two or more files with equal key(file)"""
+    groups = {}
+    for file in files:
+        groups.setdefault(key(file), []).append(file)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def find_duplicates(files, cache=None, workers=None, min_size=1, cancel=None):
+    """Find files with equal content among (catalogue path, real path,
+    size) triples. Files sharing an inode count once: removing one of
+    them frees nothing. Returns a report with 'groups' (each with
+    'size', 'digest', 'files' and 'reclaimable' bytes, most reclaimable
+    first), 'reclaimable', 'candidates', 'hashed', 'cache_hits',
+    'errors' and 'cancelled'"""
+    cache = cache if cache is not None else DigestCache()
+    hits = cache.hits
+    report = {'groups': [], 'reclaimable': 0, 'candidates': 0,
+              'hashed': {'edge': 0, 'full': 0}, 'cache_hits': 0, 'errors': [], 'cancelled': False}
+    
+    # Round 1: the size recorded at import, then the size on disk now
+    # file = [real path, size, mtime, catalogue paths]
+    candidates = []
+    inodes = {}
+    for group in _groups_of((file for file in files if file[2] >= min_size), lambda file: file[2]):
+        for catalogue_path, real_path, _ in group:
+            try:
+                stat = os.stat(real_path)
+            except OSError as error:
+                report['errors'].append((catalogue_path, str(error)))
+                continue
+            same = inodes.get((stat.st_dev, stat.st_ino))
+            if same is not None:
+                same[3].append(catalogue_path)
+            elif stat.st_size >= min_size:
+                file = inodes[(stat.st_dev, stat.st_ino)] = [real_path, stat.st_size, stat.st_mtime,
+                                                             [catalogue_path]]
+                candidates.append(file)
+    report['candidates'] = len(candidates)
+    
+    hasher = _Hasher(workers, cancel)
+    digests = {}  # (id(file), kind) -> digest
+    
+    def hash_round(kind, groups):
+        """Digest every file of groups, from the cache where possible"""
+        missing = []
+        for group in groups:
+            for file in group:
+                digest = cache.get(file[0], file[1], file[2], kind)
+                if digest is None:
+                    missing.append(file)
+                else:
+                    digests[id(file), kind] = digest
+        for file, digest, error in hasher.run(kind, missing):
+            if digest is None:
+                report['errors'].append((file[3][0], error))
+                continue
+            digests[id(file), kind] = digest
+            cache.put(file[0], file[1], file[2], kind, digest)
+            report['hashed'][kind] += 1
+        if cancel is not None and cancel.is_set():
+            report['cancelled'] = True
+    
+    try:
+        # Round 2: first and last blocks, which settle small files outright
+        groups = _groups_of(candidates, lambda file: file[1])
+        hash_round('edge', groups)
+        groups = _groups_of([file for group in groups for file in group if (id(file), 'edge') in digests],
+                            lambda file: (file[1], digests[id(file), 'edge']))
+        
+        # Round 3: whole content, only where the edges left a doubt
+        large = [group for group in groups if group[0][1] > 2 * EDGE_BLOCK]
+        if not report['cancelled']:
+            hash_round('full', large)
+        final = [group for group in groups if group[0][1] <= 2 * EDGE_BLOCK]
+        final.extend(_groups_of([file for group in large for file in group if (id(file), 'full') in digests],
+                                lambda file: (file[1], digests[id(file), 'full'])))
+    finally:
+        hasher.close()
+        cache.save()
+    
+    for group in final:
+        size = group[0][1]
+        kind = 'full' if size > 2 * EDGE_BLOCK else 'edge'
+        report['groups'].append({
+            'size': size,
+            'digest': digests[id(group[0]), kind],
+            'files': sorted(path for file in group for path in file[3]),
+            'reclaimable': size * (len(group) - 1),
+        })
+    report['groups'].sort(key=lambda group: (-group['reclaimable'], group['files'][0]))
+    report['reclaimable'] = sum(group['reclaimable'] for group in report['groups'])
+    report['cache_hits'] = cache.hits - hits
+    return report
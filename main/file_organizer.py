@@ -1,179 +1,909 @@
-# File Organizer GUI Implementation
-# Gayathri's Role - Interface Builder
+# File Organizer backend: folder tree, file hash table and organizer
 # Group 8 - DSA Project
+# Run without arguments for the GUI (gui.py), with arguments or with
+# commands piped into stdin for the headless batch CLI (cli.py); tkinter
+# is only imported for the GUI
 
-import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+import gc
+import os
+import sys
+import threading
+import zlib
+from array import array
+from bisect import bisect_left, insort
+from itertools import count
+
+from compact_index import (CompactExtensionIndex, CompactLocations, CompactPrefixIndex,
+                           CompactTrigramIndex, NameTable)
+from compact_tree import DELETED, EMPTY, HASH_MASK, CompactTree
+from gc_pause import gc_paused
+from snapshot import read_snapshot, write_snapshot
+from journal import Journal, compact_journal, replay_journal
+from metadata import MetadataIndex, bucket_range, file_type
+from metrics import Metrics, instrument_organizer, uninstrument_organizer
+from query import parse_query, run_query
+from search_index import ExtensionIndex, NameLocations, PrefixTrie, TrigramIndex
+
+SNAPSHOT_PATH = os.path.join(os.path.expanduser("~"), ".file_organizer.snap")
+JOURNAL_PATH = os.path.join(os.path.expanduser("~"), ".file_organizer.journal")
+DIGEST_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".file_organizer.digests")
+COMPLETION_LIMIT = 10
 
 
 # Tree Implementation
 class FolderTree:
+    _LAZY_FIELDS = ('subfolders', 'files', '_children', '_file_names')
+    
+    # Cached path and depth. A cache is current while its stamp equals
+    # _epoch, which every rename or move bumps; stale caches are checked
+    # against the parent's path on next use and rebuilt only if it changed
+    _epoch = 0
+    _path = None
+    _parent_path = None
+    _depth = 0
+    _path_epoch = -1
+    # filename -> size in bytes, created when the first sized file arrives
+    _sizes = None
+    # Files ordered by name ignoring case, built on first request
+    _sorted_files = None
+    # Held while a snapshot node is filled in, so a GUI read and a
+    # worker thread never load the same node twice or see it half done
+    _load_lock = threading.RLock()
+    
     def __init__(self, name, parent=None):
         self.name = name
         self.parent = parent
+        # Id used in hash keys: unlike the path it survives renames and
+        # moves. Ids come from one counter per tree
+        self._ids = parent._ids if parent is not None else count()
+        self.folder_id = next(self._ids)
         self.subfolders = []
         self.files = []
+        # Hash indexes kept next to the ordered lists used for display
+        self._children = {}
+        self._file_names = set()
+        # Totals for the subtree rooted here (this folder included),
+        # kept up to date along the ancestor chain
+        self.total_folders = 1
+        self.total_files = 0
+        self.total_bytes = 0
+    
+    def __getattr__(self, attr):
+        """Nodes loaded from a snapshot fill in their contents on first use"""
+        if attr not in self._LAZY_FIELDS:
+            raise AttributeError(attr)
+        with FolderTree._load_lock:
+            # Another thread may have loaded the node while this one waited
+            if attr not in self.__dict__:
+                loader = self.__dict__.get('_loader')
+                if loader is None:
+                    raise AttributeError(attr)
+                loader.load_folder(self)
+                del self._loader
+        return self.__dict__[attr]
+    
+    def _add_totals(self, folders, files, size):
+        """Add to the subtree totals of this folder and its ancestors"""
+        node = self
+        while node is not None:
+            node.total_folders += folders
+            node.total_files += files
+            node.total_bytes += size
+            node = node.parent
     
     def add_folder(self, folder_name):
         new_folder = FolderTree(folder_name, self)
         self.subfolders.append(new_folder)
+        self._children.setdefault(folder_name, new_folder)
+        self._add_totals(1, 0, 0)
         return new_folder
     
-    def add_file(self, filename):
-        if filename not in self.files:
+    def get_subfolder(self, folder_name):
+        """Return the direct subfolder with this name, or None"""
+        return self._children.get(folder_name)
+    
+    def has_file(self, filename):
+        return filename in self._file_names
+    
+    def add_file(self, filename, size=0):
+        if filename not in self._file_names:
+            self._file_names.add(filename)
             self.files.append(filename)
+            if size:
+                if self._sizes is None:
+                    self._sizes = {}
+                self._sizes[filename] = size
+            if self._sorted_files is not None:
+                insort(self._sorted_files, filename, key=str.lower)
+            self._add_totals(0, 1, size)
             return True
         return False
     
+    def add_files(self, files):
+        """Add (filename, size) pairs for names not in this folder yet,
+        updating the totals once for all of them"""
+        total = 0
+        for filename, size in files:
+            self._file_names.add(filename)
+            self.files.append(filename)
+            if size:
+                if self._sizes is None:
+                    self._sizes = {}
+                self._sizes[filename] = size
+                total += size
+            if self._sorted_files is not None:
+                insort(self._sorted_files, filename, key=str.lower)
+        if files:
+            self._add_totals(0, len(files), total)
+    
     def remove_file(self, filename):
-        if filename in self.files:
+        if filename in self._file_names:
+            self._file_names.discard(filename)
             self.files.remove(filename)
+            size = self._sizes.pop(filename, 0) if self._sizes else 0
+            if self._sorted_files is not None:
+                ordered = self._sorted_files
+                i = bisect_left(ordered, filename.lower(), key=str.lower)
+                while ordered[i] != filename:  # names equal ignoring case
+                    i += 1
+                del ordered[i]
+            self._add_totals(0, -1, -size)
             return True
         return False
     
+    def sorted_files(self):
+        """Files ordered by name ignoring case. The list is sorted once
+        and then kept in order by add_file and remove_file"""
+        if self._sorted_files is None:
+            self._sorted_files = sorted(self.files, key=str.lower)
+        return self._sorted_files
+    
+    def file_size(self, filename):
+        """Size recorded for a file in this folder (0 if unknown)"""
+        return self._sizes.get(filename, 0) if self._sizes else 0
+    
+    def get_statistics(self):
+        """Folder, file and byte totals of this subtree, in O(1)"""
+        return {'folders': self.total_folders, 'files': self.total_files,
+                'bytes': self.total_bytes}
+    
+    def check_statistics(self):
+        """Recount every subtree and compare with the stored totals.
+        Returns the paths whose totals disagree (empty when consistent)"""
+        errors = []
+        counted = {}  # node -> [folders, files, bytes]
+        order = [self]
+        for node in order:
+            order.extend(node.subfolders)
+        for node in reversed(order):
+            sizes = node._sizes or {}
+            totals = [1, len(node.files), sum(sizes.get(name, 0) for name in node.files)]
+            for child in node.subfolders:
+                child_totals = counted.pop(child)
+                for i in range(3):
+                    totals[i] += child_totals[i]
+            counted[node] = totals
+            if totals != [node.total_folders, node.total_files, node.total_bytes]:
+                errors.append(node.get_path())
+        return errors
+    
     def find_folder(self, path):
         """Find folder by path like 'Documents/Projects'"""
         if not path or path == self.name:
             return self
         
-        parts = path.split('/')
         current = self
-        
-        for part in parts:
-            found = False
-            for subfolder in current.subfolders:
-                if subfolder.name == part:
-                    current = subfolder
-                    found = True
-                    break
-            if not found:
+        for part in path.split('/'):
+            current = current._children.get(part)
+            if current is None:
                 return None
         return current
     
     def get_path(self):
         """Get full path from root"""
-        if self.parent is None:
-            return self.name
-        return self.parent.get_path() + "/" + self.name
+        if self._path_epoch != FolderTree._epoch:
+            self._refresh_path()
+        return self._path
+    
+    def get_depth(self):
+        """Number of folders above this one (0 for the root)"""
+        if self._path_epoch != FolderTree._epoch:
+            self._refresh_path()
+        return self._depth
+    
+    def _refresh_path(self):
+        epoch = FolderTree._epoch
+        stale = []
+        node = self
+        while node is not None and node._path_epoch != epoch:
+            stale.append(node)
+            node = node.parent
+        
+        # Top down, so each parent is current before its child
+        for node in reversed(stale):
+            parent = node.parent
+            if parent is None:
+                node._path = node.name
+                node._depth = 0
+            elif node._path is None or node._parent_path is not parent._path:
+                node._path = parent._path + "/" + node.name
+                node._parent_path = parent._path
+                node._depth = parent._depth + 1
+            node._path_epoch = epoch
+    
+    def rename(self, new_name):
+        """Rename this folder. Paths below it are refreshed on next use"""
+        if self.parent is not None:
+            self.parent._unlink_child(self)
+            self.parent._children.setdefault(new_name, self)
+        self.name = new_name
+        self._path = None
+        FolderTree._epoch += 1
+    
+    def move_to(self, new_parent):
+        """Move this folder under new_parent. False if that is the folder
+        itself or one of its descendants"""
+        node = new_parent
+        while node is not None:
+            if node is self:
+                return False
+            node = node.parent
+        
+        totals = (self.total_folders, self.total_files, self.total_bytes)
+        if self.parent is not None:
+            self.parent._unlink_child(self)
+            self.parent.subfolders.remove(self)
+            self.parent._add_totals(-totals[0], -totals[1], -totals[2])
+        new_parent.subfolders.append(self)
+        new_parent._children.setdefault(self.name, self)
+        new_parent._add_totals(*totals)
+        self.parent = new_parent
+        self._path = None
+        FolderTree._epoch += 1
+        return True
+    
+    def remove_subfolder(self, child):
+        """Detach child and its subtree, subtracting its totals. Parent
+        links inside the subtree are cleared, so it is freed by reference
+        counting even after gc.freeze()"""
+        if child.parent is not self:
+            return False
+        self._unlink_child(child)
+        self.subfolders.remove(child)
+        self._add_totals(-child.total_folders, -child.total_files, -child.total_bytes)
+        order = [child]
+        for node in order:
+            node.parent = None
+            order.extend(node.subfolders)
+        return True
+    
+    def _unlink_child(self, child):
+        """Drop child from the name index, keeping a same-named sibling"""
+        if self._children.get(child.name) is not child:
+            return
+        del self._children[child.name]
+        for other in self.subfolders:
+            if other is not child and other.name == child.name:
+                self._children[child.name] = other
+                break
+
+# Hash functions for FileHashTable (keys are lowercased before hashing)
+def fnv1a_hash(key):
+    """64-bit FNV-1a, stable across processes"""
+    h = 0xcbf29ce484222325
+    for byte in key.encode('utf-8'):
+        h ^= byte
+        h = (h * 0x100000001b3) & 0xFFFFFFFFFFFFFFFF
+    return h
+
+def crc32_hash(key):
+    """CRC-32 in C, stable across processes"""
+    return zlib.crc32(key.encode('utf-8'))
+
+def additive_hash(key):
+    """Original sum-of-ord hash, kept for comparison benchmarks"""
+    return sum(ord(char) for char in key)
+
+HASH_FUNCTIONS = {
+    'builtin': hash,  # SipHash in C, fastest; randomized per process
+    'fnv1a': fnv1a_hash,
+    'crc32': crc32_hash,
+    'additive': additive_hash,
+}
 
 # Hash Table Implementation
 class FileHashTable:
-    def __init__(self, size=10):
-        self.size = size
-        self.table = [None] * size
+    MIN_SIZE = 8
+    MAX_LOAD = 0.7  # live entries + tombstones
+    ROBIN_HOOD_MAX_LOAD = 0.9
+    MAX_TOMBSTONES = 0.2  # clean up by rehashing past this share of slots
+    MIN_LOAD = 0.15  # shrink below this share of live entries
+    PROBING_MODES = ('linear', 'robin_hood')
+    KEY_FIELDS = ('filename', 'filepath', 'folder')
+    
+    def __init__(self, size=10, hash_func='builtin', probing='linear', max_load=None,
+                 key_by='filename'):
+        """size is rounded up to a power of two; hash_func is a name
+        from HASH_FUNCTIONS or any callable taking the lowercased key.
+        probing='robin_hood' keeps probe distances short and even, so
+        the table can run at a higher max_load. key_by='filepath' keys
+        entries by full path so equal names in different folders coexist.
+        key_by='folder' stores the folder node instead of a path: insert
+        takes the node, and entries are keyed '<folder_id>/<filename>',
+        so renaming or moving a folder changes no entry"""
+        if key_by not in self.KEY_FIELDS:
+            raise ValueError(f"Unknown key field '{key_by}'")
+        self.key_by = key_by
+        self.location_field = 'folder' if key_by == 'folder' else 'filepath'
+        if probing not in self.PROBING_MODES:
+            raise ValueError(f"Unknown probing mode '{probing}'")
+        self.probing = probing
+        self.robin_hood = probing == 'robin_hood'
+        if max_load is None:
+            max_load = self.ROBIN_HOOD_MAX_LOAD if self.robin_hood else self.MAX_LOAD
+        if not 0 < max_load < 1:
+            raise ValueError("max_load must be between 0 and 1")
+        self.max_load = max_load
+        
+        if isinstance(hash_func, str):
+            self.hash_name = hash_func
+            hash_func = HASH_FUNCTIONS[hash_func]
+        else:
+            self.hash_name = getattr(hash_func, '__name__', 'custom')
+        self._hash = hash_func
+        self.size = self.capacity_for(size)
+        self.min_size = self.size  # never shrink below the requested size
+        self.mask = self.size - 1
+        self.table = [None] * self.size
+        self.distances = [0] * self.size if self.robin_hood else None
         self.count = 0
+        self.tombstones = 0
         self.collision_count = 0
     
+    @classmethod
+    def capacity_for(cls, size):
+        """Smallest power of two >= size"""
+        capacity = cls.MIN_SIZE
+        while capacity < size:
+            capacity <<= 1
+        return capacity
+    
+    def load_factor(self):
+        """Share of slots in use, tombstones included"""
+        return (self.count + self.tombstones) / self.size
+    
+    def reserve(self, count):
+        """Grow once so that count entries fit without further rehashing"""
+        needed = self.capacity_for(int(count / self.max_load) + 1)
+        if needed > self.size:
+            self.resize(needed)
+    
     def hash_function(self, filename):
-        """Simple hash function"""
-        total = sum(ord(char) for char in filename.lower())
-        return total % self.size
+        """Home bucket of filename"""
+        return self._hash(filename.lower()) & self.mask
     
     def linear_probe(self, key, attempt):
         """Linear probing: h(k) + i"""
-        return (self.hash_function(key) + attempt) % self.size
+        return (self.hash_function(key) + attempt) & self.mask
+    
+    def _key(self, filename, location):
+        if self.key_by == 'folder':
+            return f"{location.folder_id}/{filename}".lower()
+        return (location if self.key_by == 'filepath' else filename).lower()
     
-    def insert(self, filename, filepath):
-        """Insert file with collision handling"""
-        if self.count >= self.size * 0.7:  # Rehash if 70% full
+    def _new_entry(self, filename, location, key):
+        return {
+            'filename': filename,
+            self.location_field: location,
+            'key': key,
+            'deleted': False
+        }
+    
+    def insert(self, filename, location, replace=True):
+        """Insert file with collision handling. location is the full path,
+        or the folder node with key_by='folder'. With replace=False an
+        existing entry is left alone and False is returned"""
+        if self.count + self.tombstones >= self.size * self.max_load:
             self.rehash()
+        if self.robin_hood:
+            return self._insert_robin_hood(filename, location, replace)
         
+        key = self._key(filename, location)
+        table = self.table
+        mask = self.mask
+        pos = self._hash(key) & mask
+        reuse = None  # first tombstone on the probe path
         attempt = 0
         while attempt < self.size:
-            pos = self.linear_probe(filename, attempt)
+            entry = table[pos]
             
-            # If slot is empty, insert here
-            if self.table[pos] is None:
-                file_info = {
-                    'filename': filename,
-                    'filepath': filepath,
-                    'deleted': False
-                }
-                self.table[pos] = file_info
-                self.count += 1
-                if attempt > 0:
-                    self.collision_count += 1
-                return True
+            if entry is None:
+                break
             
-            # If same filename, update
-            if (self.table[pos] and 
-                self.table[pos]['filename'].lower() == filename.lower() and 
-                not self.table[pos]['deleted']):
-                self.table[pos]['filepath'] = filepath
+            if entry['deleted']:
+                if reuse is None:
+                    reuse = pos
+            elif entry['key'] == key:
+                if not replace:
+                    return False
+                # If same key, update
+                entry['filename'] = filename
+                entry[self.location_field] = location
                 return True
             
+            pos = (pos + 1) & mask
             attempt += 1
+        else:
+            if reuse is None:
+                return False  # Table full
         
-        return False  # Table full
+        if reuse is not None:
+            pos = reuse
+            self.tombstones -= 1
+        self.table[pos] = self._new_entry(filename, location, key)
+        self.count += 1
+        if attempt > 0:
+            self.collision_count += 1
+        return True
     
-    def search(self, filename):
-        """Search for file"""
+    def _insert_robin_hood(self, filename, location, replace):
+        """Insert, taking slots from entries closer to their home bucket"""
+        key = self._key(filename, location)
+        table = self.table
+        distances = self.distances
+        pos = self._hash(key) & self.mask
+        distance = 0
+        # max_load < 1 guarantees an empty slot ends the scan
+        while table[pos] is not None:
+            entry = table[pos]
+            if entry['key'] == key:
+                if not replace:
+                    return False
+                entry['filename'] = filename
+                entry[self.location_field] = location
+                return True
+            if distances[pos] < distance:
+                break  # key would have been found by now
+            pos = (pos + 1) & self.mask
+            distance += 1
+        
+        self._place_robin_hood(self._new_entry(filename, location, key), pos, distance)
+        self.count += 1
+        if distance > 0:
+            self.collision_count += 1
+        return True
+    
+    def _place_robin_hood(self, entry, pos, distance):
+        """Put entry at pos, pushing richer entries one slot further on"""
+        table = self.table
+        distances = self.distances
+        while table[pos] is not None:
+            if distances[pos] < distance:
+                table[pos], entry = entry, table[pos]
+                distances[pos], distance = distance, distances[pos]
+            pos = (pos + 1) & self.mask
+            distance += 1
+        table[pos] = entry
+        distances[pos] = distance
+    
+    def _find_slot(self, name):
+        """Return (slot, probes) for a live entry, slot is None if absent"""
+        key = name.lower()
+        pos = self._hash(key) & self.mask
+        if self.robin_hood:
+            table = self.table
+            distances = self.distances
+            attempt = 0
+            while True:
+                entry = table[pos]
+                # Stop at a slot whose entry sits closer to home than we are
+                if entry is None or distances[pos] < attempt:
+                    return None, attempt + 1
+                if entry['key'] == key:
+                    return pos, attempt + 1
+                pos = (pos + 1) & self.mask
+                attempt += 1
+        
+        table = self.table
+        mask = self.mask
         attempt = 0
         while attempt < self.size:
-            pos = self.linear_probe(filename, attempt)
+            entry = table[pos]
             
-            if self.table[pos] is None:
-                return None
+            if entry is None:
+                return None, attempt + 1
             
-            if (self.table[pos]['filename'].lower() == filename.lower() and 
-                not self.table[pos]['deleted']):
-                return self.table[pos]
+            if entry['key'] == key and not entry['deleted']:
+                return pos, attempt + 1
             
+            pos = (pos + 1) & mask
             attempt += 1
         
-        return None
+        return None, attempt
+    
+    def search(self, filename):
+        """Search for file by filename, by full path with key_by='filepath'
+        or by '<folder_id>/<filename>' with key_by='folder'"""
+        pos, _ = self._find_slot(filename)
+        return None if pos is None else self.table[pos]
+    
+    def probe_length(self, filename):
+        """Number of slots a search for filename examines"""
+        return self._find_slot(filename)[1]
     
     def delete(self, filename):
         """Delete file (lazy deletion)"""
-        attempt = 0
-        while attempt < self.size:
-            pos = self.linear_probe(filename, attempt)
-            
-            if self.table[pos] is None:
-                return False
-            
-            if (self.table[pos]['filename'].lower() == filename.lower() and 
-                not self.table[pos]['deleted']):
-                self.table[pos]['deleted'] = True
-                self.count -= 1
-                return True
-            
-            attempt += 1
+        pos, _ = self._find_slot(filename)
+        if pos is None:
+            return False
         
-        return False
+        entry = self.table[pos]
+        entry['deleted'] = True
+        entry[self.location_field] = None  # a tombstone keeps no folder alive
+        self.count -= 1
+        if self.robin_hood:
+            self._backward_shift(pos)
+        else:
+            self.tombstones += 1
+        
+        if self.size > self.min_size and self.count < self.size * self.MIN_LOAD:
+            self.resize(self.count * 2)
+        elif self.tombstones > self.size * self.MAX_TOMBSTONES:
+            self.resize(self.size)
+        return True
+    
+    def _backward_shift(self, pos):
+        """Close the gap at pos by moving the following run back a slot"""
+        table = self.table
+        distances = self.distances
+        nxt = (pos + 1) & self.mask
+        while table[nxt] is not None and distances[nxt] > 0:
+            table[pos] = table[nxt]
+            distances[pos] = distances[nxt] - 1
+            pos = nxt
+            nxt = (nxt + 1) & self.mask
+        table[pos] = None
+        distances[pos] = 0
     
     def rehash(self):
-        """Rehash when table gets full"""
+        """Rehash when table gets full, or just drop tombstones if they
+        are what filled it"""
+        if self.count >= self.size * self.max_load / 2:
+            self.resize(self.size * 2)
+        else:
+            self.resize(self.size)
+    
+    def resize(self, size):
+        """Move live entries into a fresh table of at least size slots"""
         old_table = self.table
-        self.size *= 2
+        self.size = max(self.capacity_for(size), self.min_size)
+        self.mask = self.size - 1
         self.table = [None] * self.size
-        old_count = self.count
-        self.count = 0
+        self.tombstones = 0
         self.collision_count = 0
         
-        # Reinsert all items
+        if self.robin_hood:
+            self.distances = [0] * self.size
+            for item in old_table:
+                if item is not None:
+                    self._place_robin_hood(item, self._hash(item['key']) & self.mask, 0)
+            return
+        
+        # Reinsert all items, keeping the same entry dicts
         for item in old_table:
             if item and not item['deleted']:
-                self.insert(item['filename'], item['filepath'])
+                pos = self._hash(item['key']) & self.mask
+                if self.table[pos] is not None:
+                    self.collision_count += 1
+                    while self.table[pos] is not None:
+                        pos = (pos + 1) & self.mask
+                self.table[pos] = item
+
+
+class CompactFileTable(FileHashTable):
+    """FileHashTable over the file rows of a CompactTree, for compact
+    storage. A slot holds a file id instead of an entry dict, and the
+    key hash of each file sits in an array indexed by file id, so an
+    entry costs a few bytes; entry dicts are built from the tree when
+    read. Keys are '<folder_id>/<filename>' as with key_by='folder'.
+    A file goes into the tree before it is inserted, and is deleted
+    from the table before it leaves the tree. Linear probing only"""
+    PROBING_MODES = ('linear',)
+    
+    def __init__(self, store, size=10, hash_func='crc32', probing='linear', max_load=None):
+        super().__init__(size, hash_func, probing, max_load, key_by='folder')
+        self.store = store
+        self.slots = array('i', [EMPTY]) * self.size  # file ids
+        self.key_hashes = array('I')  # file id -> hash of its key
+        self.table = _SlotEntries(self)
+    
+    def _file_key(self, file):
+        store = self.store
+        return f"{store.file_folder[file]}/{store.file_name(file)}".lower()
+    
+    def insert(self, filename, location, replace=True):
+        """Insert the file filename of the folder location, which must
+        already be in the tree"""
+        return self.insert_file(self.store.find_file(location.index, filename), replace,
+                                self._key(filename, location))
+    
+    def insert_file(self, file, replace=True, key=None):
+        """Insert the tree's file row file (key is its key, if known)"""
+        if self.count + self.tombstones >= self.size * self.max_load:
+            self.rehash()
+        if key is None:
+            key = self._file_key(file)
+        key_hash = self._hash(key) & HASH_MASK
+        slots = self.slots
+        key_hashes = self.key_hashes
+        while len(key_hashes) <= file:  # rows are numbered in order
+            key_hashes.append(0)
+        mask = self.mask
+        pos = key_hash & mask
+        reuse = None  # first tombstone on the probe path
+        attempt = 0
+        while attempt < self.size:
+            other = slots[pos]
+            if other == EMPTY:
+                break
+            if other == DELETED:
+                if reuse is None:
+                    reuse = pos
+            elif key_hashes[other] == key_hash and self._file_key(other) == key:
+                if not replace:
+                    return False
+                # If same key, the slot moves to the new row
+                slots[pos] = file
+                key_hashes[file] = key_hash
+                return True
+            pos = (pos + 1) & mask
+            attempt += 1
+        else:
+            if reuse is None:
+                return False  # Table full
+        
+        key_hashes[file] = key_hash
+        if reuse is not None:
+            pos = reuse
+            self.tombstones -= 1
+        slots[pos] = file
+        self.count += 1
+        if attempt > 0:
+            self.collision_count += 1
+        return True
+    
+    def load_slots(self, slots, count):
+        """Use slots, file ids placed by linear probing with this table's
+        hash function, as the slot array (a snapshot's, for instance)"""
+        self.size = len(slots)
+        self.mask = self.size - 1
+        self.slots = array('i')
+        self.slots.frombytes(slots.tobytes())
+        self.count = count
+        self.tombstones = 0
+        file_key = self._file_key
+        hash_func = self._hash
+        self.key_hashes = array('I', [hash_func(file_key(file)) & HASH_MASK
+                                      for file in range(len(self.store.file_folder))])
+    
+    def _find_slot(self, name):
+        key = name.lower()
+        key_hash = self._hash(key) & HASH_MASK
+        slots = self.slots
+        key_hashes = self.key_hashes
+        mask = self.mask
+        pos = key_hash & mask
+        attempt = 0
+        while attempt < self.size:
+            file = slots[pos]
+            if file == EMPTY:
+                return None, attempt + 1
+            if file >= 0 and key_hashes[file] == key_hash and self._file_key(file) == key:
+                return pos, attempt + 1
+            pos = (pos + 1) & mask
+            attempt += 1
+        return None, attempt
+    
+    def delete(self, filename):
+        """Delete a file by key, leaving a tombstone"""
+        pos, _ = self._find_slot(filename)
+        if pos is None:
+            return False
+        self.slots[pos] = DELETED
+        self.count -= 1
+        self.tombstones += 1
+        if self.size > self.min_size and self.count < self.size * self.MIN_LOAD:
+            self.resize(self.count * 2)
+        elif self.tombstones > self.size * self.MAX_TOMBSTONES:
+            self.resize(self.size)
+        return True
+    
+    def resize(self, size):
+        """Move the live file ids into a fresh slot array of at least size slots"""
+        live = [file for file in self.slots if file >= 0]
+        self.size = max(self.capacity_for(size), self.min_size)
+        self.mask = mask = self.size - 1
+        self.slots = slots = array('i', [EMPTY]) * self.size
+        self.tombstones = 0
+        self.collision_count = 0
+        key_hashes = self.key_hashes
+        for file in live:
+            pos = key_hashes[file] & mask
+            if slots[pos] != EMPTY:
+                self.collision_count += 1
+                while slots[pos] != EMPTY:
+                    pos = (pos + 1) & mask
+            slots[pos] = file
+
+
+class _SlotEntries:
+    """A CompactFileTable's slots read as FileHashTable.table: entry
+    dicts decoded from the tree, None for empty slots"""
+    
+    def __init__(self, table):
+        self._table = table
+    
+    def __len__(self):
+        return self._table.size
+    
+    def __getitem__(self, pos):
+        file = self._table.slots[pos]
+        if file == EMPTY:
+            return None
+        if file == DELETED:
+            return {'filename': None, 'folder': None, 'key': None, 'deleted': True}
+        store = self._table.store
+        folder = store.file_folder[file]
+        filename = store.file_name(file)
+        return {'filename': filename, 'folder': store.folder(folder),
+                'key': f"{folder}/{filename}".lower(), 'deleted': False}
+    
+    def __iter__(self):
+        for pos in range(len(self)):
+            yield self[pos]
 
 # Main File Organizer Backend
 class FileOrganizer:
-    def __init__(self):
-        self.tree = FolderTree("Root")
-        self.hash_table = FileHashTable()
+    STORAGE_ENGINES = ('objects', 'compact')
+    
+    def __init__(self, storage='objects'):
+        """storage is 'objects' (a FolderTree node per folder, dict
+        entries, sets and trie nodes of names) or 'compact' (the tree,
+        hash table, name multimap and search indexes kept in arrays of
+        ids over one buffer of names each)"""
+        if storage not in self.STORAGE_ENGINES:
+            raise ValueError(f"Unknown storage engine '{storage}'")
+        self.storage = storage
+        self._build_indexes(CompactTree("Root").root if storage == 'compact' else FolderTree("Root"))
+        # Size and mtime of files imported from disk, for the largest,
+        # newest, modified-since and size histogram queries
+        self.metadata = MetadataIndex()
+        # Folder -> the real directory imported into it, for reading the
+        # content of imported files
+        self.import_roots = {}
+        self.snapshot = None
+        # Optional write-ahead journal; applied_lsn is the last record
+        # reflected in this state
+        self.journal = None
+        self.applied_lsn = 0
+        self.snapshot_path = None
+        # Hot-path metrics, off unless enable_metrics() is called
+        self.metrics = None
+    
+    def _build_indexes(self, tree):
+        """Empty file indexes over tree, of the kind self.storage uses"""
+        self.tree = tree
+        if self.storage == 'compact':
+            store = tree.store
+            names = NameTable()
+            self.hash_table = CompactFileTable(store)
+            self.locations = CompactLocations(store, names)
+            self.name_index = CompactTrigramIndex(names)
+            self.prefix_index = CompactPrefixIndex(names)
+            self.extension_index = CompactExtensionIndex(names)
+            return
+        # Primary index keyed by folder id and name, so equal names in
+        # different folders don't overwrite each other. Entries point at
+        # the folder node: renaming or moving a folder changes no entry
+        self.hash_table = FileHashTable(key_by='folder', hash_func='crc32')
+        # basename (lowercased) -> {folder: filename} for every copy
+        self.locations = NameLocations()
+        # Substring and prefix search over the distinct basenames
+        self.name_index = TrigramIndex()
+        self.prefix_index = PrefixTrie()
+        self.extension_index = ExtensionIndex()
+    
+    def enable_metrics(self, metrics=None):
+        """Start recording probe lengths, rehashes and operation
+        latencies. Returns the Metrics object, whose snapshot(),
+        to_json() and to_prometheus() export what was recorded"""
+        if self.metrics is None:
+            self.metrics = metrics or Metrics()
+            instrument_organizer(self, self.metrics)
+        return self.metrics
+    
+    def disable_metrics(self):
+        """Stop recording; the operations run uninstrumented again"""
+        if self.metrics is not None:
+            uninstrument_organizer(self)
+            self.metrics = None
+    
+    def save_snapshot(self, path=SNAPSHOT_PATH):
+        """Save the tree and hash table to a binary snapshot"""
+        write_snapshot(self, path)
+    
+    def load_snapshot(self, path=SNAPSHOT_PATH):
+        """Replace the current state with a snapshot. The file is
+        memory-mapped and folders and entries are decoded on first use"""
+        self.snapshot = read_snapshot(self, path)
+    
+    def open_store(self, snapshot_path=SNAPSHOT_PATH, journal_path=JOURNAL_PATH, **journal_options):
+        """Load the last snapshot, replay the journal on top of it and
+        journal every change from now on. Returns the records replayed"""
+        if os.path.exists(snapshot_path):
+            self.load_snapshot(snapshot_path)
+        replayed = replay_journal(self, journal_path)
+        self.snapshot_path = snapshot_path
+        self.journal = Journal(journal_path, start_lsn=self.applied_lsn, **journal_options)
+        return replayed
+    
+    def compact(self):
+        """Fold the journal into a new snapshot on a background thread"""
+        return compact_journal(self.journal, self.snapshot_path,
+                               lambda: type(self)(storage=self.storage))
+    
+    def close_store(self):
+        """Flush and close the journal"""
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+    
+    def _log(self, op, path, *args):
+        self.applied_lsn = self.journal.append(op, path, *args)
+        if self.journal.records >= self.journal.compact_every:
+            self.compact()
+    
+    def apply_record(self, op, path, *args):
+        """Apply one journal record"""
+        if op == 'mkdir':
+            self.create_folders(path)
+            return
+        if op == 'rename':
+            self.rename_folder(path, *args)
+            return
+        if op == 'move':
+            self.move_folder(path, *args)
+            return
+        if op == 'rmdir':
+            self.delete_folder(path)
+            return
+        if op == 'source':
+            self.set_import_root(path, *args)
+            return
+        
+        folder_path, _, filename = path.rpartition('/')
+        folder_path = folder_path[len(self.tree.name) + 1:]  # Remove "Root/" prefix
+        if op == 'add':
+            self.add_file(filename, folder_path, *args)
+        elif op == 'delete':
+            self.delete_file(filename, folder_path)
+        else:
+            raise ValueError(f"Unknown journal operation '{op}'")
     
     def create_folders(self, path):
         """Create folder structure from path"""
+        folder = self._create_folders(path)
+        if self.journal:
+            self._log('mkdir', path)
+        return folder
+    
+    def _create_folders(self, path):
         parts = path.split('/')
         current = self.tree
         
         for part in parts:
             if part:
-                found = None
-                for subfolder in current.subfolders:
-                    if subfolder.name == part:
-                        found = subfolder
-                        break
+                found = current.get_subfolder(part)
                 
                 if found:
                     current = found
@@ -182,409 +912,424 @@ class FileOrganizer:
         
         return current
     
-    def add_file(self, filename, folder_path=""):
-        """Add file to both tree and hash table"""
+    def set_import_root(self, folder_path, real_path):
+        """Record that folder_path holds an import of the real directory
+        real_path. Kept on the folder node, so renames and moves keep it"""
+        if folder_path.startswith(self.tree.name + "/"):
+            folder_path = folder_path[len(self.tree.name) + 1:]
+        folder = self.get_folder(folder_path) or self._create_folders(folder_path)
+        self.import_roots[folder] = real_path
+        if self.journal:
+            self._log('source', folder.get_path(), real_path)
+        return folder
+    
+    def real_path(self, folder, filename=None):
+        """Path on disk of an imported folder or file, from the nearest
+        import root above it. None if it was not imported"""
+        names = [] if filename is None else [filename]
+        node = folder
+        while node is not None and node not in self.import_roots:
+            names.append(node.name)
+            node = node.parent
+        if node is None:
+            return None
+        return os.path.join(self.import_roots[node], *reversed(names))
+    
+    def get_folder(self, folder_path):
+        """Find an existing folder; the 'Root/' prefix is optional"""
+        if folder_path.startswith(self.tree.name + "/"):
+            folder_path = folder_path[len(self.tree.name) + 1:]
+        return self.tree.find_folder(folder_path.strip('/'))
+    
+    def add_file(self, filename, folder_path="", size=0, mtime=None):
+        """Add file to both tree and hash table. Files with an mtime
+        (imported ones) also get a metadata record"""
+        if not filename or '/' in filename:
+            return False, f"Invalid file name '{filename}'"
         if folder_path:
-            folder = self.create_folders(folder_path)
+            folder = self._create_folders(folder_path)
         else:
             folder = self.tree
         
-        if folder.add_file(filename):
-            full_path = folder.get_path() + "/" + filename
-            if self.hash_table.insert(filename, full_path):
-                return True, f"Added '{filename}' to {folder.get_path()}"
-            else:
-                folder.remove_file(filename)
-                return False, f"Failed to add '{filename}' to hash table"
-        else:
+        if not self._index_file(folder, filename, size, mtime):
             return False, f"File '{filename}' already exists"
+        return True, f"Added '{filename}' to {folder.get_path()}"
     
-    def delete_file(self, filename):
-        """Delete file from both structures"""
-        file_info = self.hash_table.search(filename)
-        if not file_info:
-            return False, f"File '{filename}' not found"
+    def add_files(self, files, count_hint=None, freeze=False):
+        """Bulk add (filename, folder_path) pairs, or (filename,
+        folder_path, size, mtime) tuples for files with metadata. Files
+        are grouped by folder, so each folder path is resolved and the
+        totals above it updated once per call. The hash table is sized
+        once from count_hint (or len(files)) and the names not seen
+        before are added to the search indexes in one batch before
+        returning. freeze=True calls gc.freeze() afterwards, for the
+        last call of a top-level bulk load. Returns counts of added,
+        duplicate and failed files"""
+        if count_hint is None and hasattr(files, '__len__'):
+            count_hint = len(files)
+        if count_hint:
+            self.hash_table.reserve(self.hash_table.count + count_hint)
         
-        path_parts = file_info['filepath'].split('/')
-        folder_path = '/'.join(path_parts[1:-1])
+        report = {'added': 0, 'duplicates': 0, 'failed': 0}
+        groups = {}  # folder_path -> [(filename, size, mtime)]
+        for filename, folder_path, *info in files:
+            if not filename or '/' in filename:
+                report['failed'] += 1
+                continue
+            entry = (filename, *info) if info else (filename, 0, None)
+            group = groups.get(folder_path)
+            if group is None:
+                groups[folder_path] = [entry]
+            else:
+                group.append(entry)
         
-        folder = self.tree.find_folder(folder_path) if folder_path else self.tree
-        if folder and folder.remove_file(filename):
-            if self.hash_table.delete(filename):
-                return True, f"Deleted '{filename}'"
+        new_names = []  # indexed for search in one batch at the end
+        insert = self.hash_table.insert
+        search = self.hash_table.search
+        # Millions of new entries would otherwise trigger repeated full
+        # garbage collections that find nothing to free
+        with gc_paused():
+            try:
+                for folder_path, group in groups.items():
+                    folder = self._create_folders(folder_path) if folder_path else self.tree
+                    # The table ignores case, so a name differing only in
+                    # case from one in the folder or the batch is a duplicate
+                    seen = set()
+                    added = []
+                    had_files = folder.total_files > 0
+                    for entry in group:
+                        name = entry[0].lower()
+                        if name not in seen and not (had_files and search(f"{folder.folder_id}/{name}")):
+                            seen.add(name)
+                            added.append(entry)
+                    folder.add_files([(filename, size) for filename, size, _ in added])
+                    for filename, size, mtime in added:
+                        insert(filename, folder, replace=False)
+                        self._record_file(folder, filename, size, mtime, new_names)
+                    report['added'] += len(added)
+                    report['duplicates'] += len(group) - len(added)
+            finally:
+                self.name_index.add_names(new_names)
+                self.prefix_index.add_names(new_names)
+                self.extension_index.add_names(new_names)
+        if freeze:
+            # The catalogue is long-lived: move it out of the cyclic GC's
+            # generations so later full collections don't rescan it
+            gc.freeze()
         
-        return False, f"Failed to delete '{filename}'"
+        return report
     
-    def search_file(self, filename):
-        """Search file using hash table"""
-        file_info = self.hash_table.search(filename)
-        if file_info:
-            return True, f"Found: {filename} at {file_info['filepath']}"
-        else:
-            return False, f"File '{filename}' not found"
-
-#  GUI Implementation
-class FileOrganizerGUI:
-    def __init__(self):
-        self.organizer = FileOrganizer()
-        self.setup_gui()
-        self.current_folder = self.organizer.tree
-        self.refresh_folder_view()
-    
-    def setup_gui(self):
-        """Initialize the main GUI window"""
-        self.root = tk.Tk()
-        self.root.title("File Organizer - Group 8")
-        self.root.geometry("800x600")
-        self.root.configure(bg="#f0f0f0")
-        
-        # Create main frames
-        self.create_header()
-        self.create_main_content()
-        self.create_buttons()
-        self.create_status_bar()
-    
-    def create_header(self):
-        """Create header with title and current path"""
-        header_frame = tk.Frame(self.root, bg="#2c3e50", height=80)
-        header_frame.pack(fill="x", padx=5, pady=5)
-        header_frame.pack_propagate(False)
-        
-        title_label = tk.Label(header_frame, text="📁 File Organizer System", 
-                              font=("Arial", 16, "bold"), fg="white", bg="#2c3e50")
-        title_label.pack(pady=10)
-        
-        # Current path display
-        path_frame = tk.Frame(header_frame, bg="#2c3e50")
-        path_frame.pack(fill="x", padx=10)
-        
-        tk.Label(path_frame, text="Current Path:", font=("Arial", 10), 
-                fg="white", bg="#2c3e50").pack(side="left")
-        
-        self.path_label = tk.Label(path_frame, text="Root", font=("Arial", 10, "bold"), 
-                                  fg="#3498db", bg="#2c3e50")
-        self.path_label.pack(side="left", padx=(5, 0))
-    
-    def create_main_content(self):
-        """Create main content area with folder tree and file list"""
-        main_frame = tk.Frame(self.root, bg="#f0f0f0")
-        main_frame.pack(fill="both", expand=True, padx=10, pady=5)
-        
-        # Left panel - Folder tree
-        left_frame = tk.LabelFrame(main_frame, text="📂 Folders", 
-                                  font=("Arial", 12, "bold"), bg="#f0f0f0")
-        left_frame.pack(side="left", fill="both", expand=True, padx=(0, 5))
-        
-        # Folder tree with scrollbar
-        tree_frame = tk.Frame(left_frame)
-        tree_frame.pack(fill="both", expand=True, padx=5, pady=5)
-        
-        self.folder_tree = ttk.Treeview(tree_frame, selectmode="browse")
-        self.folder_tree.heading("#0", text="Folder Structure")
-        
-        tree_scroll = ttk.Scrollbar(tree_frame, orient="vertical", command=self.folder_tree.yview)
-        self.folder_tree.configure(yscrollcommand=tree_scroll.set)
-        
-        self.folder_tree.pack(side="left", fill="both", expand=True)
-        tree_scroll.pack(side="right", fill="y")
-        
-        self.folder_tree.bind("<Double-1>", self.on_folder_select)
-        
-        # Right panel - Files in current folder
-        right_frame = tk.LabelFrame(main_frame, text="📄 Files in Current Folder", 
-                                   font=("Arial", 12, "bold"), bg="#f0f0f0")
-        right_frame.pack(side="right", fill="both", expand=True, padx=(5, 0))
-        
-        # File listbox with scrollbar
-        file_frame = tk.Frame(right_frame)
-        file_frame.pack(fill="both", expand=True, padx=5, pady=5)
-        
-        self.file_listbox = tk.Listbox(file_frame, font=("Arial", 10))
-        file_scroll = ttk.Scrollbar(file_frame, orient="vertical", command=self.file_listbox.yview)
-        self.file_listbox.configure(yscrollcommand=file_scroll.set)
-        
-        self.file_listbox.pack(side="left", fill="both", expand=True)
-        file_scroll.pack(side="right", fill="y")
+    def _file_key(self, folder, filename):
+        """Hash table key of a file: folder id and name, not the path"""
+        return f"{folder.folder_id}/{filename}"
     
-    def create_buttons(self):
-        """Create button panel for file operations"""
-        button_frame = tk.Frame(self.root, bg="#f0f0f0")
-        button_frame.pack(fill="x", padx=10, pady=5)
-        
-        # File operations buttons
-        file_ops_frame = tk.LabelFrame(button_frame, text="File Operations", 
-                                      font=("Arial", 10, "bold"), bg="#f0f0f0")
-        file_ops_frame.pack(side="left", fill="x", expand=True, padx=(0, 5))
-        
-        buttons_data = [
-            ("➕ Add File", self.add_file, "#27ae60"),
-            ("🗑️ Delete File", self.delete_file, "#e74c3c"),
-            ("🔍 Search File", self.search_file, "#3498db"),
-        ]
-        
-        for text, command, color in buttons_data:
-            btn = tk.Button(file_ops_frame, text=text, command=command, 
-                           bg=color, fg="white", font=("Arial", 9, "bold"),
-                           padx=10, pady=5, relief="raised", bd=2)
-            btn.pack(side="left", padx=5, pady=5, fill="x", expand=True)
-        
-        # Folder operations buttons
-        folder_ops_frame = tk.LabelFrame(button_frame, text="Folder Operations", 
-                                        font=("Arial", 10, "bold"), bg="#f0f0f0")
-        folder_ops_frame.pack(side="right", fill="x", expand=True, padx=(5, 0))
-        
-        folder_buttons_data = [
-            ("📁 New Folder", self.create_folder, "#f39c12"),
-            ("🏠 Go to Root", self.go_to_root, "#9b59b6"),
-            ("📊 Show Stats", self.show_stats, "#34495e"),
-        ]
-        
-        for text, command, color in folder_buttons_data:
-            btn = tk.Button(folder_ops_frame, text=text, command=command, 
-                           bg=color, fg="white", font=("Arial", 9, "bold"),
-                           padx=10, pady=5, relief="raised", bd=2)
-            btn.pack(side="left", padx=5, pady=5, fill="x", expand=True)
-    
-    def create_status_bar(self):
-        """Create status bar at bottom"""
-        self.status_bar = tk.Label(self.root, text="Ready", relief="sunken", 
-                                  anchor="w", bg="lightgray", font=("Arial", 9))
-        self.status_bar.pack(side="bottom", fill="x")
-    
-    def update_status(self, message):
-        """Update status bar message"""
-        self.status_bar.config(text=message)
-        self.root.update_idletasks()
-    
-    def refresh_folder_tree(self):
-        """Refresh the folder tree display"""
-        # Clear existing items
-        for item in self.folder_tree.get_children():
-            self.folder_tree.delete(item)
-        
-        # Add root and build tree
-        self.add_tree_nodes("", self.organizer.tree)
+    def _index_file(self, folder, filename, size=0, mtime=None):
+        """Record a new file in the tree, hash table, name multimap and,
+        with an mtime, the metadata index. False if the path is already
+        indexed (the index ignores case)"""
+        if not folder.add_file(filename, size):
+            return False
+        if not self.hash_table.insert(filename, folder, replace=False):
+            folder.remove_file(filename)  # same name in another case
+            return False
+        self._record_file(folder, filename, size, mtime)
+        return True
     
-    def add_tree_nodes(self, parent, folder):
-        """Recursively add nodes to tree"""
-        folder_id = self.folder_tree.insert(parent, "end", text=f"📁 {folder.name}", 
-                                           values=[folder.get_path()])
-        
-        for subfolder in folder.subfolders:
-            self.add_tree_nodes(folder_id, subfolder)
-    
-    def refresh_folder_view(self):
-        """Refresh both tree and file list"""
-        self.refresh_folder_tree()
-        self.refresh_file_list()
-        self.path_label.config(text=self.current_folder.get_path())
-    
-    def refresh_file_list(self):
-        """Refresh the file list for current folder"""
-        self.file_listbox.delete(0, tk.END)
-        
-        for file in self.current_folder.files:
-            self.file_listbox.insert(tk.END, f"📄 {file}")
-        
-        # Show folder count info
-        folder_count = len(self.current_folder.subfolders)
-        file_count = len(self.current_folder.files)
-        self.update_status(f"Current folder: {folder_count} folders, {file_count} files")
-    
-    def on_folder_select(self, event):
-        """Handle folder selection from tree"""
-        selection = self.folder_tree.selection()
-        if selection:
-            item = self.folder_tree.item(selection[0])
-            folder_path = item['values'][0] if item['values'] else "Root"
-            
-            # Find the folder in our tree structure
-            if folder_path == "Root":
-                self.current_folder = self.organizer.tree
+    def _record_file(self, folder, filename, size=0, mtime=None, new_names=None):
+        """Metadata, name multimap, search index and journal updates for a
+        file just added to the tree and table. A name not seen before goes
+        to the search indexes, or onto new_names for the caller to add in bulk"""
+        if mtime is not None:
+            self.metadata.add(folder, filename, size, mtime)
+        name = filename.lower()
+        if self.locations.add_copy(name, folder, filename):
+            if new_names is not None:
+                new_names.append(name)
             else:
-                # Remove "Root/" prefix if present
-                if folder_path.startswith("Root/"):
-                    folder_path = folder_path[5:]
-                self.current_folder = self.organizer.tree.find_folder(folder_path)
-            
-            if self.current_folder:
-                self.refresh_folder_view()
-    
-    def add_file(self):
-        """Add a new file dialog"""
-        filename = simpledialog.askstring("Add File", "Enter filename:")
-        if filename:
-            if not self.validate_filename(filename):
-                return
-            
-            folder_path = self.current_folder.get_path()
-            if folder_path == "Root":
-                folder_path = ""
+                self.name_index.add_name(name)
+                self.prefix_index.add_name(name)
+                self.extension_index.add_name(name)
+        if self.journal:
+            if mtime is None:
+                self._log('add', folder.get_path() + "/" + filename)
             else:
-                folder_path = folder_path[5:]  # Remove "Root/" prefix
-            
-            success, message = self.organizer.add_file(filename, folder_path)
-            
-            if success:
-                self.refresh_folder_view()
-                messagebox.showinfo("Success", message)
-                self.update_status(f"Added file: {filename}")
-            else:
-                messagebox.showerror("Error", message)
-                self.update_status(f"Failed to add file: {filename}")
-    
-    def delete_file(self):
-        """Delete selected file"""
-        selection = self.file_listbox.curselection()
-        if not selection:
-            messagebox.showwarning("No Selection", "Please select a file to delete")
-            return
-        
-        filename = self.file_listbox.get(selection[0]).replace("📄 ", "")
-        
-        result = messagebox.askyesno("Confirm Delete", f"Delete file '{filename}'?")
-        if result:
-            success, message = self.organizer.delete_file(filename)
-            
-            if success:
-                self.refresh_folder_view()
-                messagebox.showinfo("Success", message)
-                self.update_status(f"Deleted file: {filename}")
-            else:
-                messagebox.showerror("Error", message)
-                self.update_status(f"Failed to delete file: {filename}")
-    
-    def search_file(self):
-        """Search for a file"""
-        filename = simpledialog.askstring("Search File", "Enter filename to search:")
-        if filename:
-            success, message = self.organizer.search_file(filename)
-            
-            if success:
-                messagebox.showinfo("Search Result", message)
-                self.update_status(f"Found: {filename}")
-            else:
-                messagebox.showwarning("Search Result", message)
-                self.update_status(f"Not found: {filename}")
-    
-    def create_folder(self):
-        """Create a new folder"""
-        folder_name = simpledialog.askstring("New Folder", "Enter folder name:")
-        if folder_name:
-            if not self.validate_foldername(folder_name):
-                return
-            
-            # Check if folder already exists
-            for subfolder in self.current_folder.subfolders:
-                if subfolder.name == folder_name:
-                    messagebox.showerror("Error", f"Folder '{folder_name}' already exists")
-                    return
-            
-            self.current_folder.add_folder(folder_name)
-            self.refresh_folder_view()
-            messagebox.showinfo("Success", f"Created folder '{folder_name}'")
-            self.update_status(f"Created folder: {folder_name}")
-    
-    def go_to_root(self):
-        """Navigate to root folder"""
-        self.current_folder = self.organizer.tree
-        self.refresh_folder_view()
-        self.update_status("Navigated to Root")
-    
-    def show_stats(self):
-        """Show system statistics"""
-        # Count total folders and files
-        def count_tree(node):
-            folders = 1
-            files = len(node.files)
-            for subfolder in node.subfolders:
-                sub_folders, sub_files = count_tree(subfolder)
-                folders += sub_folders
-                files += sub_files
-            return folders, files
-        
-        folder_count, file_count = count_tree(self.organizer.tree)
+                self._log('add', folder.get_path() + "/" + filename, size, mtime)
+    
+    def delete_file(self, filename, folder_path=None):
+        """Delete file from both structures. Without folder_path the
+        filename has to be unique across folders"""
+        if folder_path is None:
+            copies = self.locations.get(filename.lower())
+            if not copies:
+                return False, f"File '{filename}' not found"
+            if len(copies) > 1:
+                return False, f"'{filename}' exists in {len(copies)} folders, choose a folder"
+            folder = next(iter(copies))
+        else:
+            folder = self.get_folder(folder_path)
+            if folder is None:
+                return False, f"Folder '{folder_path}' not found"
         
-        stats_message = f"""System Statistics:
+        file_info = self.hash_table.search(self._file_key(folder, filename))
+        if not file_info:
+            return False, f"File '{filename}' not found"
         
-📁 Total Folders: {folder_count}
-📄 Total Files: {file_count}
-🗂️ Hash Table Size: {self.organizer.hash_table.size}
-📊 Files in Hash Table: {self.organizer.hash_table.count}
-⚡ Load Factor: {self.organizer.hash_table.count/self.organizer.hash_table.size:.2f}
-🔄 Collisions: {self.organizer.hash_table.collision_count}
-📂 Current Folder: {self.current_folder.get_path()}
-        """
+        name = file_info['filename']
+        if self._unindex_file(folder, name):
+            return True, f"Deleted '{name}'"
         
-        messagebox.showinfo("System Statistics", stats_message)
-        self.update_status("Displayed system statistics")
+        return False, f"Failed to delete '{filename}'"
     
-    def validate_filename(self, filename):
-        """Validate filename input"""
-        if not filename.strip():
-            messagebox.showerror("Invalid Input", "Filename cannot be empty")
+    def _unindex_file(self, folder, filename, log=True):
+        """Remove a file from the name multimap, hash table and tree, in
+        that order: compact storage reads the file's row until the end"""
+        if not folder.has_file(filename):
             return False
-        
-        invalid_chars = ['/', '\\', ':', '*', '?', '"', '<', '>', '|']
-        for char in invalid_chars:
-            if char in filename:
-                messagebox.showerror("Invalid Input", 
-                                   f"Filename cannot contain: {' '.join(invalid_chars)}")
-                return False
-        
+        name = filename.lower()
+        last = self.locations.remove_copy(name, folder)
+        self.hash_table.delete(self._file_key(folder, filename))
+        folder.remove_file(filename)
+        self.metadata.remove(folder, filename)
+        if last:
+            self.name_index.remove_name(name)
+            self.prefix_index.remove_name(name)
+            self.extension_index.remove_name(name)
+        if log and self.journal:
+            self._log('delete', folder.get_path() + "/" + filename)
         return True
     
-    def validate_foldername(self, foldername):
-        """Validate folder name input"""
-        if not foldername.strip():
-            messagebox.showerror("Invalid Input", "Folder name cannot be empty")
-            return False
+    def rename_folder(self, folder_path, new_name):
+        """Rename a folder in O(1): files are indexed by folder, not by
+        path, so no entry below it changes"""
+        folder = self.get_folder(folder_path)
+        if folder is None:
+            return False, f"Folder '{folder_path}' not found"
+        if folder.parent is None:
+            return False, "The root folder cannot be renamed"
+        if not new_name or '/' in new_name:
+            return False, f"Invalid folder name '{new_name}'"
+        if folder.parent.get_subfolder(new_name) is not None:
+            return False, f"Folder '{new_name}' already exists"
         
-        invalid_chars = ['/', '\\', ':', '*', '?', '"', '<', '>', '|']
-        for char in invalid_chars:
-            if char in foldername:
-                messagebox.showerror("Invalid Input", 
-                                   f"Folder name cannot contain: {' '.join(invalid_chars)}")
-                return False
+        old_path = folder.get_path()
+        folder.rename(new_name)
+        if self.journal:
+            self._log('rename', old_path, new_name)
+        return True, f"Renamed '{old_path}' to '{new_name}'"
+    
+    def move_folder(self, folder_path, dest_path):
+        """Move a folder under another one. Only the subtree totals along
+        the old and new ancestor chains are updated"""
+        folder = self.get_folder(folder_path)
+        if folder is None:
+            return False, f"Folder '{folder_path}' not found"
+        dest = self.get_folder(dest_path)
+        if dest is None:
+            return False, f"Folder '{dest_path}' not found"
+        if folder.parent is None:
+            return False, "The root folder cannot be moved"
+        if dest.get_subfolder(folder.name) is not None:
+            return False, f"'{dest.get_path()}' already has a folder '{folder.name}'"
         
-        return True
+        old_path = folder.get_path()
+        self.metadata.detach(folder)
+        if not folder.move_to(dest):
+            self.metadata.attach(folder)
+            return False, f"Cannot move '{old_path}' into itself"
+        self.metadata.attach(folder)
+        if self.journal:
+            self._log('move', old_path, dest.get_path())
+        return True, f"Moved '{old_path}' to {dest.get_path()}"
     
-    def load_sample_data(self):
-        """Load some sample data for demonstration"""
-        # Create sample folder structure
-        self.organizer.create_folders("Documents/Assignments")
-        self.organizer.create_folders("Documents/Notes")
-        self.organizer.create_folders("Pictures/Vacation")
-        self.organizer.create_folders("Music/Rock")
+    def delete_folder(self, folder_path):
+        """Delete a folder with everything below it"""
+        folder = self.get_folder(folder_path)
+        if folder is None:
+            return False, f"Folder '{folder_path}' not found"
+        if folder.parent is None:
+            return False, "The root folder cannot be deleted"
         
-        # Add sample files
-        sample_files = [
-            ("project.pdf", "Documents/Assignments"),
-            ("homework.docx", "Documents/Assignments"),
-            ("notes.txt", "Documents/Notes"),
-            ("beach.jpg", "Pictures/Vacation"),
-            ("song1.mp3", "Music/Rock")
-        ]
+        # Detach first, so removing each file updates the totals of the
+        # detached subtree only; the ancestors are updated once
+        path = folder.get_path()
+        self.metadata.detach(folder)
+        folder.parent.remove_subfolder(folder)
+        order = [folder]
+        files = 0
+        for node in order:
+            order.extend(node.subfolders)
+            for filename in list(node.files):
+                self._unindex_file(node, filename, log=False)
+                files += 1
+        self.metadata.drop_folders(order)
+        if self.import_roots:
+            for node in order:
+                self.import_roots.pop(node, None)
+        if self.journal:
+            self._log('rmdir', path)
+        return True, f"Deleted '{path}' ({len(order)} folders, {files} files)"
+    
+    
+    def get_statistics(self, folder=None):
+        """Totals for the whole catalogue or one folder's subtree, in O(1)"""
+        return (folder or self.tree).get_statistics()
+    
+    def find_copies(self, filename):
+        """Full paths of every file with this name, in any folder"""
+        copies = self.locations.get(filename.lower(), {})
+        return [folder.get_path() + "/" + name for folder, name in copies.items()]
+    
+    def search_files(self, pattern, limit=None, cancel=None):
+        """Files whose name contains pattern, ignoring case. Uses the
+        trigram index instead of walking the tree. Stops early, with the
+        results so far, once the cancel event is set"""
+        results = []
+        for name in self.name_index.search(pattern.lower()):
+            if cancel is not None and cancel.is_set():
+                break
+            for folder, filename in self.locations.get(name, {}).items():
+                path = folder.get_path()
+                results.append({
+                    'file': filename,
+                    'path': path,
+                    'full_path': f"{path}/{filename}"
+                })
+                if limit and len(results) >= limit:
+                    return results
+        return results
+    
+    def query(self, query, limit=None):
+        """Files matching a query such as 'ext:pdf under:Documents' (see
+        query.py for the syntax), yielded as they are found"""
+        if isinstance(query, str):
+            query = parse_query(query)
+        return run_query(self, query, limit)
+    
+    def _scope(self, folder_path):
+        """Folder for folder_path (the root if None); ValueError if missing"""
+        if folder_path is None:
+            return self.tree
+        folder = self.get_folder(folder_path)
+        if folder is None:
+            raise ValueError(f"Folder '{folder_path}' not found")
+        return folder
+    
+    def _metadata_results(self, found):
+        results = []
+        for folder, filename, _ in found:
+            size, mtime = self.metadata.get(folder, filename)
+            path = folder.get_path()
+            results.append({'file': filename, 'path': path, 'full_path': f"{path}/{filename}",
+                            'size': size, 'mtime': mtime})
+        return results
+    
+    def file_info(self, path):
+        """Name, path, size, mtime and type of a file; size and mtime
+        are None for files added without metadata. None if not found"""
+        folder_path, _, filename = path.rpartition('/')
+        folder = self.get_folder(folder_path)
+        file_info = folder and self.hash_table.search(self._file_key(folder, filename))
+        if not file_info:
+            return None
+        filename = file_info['filename']
+        size, mtime = self.metadata.get(folder, filename) or (None, None)
+        return {'file': filename, 'full_path': f"{folder.get_path()}/{filename}",
+                'size': size, 'mtime': mtime, 'type': file_type(filename)}
+    
+    def largest_files(self, k=COMPLETION_LIMIT, folder_path=None):
+        """The k largest files with metadata under a folder, largest first"""
+        return self._metadata_results(self.metadata.top('size', self._scope(folder_path), k))
+    
+    def newest_files(self, k=COMPLETION_LIMIT, folder_path=None):
+        """The k most recently modified files under a folder, newest first"""
+        return self._metadata_results(self.metadata.top('mtime', self._scope(folder_path), k))
+    
+    def modified_since(self, since, folder_path=None):
+        """Files under a folder modified at or after the timestamp
+        since, newest first"""
+        found = self.metadata.at_least('mtime', self._scope(folder_path), since)
+        found.sort(key=lambda item: item[2], reverse=True)
+        return self._metadata_results(found)
+    
+    def size_histogram(self, folder_path=None, by_folder=False):
+        """Files and bytes per power-of-two size bucket under a folder,
+        as {'min', 'max', 'files', 'bytes'} rows for the non-empty buckets.
+        With by_folder, {path: rows} for the folder's own files (under
+        its own path) and for each subfolder"""
+        scope = self._scope(folder_path)
         
-        for filename, folder_path in sample_files:
-            self.organizer.add_file(filename, folder_path)
+        def rows(histogram):
+            files, total = histogram
+            return [{'min': bucket_range(bucket)[0], 'max': bucket_range(bucket)[1],
+                     'files': n, 'bytes': total[bucket]}
+                    for bucket, n in enumerate(files) if n]
         
-        self.refresh_folder_view()
-        self.update_status("Loaded sample data")
+        if not by_folder:
+            return rows(self.metadata.histogram(scope))
+        own = rows(self.metadata.own_histogram(scope))
+        histograms = {scope.get_path(): own} if own else {}
+        for child in scope.subfolders:
+            child_rows = rows(self.metadata.histogram(child))
+            if child_rows:
+                histograms[child.get_path()] = child_rows
+        return histograms
+    
+    def find_duplicates(self, folder_path=None, workers=None, cache_path=DIGEST_CACHE_PATH,
+                        min_size=1, cancel=None):
+        """Imported files under a folder with identical content, found by
+        size, then first and last blocks, then full digest (see
+        duplicates.py for the report). Digests are cached in cache_path
+        (None for no cache) so re-runs only read changed files"""
+        from duplicates import DigestCache, find_duplicates  # multiprocessing, only needed here
+        scope = self._scope(folder_path)
+        files = []
+        order = [scope]
+        for folder in order:
+            order.extend(folder.subfolders)
+            own = self.metadata.folder_files(folder)
+            if own:
+                base = self.real_path(folder)
+                if base is None:
+                    continue
+                path = folder.get_path()
+                for filename, (size, _) in own.items():
+                    files.append((f"{path}/{filename}", os.path.join(base, filename), size))
+        return find_duplicates(files, DigestCache(cache_path), workers, min_size, cancel)
     
-    def run(self):
-        """Start the GUI application"""
-        # Load sample data
-        self.load_sample_data()
+    def complete_filename(self, prefix, limit=COMPLETION_LIMIT):
+        """File names starting with prefix, ignoring case, in sorted order.
+        Each distinct name is listed once, as one of its copies spells it"""
+        completions = []
+        for name in self.prefix_index.complete(prefix.lower(), limit):
+            copies = self.locations.get(name)
+            if copies:
+                completions.append(next(iter(copies.values())))
+        return completions
+    
+    def search_file(self, filename):
+        """Search file using hash table (a name, or a path with '/')"""
+        if '/' in filename:
+            folder_path, _, name = filename.rpartition('/')
+            folder = self.get_folder(folder_path)
+            file_info = folder and self.hash_table.search(self._file_key(folder, name))
+            if file_info:
+                # Paths are only resolved for display
+                found = file_info['folder'].get_path() + "/" + file_info['filename']
+                return True, f"Found: {file_info['filename']} at {found}"
+            return False, f"File '{filename}' not found"
         
-        self.update_status("File Organizer ready - Group 8 DSA Project")
-        self.root.mainloop()
+        paths = self.find_copies(filename)
+        if len(paths) == 1:
+            return True, f"Found: {filename} at {paths[0]}"
+        elif paths:
+            return True, f"Found {len(paths)} copies of {filename}:\n" + "\n".join(sorted(paths))
+        else:
+            return False, f"File '{filename}' not found"
 
 # Main execution
 if __name__ == "__main__":
-    print("🚀 Starting File Organizer GUI")
-    print("Group 8 - DSA Project")
-    print("=" * 50)
-    
-    app = FileOrganizerGUI()
-    app.run()
+    # cli and gui import this module by name: register this copy under
+    # that name, or they would load a second one with its own classes
+    sys.modules['file_organizer'] = sys.modules[__name__]
+    from cli import run
+    sys.exit(run())
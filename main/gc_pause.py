@@ -0,0 +1,32 @@
+# Pausing the cyclic garbage collector during bulk loads
+# Bulk loads create millions of objects that are never garbage, so the
+# collector's repeated full passes over them only cost time. The
+# collector is process-wide: pauses are counted, and the collector is
+# turned back on only when the last overlapping pause ends (a scanner
+# writer thread and a snapshot save may run at the same time)
+
+import gc
+import threading
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_depth = 0  # pauses in progress
+_was_enabled = False  # collector state before the first of them
+
+
+@contextmanager
+def gc_paused():
+    """Run the with-block with the cyclic garbage collector disabled"""
+    global _depth, _was_enabled
+    with _lock:
+        if _depth == 0:
+            _was_enabled = gc.isenabled()
+            gc.disable()
+        _depth += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _depth -= 1
+            if _depth == 0 and _was_enabled:
+                gc.enable()
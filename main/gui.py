@@ -0,0 +1,868 @@
+# File Organizer GUI Implementation
+# Gayathri's Role - Interface Builder
+# Group 8 - DSA Project
+
+import os
+import tkinter as tk
+import tkinter.font as tkfont
+from tkinter import ttk, messagebox, simpledialog, filedialog
+
+from file_organizer import COMPLETION_LIMIT, JOURNAL_PATH, SNAPSHOT_PATH, FileOrganizer
+from scanner import DirectoryScanner
+from tasks import TaskCancelled, TaskRunner
+
+SEARCH_RESULT_LIMIT = 20
+TASK_POLL_MS = 50
+METRICS_ENV = "FILE_ORGANIZER_METRICS"  # set to 1 to record hot-path metrics
+
+
+class FileOrganizerGUI:
+    def __init__(self, metrics=None):
+        """metrics=True records hot-path metrics for the statistics
+        dialog; by default they are on only if FILE_ORGANIZER_METRICS=1"""
+        self.organizer = FileOrganizer()
+        if metrics is None:
+            metrics = os.environ.get(METRICS_ENV) == "1"
+        if metrics:
+            self.organizer.enable_metrics()
+        self.setup_gui()
+        self.current_folder = self.organizer.tree
+        self.refresh_folder_tree()
+        self.refresh_folder_view()
+    
+    def setup_gui(self):
+        """Initialize the main GUI window"""
+        self.root = tk.Tk()
+        self.root.title("File Organizer - Group 8")
+        self.root.geometry("800x600")
+        self.root.configure(bg="#f0f0f0")
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Long operations run on a worker thread; poll for their results
+        self.tasks = TaskRunner()
+        self.view_pending = False  # file list to refresh once the tasks are done
+        self.tree_pending = set()  # expanded Treeview items to fill in then
+        self.root.after(TASK_POLL_MS, self.poll_tasks)
+        
+        # Create main frames
+        self.create_header()
+        self.create_search_bar()
+        self.create_main_content()
+        self.create_buttons()
+        self.create_status_bar()
+    
+    def create_header(self):
+        """Create header with title and current path"""
+        header_frame = tk.Frame(self.root, bg="#2c3e50", height=80)
+        header_frame.pack(fill="x", padx=5, pady=5)
+        header_frame.pack_propagate(False)
+        
+        title_label = tk.Label(header_frame, text="📁 File Organizer System", 
+                              font=("Arial", 16, "bold"), fg="white", bg="#2c3e50")
+        title_label.pack(pady=10)
+        
+        # Current path display
+        path_frame = tk.Frame(header_frame, bg="#2c3e50")
+        path_frame.pack(fill="x", padx=10)
+        
+        tk.Label(path_frame, text="Current Path:", font=("Arial", 10), 
+                fg="white", bg="#2c3e50").pack(side="left")
+        
+        self.path_label = tk.Label(path_frame, text="Root", font=("Arial", 10, "bold"), 
+                                  fg="#3498db", bg="#2c3e50")
+        self.path_label.pack(side="left", padx=(5, 0))
+    
+    def create_search_bar(self):
+        """Create the search entry with completions shown while typing"""
+        search_frame = tk.Frame(self.root, bg="#f0f0f0")
+        search_frame.pack(fill="x", padx=10, pady=(5, 0))
+        
+        entry_frame = tk.Frame(search_frame, bg="#f0f0f0")
+        entry_frame.pack(fill="x")
+        tk.Label(entry_frame, text="🔍 Quick Search:", font=("Arial", 10),
+                bg="#f0f0f0").pack(side="left")
+        
+        self.search_var = tk.StringVar()
+        self.search_entry = tk.Entry(entry_frame, textvariable=self.search_var, font=("Arial", 10))
+        self.search_entry.pack(side="left", fill="x", expand=True, padx=(5, 0))
+        self.search_entry.bind("<KeyRelease>", self.on_search_typed)
+        self.search_entry.bind("<Return>", lambda event: self.run_quick_search(self.search_var.get()))
+        self.search_entry.bind("<Down>", self.focus_completions)
+        self.search_entry.bind("<Escape>", lambda event: self.hide_completions())
+        
+        # Shown only while there are completions
+        self.completion_listbox = tk.Listbox(search_frame, font=("Arial", 10),
+                                             height=COMPLETION_LIMIT // 2)
+        self.completion_listbox.bind("<Double-1>", self.on_completion_chosen)
+        self.completion_listbox.bind("<Return>", self.on_completion_chosen)
+        self.completion_listbox.bind("<Escape>", lambda event: self.search_entry.focus_set())
+    
+    def create_main_content(self):
+        """Create main content area with folder tree and file list"""
+        main_frame = tk.Frame(self.root, bg="#f0f0f0")
+        main_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        
+        # Left panel - Folder tree
+        left_frame = tk.LabelFrame(main_frame, text="📂 Folders", 
+                                  font=("Arial", 12, "bold"), bg="#f0f0f0")
+        left_frame.pack(side="left", fill="both", expand=True, padx=(0, 5))
+        
+        # Folder tree with scrollbar
+        tree_frame = tk.Frame(left_frame)
+        tree_frame.pack(fill="both", expand=True, padx=5, pady=5)
+        
+        self.folder_tree = ttk.Treeview(tree_frame, selectmode="browse")
+        self.folder_tree.heading("#0", text="Folder Structure")
+        
+        tree_scroll = ttk.Scrollbar(tree_frame, orient="vertical", command=self.folder_tree.yview)
+        self.folder_tree.configure(yscrollcommand=tree_scroll.set)
+        
+        self.folder_tree.pack(side="left", fill="both", expand=True)
+        tree_scroll.pack(side="right", fill="y")
+        
+        self.folder_tree.bind("<Double-1>", self.on_folder_select)
+        self.folder_tree.bind("<<TreeviewOpen>>", self.on_tree_open)
+        
+        # Right panel - Files in current folder
+        right_frame = tk.LabelFrame(main_frame, text="📄 Files in Current Folder", 
+                                   font=("Arial", 12, "bold"), bg="#f0f0f0")
+        right_frame.pack(side="right", fill="both", expand=True, padx=(5, 0))
+        
+        # Filter box, narrows the list while typing
+        filter_frame = tk.Frame(right_frame, bg="#f0f0f0")
+        filter_frame.pack(fill="x", padx=5, pady=(5, 0))
+        tk.Label(filter_frame, text="Filter:", font=("Arial", 10), bg="#f0f0f0").pack(side="left")
+        self.filter_var = tk.StringVar()
+        filter_entry = tk.Entry(filter_frame, textvariable=self.filter_var, font=("Arial", 10))
+        filter_entry.pack(side="left", fill="x", expand=True, padx=(5, 0))
+        filter_entry.bind("<KeyRelease>", self.on_filter_typed)
+        
+        # File listbox with scrollbar. The listbox only ever holds the
+        # visible rows; the scrollbar is driven from file_view
+        file_frame = tk.Frame(right_frame)
+        file_frame.pack(fill="both", expand=True, padx=5, pady=5)
+        
+        list_font = ("Arial", 10)
+        self.file_listbox = tk.Listbox(file_frame, font=list_font)
+        self.file_scroll = ttk.Scrollbar(file_frame, orient="vertical", command=self.scroll_file_list)
+        self.file_row_height = (tkfont.Font(font=list_font).metrics("linespace")
+                                + 2 * int(self.file_listbox.cget("selectborderwidth")))
+        
+        self.file_listbox.pack(side="left", fill="both", expand=True)
+        self.file_scroll.pack(side="right", fill="y")
+        self.file_listbox.bind("<Configure>", lambda event: self.render_file_list())
+        self.file_listbox.bind("<MouseWheel>", self.on_file_list_wheel)
+        self.file_listbox.bind("<Button-4>", lambda event: self.scroll_file_list("scroll", -3, "units"))
+        self.file_listbox.bind("<Button-5>", lambda event: self.scroll_file_list("scroll", 3, "units"))
+        
+        self.file_view = []  # names shown, sorted and filtered
+        self.file_view_folder = None
+        self.file_filter = ""
+        self.file_offset = 0  # index in file_view of the first visible row
+    
+    def create_buttons(self):
+        """Create button panel for file operations"""
+        button_frame = tk.Frame(self.root, bg="#f0f0f0")
+        button_frame.pack(fill="x", padx=10, pady=5)
+        
+        # File operations buttons
+        file_ops_frame = tk.LabelFrame(button_frame, text="File Operations", 
+                                      font=("Arial", 10, "bold"), bg="#f0f0f0")
+        file_ops_frame.pack(side="left", fill="x", expand=True, padx=(0, 5))
+        
+        buttons_data = [
+            ("➕ Add File", self.add_file, "#27ae60"),
+            ("🗑️ Delete File", self.delete_file, "#e74c3c"),
+            ("🔍 Search File", self.search_file, "#3498db"),
+            ("♊ Duplicates", self.find_duplicates, "#2980b9"),
+        ]
+        
+        for text, command, color in buttons_data:
+            btn = tk.Button(file_ops_frame, text=text, command=command, 
+                           bg=color, fg="white", font=("Arial", 9, "bold"),
+                           padx=10, pady=5, relief="raised", bd=2)
+            btn.pack(side="left", padx=5, pady=5, fill="x", expand=True)
+        
+        # Folder operations buttons
+        folder_ops_frame = tk.LabelFrame(button_frame, text="Folder Operations", 
+                                        font=("Arial", 10, "bold"), bg="#f0f0f0")
+        folder_ops_frame.pack(side="right", fill="x", expand=True, padx=(5, 0))
+        
+        folder_buttons_data = [
+            ("📁 New Folder", self.create_folder, "#f39c12"),
+            ("✏️ Rename", self.rename_folder, "#d35400"),
+            ("📦 Move", self.move_folder, "#8e44ad"),
+            ("🗑️ Delete Folder", self.delete_folder, "#c0392b"),
+            ("📥 Import Folder", self.import_folder, "#16a085"),
+            ("🏠 Go to Root", self.go_to_root, "#9b59b6"),
+            ("📊 Show Stats", self.show_stats, "#34495e"),
+        ]
+        
+        for text, command, color in folder_buttons_data:
+            btn = tk.Button(folder_ops_frame, text=text, command=command, 
+                           bg=color, fg="white", font=("Arial", 9, "bold"),
+                           padx=10, pady=5, relief="raised", bd=2)
+            btn.pack(side="left", padx=5, pady=5, fill="x", expand=True)
+    
+    def create_status_bar(self):
+        """Create status bar at bottom, with a button to cancel the
+        running task"""
+        status_frame = tk.Frame(self.root, bg="lightgray")
+        status_frame.pack(side="bottom", fill="x")
+        
+        self.cancel_button = tk.Button(status_frame, text="✖ Cancel", command=self.cancel_tasks,
+                                       font=("Arial", 8), state="disabled")
+        self.cancel_button.pack(side="right")
+        self.status_bar = tk.Label(status_frame, text="Ready", relief="sunken", 
+                                  anchor="w", bg="lightgray", font=("Arial", 9))
+        self.status_bar.pack(side="left", fill="x", expand=True)
+    
+    def update_status(self, message):
+        """Update status bar message"""
+        self.status_bar.config(text=message)
+        self.root.update_idletasks()
+    
+    def run_task(self, name, func, on_done, on_progress=None):
+        """Run func(task) on the worker thread; on_done(result) runs here
+        when it finishes"""
+        def on_error(error):
+            if isinstance(error, TaskCancelled):
+                self.update_status(f"Cancelled: {name}")
+            else:
+                messagebox.showerror("Error", f"{name} failed: {error}")
+                self.update_status(f"Failed: {name}")
+        
+        task = self.tasks.submit(name, func, on_done, on_error, on_progress)
+        self.cancel_button.config(state="normal")
+        self.update_status(f"{name}...")
+        return task
+    
+    def poll_tasks(self):
+        """Deliver task results and progress, then check again shortly"""
+        self.tasks.drain()
+        if not self.tasks.busy:
+            self.cancel_button.config(state="disabled")
+            if self.view_pending:
+                self.view_pending = False
+                self.refresh_folder_view()
+            if self.tree_pending:
+                for item in self.tree_pending:
+                    if self.folder_tree.exists(item):
+                        self.populate_tree_node(item)
+                self.tree_pending.clear()
+        self.root.after(TASK_POLL_MS, self.poll_tasks)
+    
+    def cancel_tasks(self):
+        self.tasks.cancel_all()
+        self.update_status("Cancelling...")
+    
+    def check_idle(self):
+        """Changes wait until background tasks are done, so the organizer
+        only ever has one writer"""
+        if self.tasks.busy:
+            messagebox.showwarning("Busy", f"Please wait for '{self.tasks.current.name}' "
+                                           "to finish, or cancel it")
+            return False
+        return True
+    
+    def refresh_folder_tree(self):
+        """Rebuild the folder tree display. Only the root's children are
+        inserted; deeper levels are filled in when a node is expanded"""
+        self.folder_tree.delete(*self.folder_tree.get_children())
+        self.tree_items = {}  # folder node -> Treeview item
+        self.item_folders = {}  # Treeview item -> folder node
+        
+        root_item = self.insert_tree_node("", self.organizer.tree)
+        self.populate_tree_node(root_item)
+        self.folder_tree.item(root_item, open=True)
+    
+    def insert_tree_node(self, parent_item, folder):
+        """Add one folder to the tree, with a placeholder child standing
+        in for its subfolders until it is expanded"""
+        item = self.folder_tree.insert(parent_item, "end", text=f"📁 {folder.name}")
+        self.tree_items[folder] = item
+        self.item_folders[item] = folder
+        if folder.total_folders > 1:  # doesn't load snapshot nodes
+            self.folder_tree.insert(item, "end", text="...", tags=("placeholder",))
+        return item
+    
+    def populate_tree_node(self, item):
+        """Replace the placeholder under item with the real subfolders"""
+        children = self.folder_tree.get_children(item)
+        if len(children) != 1 or not self.folder_tree.tag_has("placeholder", children[0]):
+            return
+        self.folder_tree.delete(children[0])
+        for subfolder in self.item_folders[item].subfolders:
+            self.insert_tree_node(item, subfolder)
+    
+    def on_tree_open(self, event):
+        """Fill in a node's subfolders the first time it is expanded, or
+        once the running task is done, since it may be adding them"""
+        item = self.folder_tree.focus()
+        if self.tasks.busy:
+            self.tree_pending.add(item)
+            self.update_status(f"Subfolders are listed when '{self.tasks.current.name}' finishes")
+            return
+        self.populate_tree_node(item)
+    
+    def update_tree_node(self, folder):
+        """Bring the displayed subfolders of folder, and of its expanded
+        descendants, in line with the tree. Collapsed or never-shown
+        parts are left alone, they are read when expanded"""
+        item = self.tree_items.get(folder)
+        if item is None:
+            return
+        stack = [(folder, item)]
+        while stack:
+            folder, item = stack.pop()
+            children = self.folder_tree.get_children(item)
+            if children and self.folder_tree.tag_has("placeholder", children[0]):
+                continue
+            if not children:
+                if folder.total_folders > 1:
+                    self.folder_tree.insert(item, "end", text="...", tags=("placeholder",))
+                continue
+            
+            shown = {self.item_folders[child]: child for child in children}
+            for subfolder in folder.subfolders:
+                child = shown.pop(subfolder, None)
+                if child is None:
+                    self.insert_tree_node(item, subfolder)
+                else:
+                    stack.append((subfolder, child))
+            for child in shown.values():  # no longer a subfolder here
+                self.forget_tree_item(child)
+    
+    def forget_tree_item(self, item):
+        """Delete an item and drop it and its descendants from the maps"""
+        stack = [item]
+        while stack:
+            current = stack.pop()
+            folder = self.item_folders.pop(current, None)
+            if folder is not None:
+                del self.tree_items[folder]
+            stack.extend(self.folder_tree.get_children(current))
+        self.folder_tree.delete(item)
+    
+    def refresh_folder_view(self):
+        """Refresh the file list and path for the current folder. The
+        folder tree is patched by the operations that change it"""
+        self.refresh_file_list()
+        self.path_label.config(text=self.current_folder.get_path())
+    
+    def refresh_file_list(self):
+        """Refresh the file list for current folder"""
+        files = self.current_folder.sorted_files()
+        if self.file_filter:
+            self.file_view = [name for name in files if self.file_filter in name.lower()]
+        else:
+            self.file_view = files  # the folder's own sorted index, no copy
+        if self.file_view_folder is not self.current_folder:
+            self.file_view_folder = self.current_folder
+            self.file_offset = 0
+        self.render_file_list()
+        
+        # Show folder count info
+        folder_count = len(self.current_folder.subfolders)
+        file_count = len(self.current_folder.files)
+        self.update_status(f"Current folder: {folder_count} folders, {file_count} files")
+    
+    def visible_file_rows(self):
+        return max(1, self.file_listbox.winfo_height() // self.file_row_height)
+    
+    def render_file_list(self):
+        """Show the rows of file_view that fit in the listbox"""
+        rows = self.visible_file_rows()
+        total = len(self.file_view)
+        self.file_offset = max(0, min(self.file_offset, total - rows))
+        window = self.file_view[self.file_offset:self.file_offset + rows]
+        
+        self.file_listbox.delete(0, tk.END)
+        self.file_listbox.insert(tk.END, *(f"📄 {name}" for name in window))
+        if total:
+            self.file_scroll.set(self.file_offset / total, (self.file_offset + len(window)) / total)
+        else:
+            self.file_scroll.set(0, 1)
+    
+    def scroll_file_list(self, action, amount, unit=None):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', n, unit)"""
+        if action == "moveto":
+            self.file_offset = int(float(amount) * len(self.file_view))
+        else:
+            step = self.visible_file_rows() if unit == "pages" else 1
+            self.file_offset += int(amount) * step
+        self.render_file_list()
+    
+    def on_file_list_wheel(self, event):
+        self.scroll_file_list("scroll", -3 if event.delta > 0 else 3, "units")
+    
+    def on_filter_typed(self, event):
+        """Narrow the file list as the filter text grows"""
+        text = self.filter_var.get().strip().lower()
+        if text == self.file_filter:
+            return
+        if self.tasks.busy:
+            # The folder may be changing under a running task
+            self.file_filter = text
+            self.view_pending = True
+            return
+        if self.file_filter and self.file_filter in text:
+            source = self.file_view  # every match is already in the view
+        else:
+            source = self.current_folder.sorted_files()
+        self.file_view = [name for name in source if text in name.lower()] if text else source
+        self.file_filter = text
+        self.file_offset = 0
+        self.render_file_list()
+    
+    def on_folder_select(self, event):
+        """Handle folder selection from tree"""
+        selection = self.folder_tree.selection()
+        if selection:
+            # Placeholder items map to no folder
+            folder = self.item_folders.get(selection[0])
+            if folder is not None:
+                self.current_folder = folder
+                self.show_current_folder()
+    
+    def show_current_folder(self):
+        """List the current folder's files now, or once the running task
+        is done, since its files may be changing under it"""
+        if self.tasks.busy:
+            self.path_label.config(text=self.current_folder.get_path())
+            self.view_pending = True
+            self.update_status(f"Files are listed when '{self.tasks.current.name}' finishes")
+            return False
+        self.refresh_folder_view()
+        return True
+    
+    def add_file(self):
+        """Add a new file dialog"""
+        if not self.check_idle():
+            return
+        filename = simpledialog.askstring("Add File", "Enter filename:")
+        if filename:
+            if not self.validate_filename(filename):
+                return
+            
+            folder_path = self.current_folder.get_path()
+            if folder_path == "Root":
+                folder_path = ""
+            else:
+                folder_path = folder_path[5:]  # Remove "Root/" prefix
+            
+            success, message = self.organizer.add_file(filename, folder_path)
+            
+            if success:
+                self.refresh_folder_view()
+                messagebox.showinfo("Success", message)
+                self.update_status(f"Added file: {filename}")
+            else:
+                messagebox.showerror("Error", message)
+                self.update_status(f"Failed to add file: {filename}")
+    
+    def delete_file(self):
+        """Delete selected file"""
+        if not self.check_idle():
+            return
+        selection = self.file_listbox.curselection()
+        if not selection:
+            messagebox.showwarning("No Selection", "Please select a file to delete")
+            return
+        
+        filename = self.file_listbox.get(selection[0]).replace("📄 ", "")
+        
+        result = messagebox.askyesno("Confirm Delete", f"Delete file '{filename}'?")
+        if result:
+            success, message = self.organizer.delete_file(filename, self.current_folder.get_path())
+            
+            if success:
+                self.refresh_folder_view()
+                messagebox.showinfo("Success", message)
+                self.update_status(f"Deleted file: {filename}")
+            else:
+                messagebox.showerror("Error", message)
+                self.update_status(f"Failed to delete file: {filename}")
+    
+    def search_file(self):
+        """Search for a file"""
+        filename = simpledialog.askstring("Search File", "Enter filename or part of one:")
+        if filename:
+            self.show_search_result(filename)
+    
+    def on_search_typed(self, event):
+        """Update the completions after each keystroke"""
+        if event.keysym in ("Return", "Down", "Escape"):
+            return
+        prefix = self.search_var.get().strip()
+        # The indexes may be changing under a running task: no completions then
+        busy = self.tasks.busy
+        completions = self.organizer.complete_filename(prefix) if prefix and not busy else []
+        
+        self.completion_listbox.delete(0, tk.END)
+        for name in completions:
+            self.completion_listbox.insert(tk.END, name)
+        if completions:
+            self.completion_listbox.pack(fill="x", padx=(105, 0))
+        else:
+            self.hide_completions()
+    
+    def hide_completions(self):
+        self.completion_listbox.pack_forget()
+    
+    def focus_completions(self, event):
+        """Move from the entry into the completion list"""
+        if self.completion_listbox.size():
+            self.completion_listbox.focus_set()
+            self.completion_listbox.selection_clear(0, tk.END)
+            self.completion_listbox.selection_set(0)
+            self.completion_listbox.activate(0)
+    
+    def on_completion_chosen(self, event):
+        selection = self.completion_listbox.curselection()
+        if selection:
+            name = self.completion_listbox.get(selection[0])
+            self.search_var.set(name)
+            self.run_quick_search(name)
+    
+    def run_quick_search(self, filename):
+        """Search for the text in the quick search entry"""
+        self.hide_completions()
+        self.search_entry.focus_set()
+        if filename.strip():
+            self.show_search_result(filename.strip())
+    
+    def show_search_result(self, filename):
+        """Look up a name or path, falling back to a substring search.
+        Runs as a task, so it waits for a running import instead of
+        reading the indexes while they change"""
+        def work(task):
+            success, message = self.organizer.search_file(filename)
+            if success:
+                return success, message, None
+            matches = self.organizer.search_files(filename, limit=SEARCH_RESULT_LIMIT + 1,
+                                                  cancel=task.cancel_event)
+            task.check()
+            return success, message, matches
+        
+        def show(result):
+            success, message, matches = result
+            if success:
+                messagebox.showinfo("Search Result", message)
+                self.update_status(f"Found: {filename}")
+            elif matches:
+                lines = [match['full_path'] for match in matches[:SEARCH_RESULT_LIMIT]]
+                if len(matches) > SEARCH_RESULT_LIMIT:
+                    lines.append(f"... more than {SEARCH_RESULT_LIMIT} matches, refine the search")
+                messagebox.showinfo("Search Result", f"Files containing '{filename}':\n" + "\n".join(lines))
+                self.update_status(f"{min(len(matches), SEARCH_RESULT_LIMIT)} files contain: {filename}")
+            else:
+                messagebox.showwarning("Search Result", message)
+                self.update_status(f"Not found: {filename}")
+        
+        self.run_task(f"Searching for '{filename}'", work, show)
+    
+    def create_folder(self):
+        """Create a new folder"""
+        if not self.check_idle():
+            return
+        folder_name = simpledialog.askstring("New Folder", "Enter folder name:")
+        if folder_name:
+            if not self.validate_foldername(folder_name):
+                return
+            
+            # Check if folder already exists
+            if self.current_folder.get_subfolder(folder_name):
+                messagebox.showerror("Error", f"Folder '{folder_name}' already exists")
+                return
+            
+            base = self.current_folder.get_path()
+            base = "" if base == "Root" else base[5:] + "/"  # Remove "Root/" prefix
+            self.organizer.create_folders(base + folder_name)
+            self.update_tree_node(self.current_folder)
+            self.refresh_folder_view()
+            messagebox.showinfo("Success", f"Created folder '{folder_name}'")
+            self.update_status(f"Created folder: {folder_name}")
+    
+    def rename_folder(self):
+        """Rename the current folder"""
+        if not self.check_idle():
+            return
+        folder = self.current_folder
+        if folder.parent is None:
+            messagebox.showwarning("Root Folder", "The root folder cannot be renamed")
+            return
+        new_name = simpledialog.askstring("Rename Folder", "Enter new folder name:",
+                                          initialvalue=folder.name)
+        if not new_name or new_name == folder.name or not self.validate_foldername(new_name):
+            return
+        
+        success, message = self.organizer.rename_folder(folder.get_path(), new_name)
+        if success:
+            item = self.tree_items.get(folder)
+            if item is not None:
+                self.folder_tree.item(item, text=f"📁 {folder.name}")
+            self.refresh_folder_view()
+            self.update_status(message)
+        else:
+            messagebox.showerror("Error", message)
+    
+    def move_folder(self):
+        """Move the current folder under another folder"""
+        if not self.check_idle():
+            return
+        folder = self.current_folder
+        if folder.parent is None:
+            messagebox.showwarning("Root Folder", "The root folder cannot be moved")
+            return
+        dest_path = simpledialog.askstring("Move Folder",
+                                           f"Move '{folder.name}' into folder (e.g. Root/Documents):")
+        if dest_path is None:
+            return
+        
+        old_parent = folder.parent
+        success, message = self.organizer.move_folder(folder.get_path(), dest_path.strip())
+        if success:
+            self.update_tree_node(old_parent)
+            self.update_tree_node(folder.parent)
+            self.refresh_folder_view()
+            self.update_status(message)
+        else:
+            messagebox.showerror("Error", message)
+    
+    def delete_folder(self):
+        """Delete the current folder and everything in it"""
+        if not self.check_idle():
+            return
+        folder = self.current_folder
+        if folder.parent is None:
+            messagebox.showwarning("Root Folder", "The root folder cannot be deleted")
+            return
+        stats = self.organizer.get_statistics(folder)
+        if not messagebox.askyesno("Confirm Delete",
+                                   f"Delete folder '{folder.get_path()}' with {stats['folders'] - 1} "
+                                   f"subfolders and {stats['files']} files?"):
+            return
+        
+        parent = folder.parent
+        success, message = self.organizer.delete_folder(folder.get_path())
+        if success:
+            self.current_folder = parent
+            self.update_tree_node(parent)
+            self.refresh_folder_view()
+            self.update_status(message)
+        else:
+            messagebox.showerror("Error", message)
+    
+    def import_folder(self):
+        """Import a real directory tree into the current folder, on the
+        worker thread"""
+        if not self.check_idle():
+            return
+        directory = filedialog.askdirectory(title="Import Folder")
+        if not directory:
+            return
+        
+        target = self.current_folder
+        base = target.get_path()
+        base = "" if base == "Root" else base[5:] + "/"  # Remove "Root/" prefix
+        dest = base + (os.path.basename(os.path.normpath(directory)) or "Imported")
+        
+        def work(task):
+            scanner = DirectoryScanner(self.organizer, exclude=[".git", "__pycache__"], freeze=True)
+            return scanner.scan(directory, dest, progress=lambda report: task.report(report['added']),
+                                cancel=task.cancel_event)
+        
+        def show_progress(added):
+            self.status_bar.config(text=f"Importing... {added} files added")
+        
+        def finish(report):
+            self.update_tree_node(target)
+            self.refresh_folder_view()
+            title = "Import Cancelled" if report['cancelled'] else "Import Complete"
+            message = (f"Imported {report['added']} files in {report['folders']} folders\n"
+                       f"Duplicates skipped: {report['duplicates']}\n"
+                       f"Unreadable entries: {len(report['errors'])}")
+            messagebox.showinfo(title, message)
+            self.update_status(f"Imported {report['added']} files from {directory}")
+        
+        self.run_task(f"Importing {directory}", work, finish, on_progress=show_progress)
+    
+    def find_duplicates(self):
+        """Look for imported files with identical content under the
+        current folder, on the worker thread"""
+        if not self.check_idle():
+            return
+        folder_path = self.current_folder.get_path()
+        
+        def work(task):
+            return self.organizer.find_duplicates(folder_path, cancel=task.cancel_event)
+        
+        def finish(report):
+            groups = report['groups']
+            if not groups:
+                messagebox.showinfo("Duplicates", f"No duplicate files under {folder_path}")
+            else:
+                lines = [f"{len(groups)} groups, {report['reclaimable']:,} bytes reclaimable\n"]
+                for group in groups[:SEARCH_RESULT_LIMIT]:
+                    lines.append(f"{len(group['files'])} × {group['size']:,} bytes:")
+                    lines.extend(f"   {path}" for path in group['files'])
+                if len(groups) > SEARCH_RESULT_LIMIT:
+                    lines.append(f"... and {len(groups) - SEARCH_RESULT_LIMIT} more groups")
+                title = "Duplicates (cancelled, partial)" if report['cancelled'] else "Duplicates"
+                messagebox.showinfo(title, "\n".join(lines))
+            self.update_status(f"Found {len(groups)} duplicate groups under {folder_path}")
+        
+        self.run_task(f"Finding duplicates under {folder_path}", work, finish)
+    
+    def go_to_root(self):
+        """Navigate to root folder"""
+        self.current_folder = self.organizer.tree
+        root_item = self.tree_items[self.current_folder]
+        self.folder_tree.selection_set(root_item)
+        self.folder_tree.see(root_item)
+        if self.show_current_folder():
+            self.update_status("Navigated to Root")
+    
+    def show_stats(self):
+        """Show system statistics. Collected as a task, so the numbers
+        are read between writes, not during them"""
+        folder = self.current_folder
+        
+        def finish(stats_message):
+            messagebox.showinfo("System Statistics", stats_message)
+            self.update_status("Displayed system statistics")
+        
+        self.run_task("Collecting statistics", lambda task: self.stats_message(folder), finish)
+    
+    def stats_message(self, folder):
+        """Text of the statistics dialog (on the worker thread)"""
+        # Subtree totals are kept by the tree, no walk needed
+        totals = self.organizer.get_statistics()
+        here = self.organizer.get_statistics(folder)
+        
+        stats_message = f"""System Statistics:
+
+📁 Total Folders: {totals['folders']}
+📄 Total Files: {totals['files']}
+💾 Total Size: {totals['bytes']:,} bytes
+🗂️ Hash Table Size: {self.organizer.hash_table.size}
+📊 Files in Hash Table: {self.organizer.hash_table.count}
+⚡ Load Factor: {self.organizer.hash_table.count/self.organizer.hash_table.size:.2f}
+🔄 Collisions: {self.organizer.hash_table.collision_count}
+📂 Current Folder: {folder.get_path()}
+   {here['folders'] - 1} folders and {here['files']} files inside it
+        """
+        largest = self.organizer.largest_files(5, folder.get_path())
+        if largest:
+            stats_message += "\nLargest Files Here:\n" + "\n".join(
+                f"📦 {match['size']:,} bytes  {match['full_path']}" for match in largest)
+        if self.organizer.metrics:
+            stats_message += self.format_metrics(self.organizer.metrics.snapshot())
+        return stats_message
+    
+    def format_metrics(self, metrics):
+        """Hot-path section of the statistics dialog"""
+        lines = ["\nHot Paths (since startup):"]
+        for op, probes in metrics['probes'].items():
+            lines.append(f"🔎 {op.title()} probes: mean {probes['mean']:.2f}, "
+                         f"p99 {probes['p99']}, max {probes['max']}")
+        lines.append(f"🔄 Rehashes: {metrics['rehashes']} ({metrics['rehash_seconds'] * 1000:.1f} ms)")
+        lines.append(f"🪦 Tombstone Ratio: {metrics['gauges'].get('hash_tombstone_ratio', 0):.3f}")
+        for op, latency in sorted(metrics['operations'].items()):
+            if latency['count'] and not op.startswith('hash.'):
+                lines.append(f"⏱️ {op}: {latency['count']} calls, p50 {latency['p50_us']:.0f} µs, "
+                             f"p99 {latency['p99_us']:.0f} µs")
+        return "\n".join(lines)
+    
+    def validate_filename(self, filename):
+        """Validate filename input"""
+        if not filename.strip():
+            messagebox.showerror("Invalid Input", "Filename cannot be empty")
+            return False
+        
+        invalid_chars = ['/', '\\', ':', '*', '?', '"', '<', '>', '|']
+        for char in invalid_chars:
+            if char in filename:
+                messagebox.showerror("Invalid Input", 
+                                   f"Filename cannot contain: {' '.join(invalid_chars)}")
+                return False
+        
+        return True
+    
+    def validate_foldername(self, foldername):
+        """Validate folder name input"""
+        if not foldername.strip():
+            messagebox.showerror("Invalid Input", "Folder name cannot be empty")
+            return False
+        
+        invalid_chars = ['/', '\\', ':', '*', '?', '"', '<', '>', '|']
+        for char in invalid_chars:
+            if char in foldername:
+                messagebox.showerror("Invalid Input", 
+                                   f"Folder name cannot contain: {' '.join(invalid_chars)}")
+                return False
+        
+        return True
+    
+    def load_sample_data(self):
+        """Load some sample data for demonstration"""
+        # Create sample folder structure
+        self.organizer.create_folders("Documents/Assignments")
+        self.organizer.create_folders("Documents/Notes")
+        self.organizer.create_folders("Pictures/Vacation")
+        self.organizer.create_folders("Music/Rock")
+        
+        # Add sample files
+        sample_files = [
+            ("project.pdf", "Documents/Assignments"),
+            ("homework.docx", "Documents/Assignments"),
+            ("notes.txt", "Documents/Notes"),
+            ("beach.jpg", "Pictures/Vacation"),
+            ("song1.mp3", "Music/Rock")
+        ]
+        
+        self.organizer.add_files(sample_files)
+        
+        self.refresh_folder_tree()
+        self.refresh_folder_view()
+        self.update_status("Loaded sample data")
+    
+    def load_saved_data(self):
+        """Restore the last session from its snapshot and journal.
+        Returns False when there was nothing saved yet"""
+        try:
+            replayed = self.organizer.open_store(SNAPSHOT_PATH, JOURNAL_PATH)
+        except (OSError, ValueError) as error:
+            messagebox.showwarning("Snapshot", f"Could not load saved catalogue: {error}")
+            self.organizer = FileOrganizer()
+            self.current_folder = self.organizer.tree
+            return False
+        
+        if replayed > self.organizer.journal.compact_every // 10:
+            self.organizer.compact()
+        
+        self.current_folder = self.organizer.tree
+        self.refresh_folder_tree()
+        self.refresh_folder_view()
+        self.update_status("Loaded saved catalogue")
+        return self.organizer.applied_lsn > 0
+    
+    def on_close(self):
+        """Stop background tasks, flush the journal and close the window"""
+        self.tasks.shutdown()
+        try:
+            self.organizer.close_store()
+        except OSError as error:
+            if not messagebox.askyesno("Journal", f"Could not save catalogue: {error}\nQuit anyway?"):
+                return
+        self.root.destroy()
+    
+    def run(self):
+        """Start the GUI application"""
+        # Restore the last session, or load sample data the first time
+        if not self.load_saved_data():
+            self.load_sample_data()
+        
+        self.update_status("File Organizer ready - Group 8 DSA Project")
+        self.root.mainloop()
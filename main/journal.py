@@ -0,0 +1,160 @@
+# Append-only operation journal for the File Organizer
+# Records are JSON lines [lsn, op, path, *args] written in groups, so the cost
+# per operation is a buffered append. Segments are replayed on top of
+# the last snapshot at startup and folded into a new snapshot by a
+# background compaction thread
+
+import glob
+import json
+import os
+import threading
+
+
+FSYNC_POLICIES = ('always', 'batch', 'never')
+
+
+class Journal:
+    def __init__(self, base_path, start_lsn=0, fsync='batch', batch_size=256,
+                 flush_interval=0.05, compact_every=100000):
+        """Records go to <base_path>.<n>.log, a new segment per session.
+        fsync is 'always' (sync every record), 'batch' (sync once per
+        group of up to batch_size records or every flush_interval
+        seconds) or 'never' (leave it to the OS)"""
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}'")
+        self.base_path = base_path
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compact_every = compact_every
+        self.lsn = start_lsn
+        self.records = 0  # appended since the last rotation
+        
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._buffer = []
+        segments = journal_segments(base_path)
+        self.segment = segments[-1] + 1 if segments else 1
+        self._file = open(segment_path(base_path, self.segment), 'a', encoding='utf-8')
+        
+        self._closed = threading.Event()
+        self._flusher = None
+        if fsync != 'always':
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+    
+    def append(self, op, path, *args):
+        """Queue a record and return its log sequence number"""
+        with self._lock:
+            self.lsn += 1
+            self.records += 1
+            self._buffer.append(json.dumps([self.lsn, op, path, *args]))
+            if self.fsync == 'always' or len(self._buffer) >= self.batch_size:
+                self._flush_locked()
+            return self.lsn
+    
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+    
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        self._file.write("\n".join(self._buffer) + "\n")
+        self._buffer.clear()
+        self._file.flush()
+        if self.fsync != 'never':
+            os.fsync(self._file.fileno())
+    
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+    
+    def rotate(self):
+        """Start a new segment; returns the numbers of the closed ones"""
+        with self._lock:
+            self._flush_locked()
+            self._file.close()
+            self.segment += 1
+            self.records = 0
+            self._file = open(segment_path(self.base_path, self.segment), 'a', encoding='utf-8')
+        return [n for n in journal_segments(self.base_path) if n < self.segment]
+    
+    def close(self):
+        self._closed.set()
+        if self._flusher:
+            self._flusher.join()
+        with self._lock:
+            self._flush_locked()
+            self._file.close()
+        # Let a running compaction finish its snapshot
+        with self._compact_lock:
+            pass
+
+
+def segment_path(base_path, number):
+    return f"{base_path}.{number:06d}.log"
+
+def journal_segments(base_path):
+    """Numbers of the existing segments, oldest first"""
+    numbers = []
+    for path in glob.glob(glob.escape(base_path) + ".*.log"):
+        number = path[len(base_path) + 1:-4]
+        if number.isdigit():
+            numbers.append(int(number))
+    return sorted(numbers)
+
+def read_records(base_path, segments=None):
+    """Yield (lsn, op, path, args) from the segments in order. A torn
+    record at the end of a segment (crash during a write) ends that segment"""
+    for number in journal_segments(base_path) if segments is None else segments:
+        with open(segment_path(base_path, number), encoding='utf-8') as segment:
+            for line in segment:
+                try:
+                    lsn, op, path, *args = json.loads(line)
+                except ValueError:
+                    break
+                yield lsn, op, path, args
+
+
+def replay_journal(organizer, base_path, segments=None):
+    """Apply journal records newer than organizer.applied_lsn, without
+    journaling them again. Returns the number of records applied"""
+    journal = organizer.journal
+    organizer.journal = None
+    applied = 0
+    try:
+        for lsn, op, path, args in read_records(base_path, segments):
+            if lsn <= organizer.applied_lsn:
+                continue  # already in the snapshot
+            organizer.apply_record(op, path, *args)
+            organizer.applied_lsn = lsn
+            applied += 1
+    finally:
+        organizer.journal = journal
+    return applied
+
+
+def compact_journal(journal, snapshot_path, new_organizer):
+    """Fold the closed journal segments into a new snapshot on a
+    background thread; new_organizer() makes the scratch organizer.
+    Returns the thread, or None if a compaction is already running"""
+    if not journal._compact_lock.acquire(blocking=False):
+        return None
+    segments = journal.rotate()
+    
+    def compact():
+        try:
+            organizer = new_organizer()
+            if os.path.exists(snapshot_path):
+                organizer.load_snapshot(snapshot_path)
+            replay_journal(organizer, journal.base_path, segments)
+            organizer.save_snapshot(snapshot_path)
+            for number in segments:
+                os.remove(segment_path(journal.base_path, number))
+        finally:
+            journal._compact_lock.release()
+    
+    thread = threading.Thread(target=compact, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,263 @@
+# Per-file metadata for the File Organizer
+# Size and modification time of imported files, with secondary
+# structures that answer "largest / newest files under X", "modified
+# since T" and "size histogram by folder" without visiting every file:
+# - each folder keeps upper bounds of the largest size and latest mtime
+#   in its subtree, so whole subtrees are skipped
+# - each folder's own files are sorted by size and by mtime on first use
+#   and kept in order afterwards (like FolderTree.sorted_files)
+# - each folder counts the files in its subtree per power-of-two size
+#   bucket, kept up to date along the ancestor chain like the subtree totals
+# The type is not stored: it is guessed from the extension on demand
+
+from bisect import bisect_left, insort
+from heapq import heappop, heappush
+from itertools import count
+
+
+KEYS = ('size', 'mtime')
+
+
+def file_type(filename):
+    """MIME type guessed from the name, 'application/octet-stream' if unknown"""
+    import mimetypes  # reads the system type tables, only needed here
+    return mimetypes.guess_type(filename, strict=False)[0] or 'application/octet-stream'
+
+def size_bucket(size):
+    """Histogram bucket of a size: 0 for empty files, else n for sizes
+    from 2**(n-1) to 2**n - 1"""
+    return size.bit_length()
+
+def bucket_range(bucket):
+    """(smallest, largest) size that falls into bucket"""
+    if bucket == 0:
+        return 0, 0
+    return 1 << (bucket - 1), (1 << bucket) - 1
+
+
+class MetadataIndex:
+    """(size, mtime) of files with known metadata, keyed by folder node.
+    With a snapshot as base, the saved metadata is read on first use"""
+    
+    def __init__(self, base=None):
+        self.files = {}  # folder -> {filename: (size, mtime)}
+        self.count = 0
+        # key -> {folder: upper bound of the largest value in its subtree}.
+        # Bounds only grow; deletes leave them high until a query meets them
+        self._bounds = {key: {} for key in KEYS}
+        self._sorted = {key: {} for key in KEYS}  # key -> {folder: [(value, filename)]}
+        self._histograms = {}  # folder -> [[files], [bytes]] by size bucket, whole subtree
+        self._base = base
+    
+    def __len__(self):
+        self._load_base()
+        return self.count
+    
+    def _load_base(self):
+        snapshot = self._base
+        if snapshot is None:
+            return
+        self._base = None
+        for folder, filename, size, mtime in snapshot.file_metadata():
+            self.add(folder, filename, size, mtime)
+    
+    def add(self, folder, filename, size, mtime):
+        self._load_base()
+        self.remove(folder, filename)  # replacing: may drop the folder's dict
+        own = self.files.get(folder)
+        if own is None:
+            own = self.files[folder] = {}
+        own[filename] = (size, mtime)
+        self.count += 1
+        
+        for key, value in zip(KEYS, (size, mtime)):
+            ordered = self._sorted[key].get(folder)
+            if ordered is not None:
+                insort(ordered, (value, filename))
+            self._raise_bounds(key, folder, value)
+        self._count_file(folder, size, 1)
+    
+    def _count_file(self, folder, size, sign):
+        """Count one file of size (sign -1 to uncount it) in the histograms
+        of folder and its ancestors"""
+        histograms = self._histograms
+        bucket = size_bucket(size)
+        node = folder
+        while node is not None:
+            files, total = histograms.get(node) or histograms.setdefault(node, [[], []])
+            if bucket >= len(files):
+                files.extend([0] * (bucket + 1 - len(files)))
+                total.extend([0] * (bucket + 1 - len(total)))
+            files[bucket] += sign
+            total[bucket] += sign * size
+            node = node.parent
+    
+    def _add_histograms(self, folder, histogram, sign=1):
+        """Add histogram (times sign) to folder and its ancestors"""
+        histograms = self._histograms
+        node = folder
+        while node is not None:
+            files, total = histograms.get(node) or histograms.setdefault(node, [[], []])
+            if len(histogram[0]) > len(files):
+                files.extend([0] * (len(histogram[0]) - len(files)))
+                total.extend([0] * (len(histogram[0]) - len(total)))
+            for bucket, n in enumerate(histogram[0]):
+                if n:
+                    files[bucket] += sign * n
+                    total[bucket] += sign * histogram[1][bucket]
+            node = node.parent
+    
+    def _raise_bounds(self, key, folder, value):
+        """Raise the bound of folder and its ancestors to at least value.
+        Stops at the first ancestor already that high"""
+        bounds = self._bounds[key]
+        node = folder
+        while node is not None:
+            bound = bounds.get(node)
+            if bound is not None and bound >= value:
+                return
+            bounds[node] = value
+            node = node.parent
+    
+    def remove(self, folder, filename):
+        """Forget a file's metadata. False if it had none"""
+        self._load_base()
+        own = self.files.get(folder)
+        if own is None or filename not in own:
+            return False
+        size, mtime = own.pop(filename)
+        if not own:
+            del self.files[folder]
+        self.count -= 1
+        
+        for key, value in zip(KEYS, (size, mtime)):
+            ordered = self._sorted[key].get(folder)
+            if ordered is not None:
+                del ordered[bisect_left(ordered, (value, filename))]
+        self._count_file(folder, size, -1)
+        return True
+    
+    def folder_files(self, folder):
+        """{filename: (size, mtime)} of folder's own files with metadata"""
+        self._load_base()
+        return self.files.get(folder, {})
+    
+    def get(self, folder, filename):
+        """(size, mtime) of a file, or None without metadata"""
+        self._load_base()
+        own = self.files.get(folder)
+        return own.get(filename) if own else None
+    
+    def detach(self, folder):
+        """Take a folder's subtree out of its ancestors' histograms, before
+        it is moved or deleted. The ancestors' bounds stay as they are"""
+        self._load_base()
+        histogram = self._histograms.get(folder)
+        if histogram is not None and folder.parent is not None:
+            self._add_histograms(folder.parent, histogram, -1)
+    
+    def attach(self, folder):
+        """Add a moved folder's subtree to its new ancestors"""
+        self._load_base()
+        if folder.parent is None:
+            return
+        histogram = self._histograms.get(folder)
+        if histogram is not None:
+            self._add_histograms(folder.parent, histogram)
+        for key in KEYS:
+            bound = self._bounds[key].get(folder)
+            if bound is not None:
+                self._raise_bounds(key, folder.parent, bound)
+    
+    def drop_folders(self, folders):
+        """Forget deleted folders (detached first, their files removed one by one)"""
+        self._load_base()
+        for folder in folders:
+            for key in KEYS:
+                self._bounds[key].pop(folder, None)
+                self._sorted[key].pop(folder, None)
+            self._histograms.pop(folder, None)
+    
+    def _sorted_files(self, key, folder):
+        """[(value, filename)] of folder's own files in ascending order"""
+        ordered = self._sorted[key].get(folder)
+        if ordered is None:
+            index = KEYS.index(key)
+            own = self.files.get(folder, {})
+            ordered = self._sorted[key][folder] = sorted(
+                (info[index], filename) for filename, info in own.items())
+        return ordered
+    
+    def top(self, key, scope, k):
+        """The k files under scope with the largest key value, as
+        (folder, filename, value), largest first. Best-first search:
+        subtrees are expanded in order of their bound and each folder's
+        files are read from its sorted list, so only folders whose bound
+        beats the k-th result are visited"""
+        self._load_base()
+        bounds = self._bounds[key]
+        tiebreak = count()
+        heap = []  # (-value, tiebreak, folder, position in its sorted files or None)
+        if scope in bounds:
+            heappush(heap, (-bounds[scope], next(tiebreak), scope, None))
+        results = []
+        while heap and len(results) < k:
+            value, _, folder, position = heappop(heap)
+            if position is None:
+                # Expanding a folder also tightens its bound
+                ordered = self._sorted_files(key, folder)
+                bound = ordered[-1][0] if ordered else None
+                if ordered:
+                    heappush(heap, (-ordered[-1][0], next(tiebreak), folder, len(ordered) - 1))
+                for child in folder.subfolders:
+                    child_bound = bounds.get(child)
+                    if child_bound is not None:
+                        heappush(heap, (-child_bound, next(tiebreak), child, None))
+                        if bound is None or child_bound > bound:
+                            bound = child_bound
+                if bound is None:
+                    del bounds[folder]
+                else:
+                    bounds[folder] = bound
+            else:
+                results.append((folder, self._sorted[key][folder][position][1], -value))
+                if position > 0:
+                    previous = self._sorted[key][folder][position - 1][0]
+                    heappush(heap, (-previous, next(tiebreak), folder, position - 1))
+        return results
+    
+    def at_least(self, key, scope, value):
+        """(folder, filename, value) of every file under scope whose key
+        value is at least value; subtrees bounded below it are skipped"""
+        self._load_base()
+        bounds = self._bounds[key]
+        results = []
+        stack = [scope]
+        while stack:
+            folder = stack.pop()
+            bound = bounds.get(folder)
+            if bound is None or bound < value:
+                continue
+            ordered = self._sorted_files(key, folder)
+            for position in range(bisect_left(ordered, (value,)), len(ordered)):
+                found, filename = ordered[position]
+                results.append((folder, filename, found))
+            stack.extend(folder.subfolders)
+        return results
+    
+    def histogram(self, folder):
+        """[[files], [bytes]] by size bucket for the subtree of folder"""
+        self._load_base()
+        files, total = self._histograms.get(folder) or ([], [])
+        return [list(files), list(total)]
+    
+    def own_histogram(self, folder):
+        """[[files], [bytes]] by size bucket of folder's own files: its
+        subtree minus its subfolders' subtrees"""
+        files, total = self.histogram(folder)
+        for child in folder.subfolders:
+            child_files, child_total = self._histograms.get(child) or ([], [])
+            for bucket, n in enumerate(child_files):
+                files[bucket] -= n
+                total[bucket] -= child_total[bucket]
+        return [files, total]
@@ -0,0 +1,264 @@
+# Hot-path metrics for the File Organizer
+# Instrumenting a FileHashTable or FileOrganizer replaces some of its
+# methods, on that instance only, with wrappers that record probe
+# lengths and latencies. Without instrumentation the class methods run
+# as they are, so the disabled mode costs nothing
+
+import json
+from time import perf_counter_ns
+
+
+PROBE_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 12, 16, 32, 64, 128)
+QUANTILES = (0.5, 0.9, 0.99)
+LATENCY_SUB_BUCKETS = 8  # per power of two, so bucket bounds are within 12.5%
+
+# Methods timed by instrument_organizer
+ORGANIZER_OPERATIONS = (
+    'add_file', 'add_files', 'delete_file', 'search_file', 'search_files',
+    'complete_filename', 'largest_files', 'newest_files', 'modified_since', 'size_histogram',
+    'find_duplicates', 'rename_folder', 'move_folder', 'delete_folder',
+    'save_snapshot', 'load_snapshot',
+)
+
+
+class ProbeHistogram:
+    """Counts of small integer values (probe lengths), one slot each"""
+    
+    def __init__(self):
+        self.counts = [0]  # counts[n] = observations of value n
+        self.total = 0
+        self.count = 0
+    
+    def observe(self, value):
+        counts = self.counts
+        if value >= len(counts):
+            counts.extend([0] * (value + 1 - len(counts)))
+        counts[value] += 1
+        self.total += value
+        self.count += 1
+    
+    def percentile(self, fraction):
+        rank = fraction * self.count
+        seen = 0
+        for value, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return value
+        return 0
+    
+    def snapshot(self):
+        counts = list(self.counts)
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(0.5),
+            'p99': self.percentile(0.99),
+            'max': max((value for value, n in enumerate(counts) if n), default=0),
+            'histogram': {value: n for value, n in enumerate(counts) if n},
+        }
+
+
+class LatencyHistogram:
+    """Durations in ns in log-linear buckets: exact below 16 ns, then
+    LATENCY_SUB_BUCKETS buckets per power of two. Memory stays a few
+    hundred counters however many calls are recorded"""
+    
+    def __init__(self):
+        self.counts = []
+        self.total = 0
+        self.count = 0
+        self.max = 0
+    
+    @staticmethod
+    def bucket(ns):
+        shift = max(0, ns.bit_length() - 4)
+        return shift * LATENCY_SUB_BUCKETS + (ns >> shift)
+    
+    @staticmethod
+    def upper_bound(index):
+        """Largest duration that falls into bucket index"""
+        if index < 2 * LATENCY_SUB_BUCKETS:
+            return index
+        shift = index // LATENCY_SUB_BUCKETS - 1
+        mantissa = index - shift * LATENCY_SUB_BUCKETS
+        return ((mantissa + 1) << shift) - 1
+    
+    def observe(self, ns):
+        index = self.bucket(ns)
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += 1
+        self.total += ns
+        self.count += 1
+        if ns > self.max:
+            self.max = ns
+    
+    def percentile(self, fraction):
+        """Duration in ns below which fraction of the calls finished"""
+        rank = fraction * self.count
+        seen = 0
+        for index, n in enumerate(list(self.counts)):
+            seen += n
+            if n and seen >= rank:
+                return min(self.upper_bound(index), self.max)
+        return 0
+    
+    def snapshot(self):
+        snapshot = {
+            'count': self.count,
+            'total_seconds': self.total / 1e9,
+            'mean_us': self.total / self.count / 1000 if self.count else 0.0,
+            'max_us': self.max / 1000,
+        }
+        for q in QUANTILES:
+            snapshot[f"p{round(q * 100)}_us"] = self.percentile(q) / 1000
+        return snapshot
+
+
+class Metrics:
+    """Registry of the probe, latency and gauge metrics of one organizer"""
+    
+    def __init__(self):
+        self.probes = {}  # operation -> ProbeHistogram
+        self.latencies = {}  # operation -> LatencyHistogram
+        self.gauges = {}  # name -> function returning the current value
+    
+    def probe_histogram(self, operation):
+        histogram = self.probes.get(operation)
+        if histogram is None:
+            histogram = self.probes[operation] = ProbeHistogram()
+        return histogram
+    
+    def latency(self, operation):
+        histogram = self.latencies.get(operation)
+        if histogram is None:
+            histogram = self.latencies[operation] = LatencyHistogram()
+        return histogram
+    
+    def reset(self):
+        self.probes.clear()
+        self.latencies.clear()
+    
+    def snapshot(self):
+        """Current values as plain data, ready for JSON"""
+        rehash = self.latencies.get('rehash')
+        return {
+            'probes': {op: histogram.snapshot() for op, histogram in self.probes.items()},
+            'rehashes': rehash.count if rehash else 0,
+            'rehash_seconds': rehash.total / 1e9 if rehash else 0.0,
+            'operations': {op: histogram.snapshot() for op, histogram in self.latencies.items()
+                           if op != 'rehash' and histogram.count},
+            'gauges': {name: gauge() for name, gauge in self.gauges.items()},
+        }
+    
+    def to_json(self, indent=None):
+        return json.dumps(self.snapshot(), indent=indent)
+    
+    def to_prometheus(self, prefix="file_organizer"):
+        """Prometheus text exposition format"""
+        lines = [f"# TYPE {prefix}_hash_probes histogram"]
+        for op, histogram in self.probes.items():
+            counts = list(histogram.counts)
+            cumulative = 0
+            value = 0
+            for bound in PROBE_BUCKETS:
+                while value <= bound and value < len(counts):
+                    cumulative += counts[value]
+                    value += 1
+                lines.append(f'{prefix}_hash_probes_bucket{{op="{op}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_hash_probes_bucket{{op="{op}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{prefix}_hash_probes_sum{{op="{op}"}} {histogram.total}')
+            lines.append(f'{prefix}_hash_probes_count{{op="{op}"}} {histogram.count}')
+        
+        lines.append(f"# TYPE {prefix}_operation_seconds summary")
+        for op, histogram in self.latencies.items():
+            for q in QUANTILES:
+                lines.append(f'{prefix}_operation_seconds{{op="{op}",quantile="{q}"}} '
+                             f'{histogram.percentile(q) / 1e9:.9f}')
+            lines.append(f'{prefix}_operation_seconds_sum{{op="{op}"}} {histogram.total / 1e9:.9f}')
+            lines.append(f'{prefix}_operation_seconds_count{{op="{op}"}} {histogram.count}')
+        
+        for name, gauge in self.gauges.items():
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {gauge()}")
+        return "\n".join(lines) + "\n"
+
+
+def _timed(histogram, method):
+    clock = perf_counter_ns
+    
+    def timed(*args, **kwargs):
+        start = clock()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            histogram.observe(clock() - start)
+    return timed
+
+def _install(obj, name, wrapper):
+    obj.__dict__.setdefault('_instrumented', []).append(name)
+    setattr(obj, name, wrapper)
+
+def uninstrument(obj):
+    """Remove the wrappers, back to the plain class methods"""
+    for name in obj.__dict__.pop('_instrumented', ()):
+        obj.__dict__.pop(name, None)
+
+
+def instrument_table(table, metrics):
+    """Record probe lengths of inserts and searches, latencies of
+    inserts, searches and deletes, and every rehash (any full re-placement
+    of the entries, growing, shrinking or dropping tombstones)"""
+    uninstrument(table)
+    cls = type(table)
+    insert_probes = metrics.probe_histogram('insert')
+    search_probes = metrics.probe_histogram('search')
+    insert = _timed(metrics.latency('hash.insert'), cls.insert.__get__(table))
+    find_slot = table._find_slot
+    
+    def instrumented_insert(filename, location, replace=True):
+        inserted = insert(filename, location, replace)
+        if inserted:
+            # Slots examined to reach the new entry, as a search would
+            insert_probes.observe(find_slot(table._key(filename, location))[1])
+        return inserted
+    
+    def search(filename):
+        pos, probes = find_slot(filename)
+        search_probes.observe(probes)
+        return None if pos is None else table.table[pos]
+    
+    _install(table, 'insert', instrumented_insert)
+    _install(table, 'search', _timed(metrics.latency('hash.search'), search))
+    _install(table, 'delete', _timed(metrics.latency('hash.delete'), cls.delete.__get__(table)))
+    _install(table, 'resize', _timed(metrics.latency('rehash'), cls.resize.__get__(table)))
+    
+    metrics.gauges['hash_entries'] = lambda: table.count
+    metrics.gauges['hash_slots'] = lambda: table.size
+    metrics.gauges['hash_load_factor'] = lambda: table.count / table.size
+    metrics.gauges['hash_tombstone_ratio'] = lambda: table.tombstones / table.size
+
+def instrument_organizer(organizer, metrics):
+    """Time the public operations of organizer and instrument its hash
+    table, again whenever a snapshot load replaces the table"""
+    uninstrument(organizer)
+    cls = type(organizer)
+    for name in ORGANIZER_OPERATIONS:
+        if name != 'load_snapshot':
+            _install(organizer, name, _timed(metrics.latency(name), getattr(cls, name).__get__(organizer)))
+    
+    load = _timed(metrics.latency('load_snapshot'), cls.load_snapshot.__get__(organizer))
+    
+    def load_snapshot(*args, **kwargs):
+        load(*args, **kwargs)
+        instrument_table(organizer.hash_table, metrics)
+    
+    _install(organizer, 'load_snapshot', load_snapshot)
+    instrument_table(organizer.hash_table, metrics)
+    metrics.gauges['folders'] = lambda: organizer.tree.total_folders
+    metrics.gauges['files'] = lambda: organizer.tree.total_files
+
+def uninstrument_organizer(organizer):
+    uninstrument(organizer)
+    uninstrument(organizer.hash_table)
@@ -0,0 +1,297 @@
+# Query engine for the File Organizer
+# Queries combine terms with AND, OR, NOT and parentheses; adjacent
+# terms are ANDed:
+#   ext:pdf under:Documents
+#   (glob:"IMG_*.jpg" OR ext:png) AND NOT under:Photos/Trash
+# Terms: ext:EXT (ext:"" for none), glob:PATTERN (on the name, or on the full path if it
+# has a '/'), name:TEXT (substring), under:FOLDER. A bare word is a glob
+# if it has wildcards and a name substring otherwise. Matching ignores
+# case. Candidates come from the extension, prefix and trigram indexes
+# where a term allows it, folder scope is checked by walking up from a
+# file's folder (once per folder), and matches are yielded one at a time
+
+import fnmatch
+import re
+from heapq import heapify, heappop
+from itertools import islice
+
+from search_index import extension
+
+
+TOKEN = re.compile(r"""\(|\)|[^\s()"']*(?:"[^"]*"|'[^']*')|[^\s()]+""")
+WILDCARDS = "*?["
+
+
+def _bounded(plan, names):
+    """Set of names, or None if there are more than plan.bound of them"""
+    if plan.bound is None:
+        return set(names)
+    names = set(islice(names, plan.bound + 1))
+    return names if len(names) <= plan.bound else None
+
+
+# Query nodes. candidates() returns the set of lowercased names that can
+# match, or None if the node can't narrow them to fewer than plan.bound;
+# predicate() returns a test on (folder, filename)
+class Ext:
+    def __init__(self, ext):
+        self.ext = ext.lower().lstrip('.')
+    
+    def candidates(self, plan):
+        return _bounded(plan, plan.organizer.extension_index.names(self.ext))
+    
+    def predicate(self, plan):
+        ext = self.ext
+        return lambda folder, name: extension(name.lower()) == ext
+
+
+class Glob:
+    def __init__(self, pattern):
+        self.pattern = pattern.lower()
+        self.on_path = '/' in pattern
+    
+    def candidates(self, plan):
+        if self.on_path:
+            return None
+        pattern = self.pattern
+        prefix = re.split(r"[*?\[]", pattern, maxsplit=1)[0]
+        ext = extension(pattern)
+        if prefix:
+            limit = None if plan.bound is None else plan.bound + 1
+            names = plan.organizer.prefix_index.complete(prefix, limit)
+            if limit is not None and len(names) == limit:
+                return None  # more names share the prefix than the scope has files
+        elif ext and not any(char in ext for char in WILDCARDS):
+            names = plan.organizer.extension_index.names(ext)
+        else:
+            return None
+        return _bounded(plan, (name for name in names if fnmatch.fnmatchcase(name, pattern)))
+    
+    def predicate(self, plan):
+        pattern = self.pattern
+        if self.on_path:
+            return lambda folder, name: fnmatch.fnmatchcase(f"{folder.get_path()}/{name}".lower(), pattern)
+        return lambda folder, name: fnmatch.fnmatchcase(name.lower(), pattern)
+
+
+class Name:
+    def __init__(self, text):
+        self.text = text.lower()
+    
+    def candidates(self, plan):
+        return _bounded(plan, plan.organizer.name_index.search(self.text))
+    
+    def predicate(self, plan):
+        text = self.text
+        return lambda folder, name: text in name.lower()
+
+
+class Under:
+    def __init__(self, path):
+        self.path = path
+    
+    def candidates(self, plan):
+        return None
+    
+    def scope(self, plan):
+        return plan.organizer.get_folder(self.path)
+    
+    def predicate(self, plan):
+        scope = self.scope(plan)
+        if scope is None:
+            return lambda folder, name: False
+        inside = {scope: True}  # folder -> under scope, for the folders seen so far
+        
+        def contains(folder, name):
+            # Walk up to the first folder with a known answer: O(depth)
+            # the first time a folder is seen, O(1) for its other files
+            answer = inside.get(folder)
+            if answer is None:
+                seen = []
+                while answer is None:
+                    seen.append(folder)
+                    folder = folder.parent
+                    answer = False if folder is None else inside.get(folder)
+                for folder in seen:
+                    inside[folder] = answer
+            return answer
+        return contains
+
+
+class And:
+    def __init__(self, children):
+        self.children = children
+    
+    def candidates(self, plan):
+        sets = [names for names in (child.candidates(plan) for child in self.children)
+                if names is not None]
+        if not sets:
+            return None
+        sets.sort(key=len)
+        return sets[0].intersection(*sets[1:])
+    
+    def scope(self, plan):
+        for child in self.children:
+            if isinstance(child, (Under, And)):
+                scope = child.scope(plan)
+                if scope is not None:
+                    return scope
+        return None
+    
+    def predicate(self, plan):
+        tests = [child.predicate(plan) for child in self.children]
+        return lambda folder, name: all(test(folder, name) for test in tests)
+
+
+class Or:
+    def __init__(self, children):
+        self.children = children
+    
+    def candidates(self, plan):
+        union = set()
+        for child in self.children:
+            names = child.candidates(plan)
+            if names is None:
+                return None
+            union |= names
+        return union
+    
+    def predicate(self, plan):
+        tests = [child.predicate(plan) for child in self.children]
+        return lambda folder, name: any(test(folder, name) for test in tests)
+
+
+class Not:
+    def __init__(self, child):
+        self.child = child
+    
+    def candidates(self, plan):
+        return None
+    
+    def predicate(self, plan):
+        test = self.child.predicate(plan)
+        return lambda folder, name: not test(folder, name)
+
+
+TERMS = {'ext': Ext, 'glob': Glob, 'name': Name, 'under': Under}
+
+
+def _unquote(text):
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        return text[1:-1]
+    if '"' in text or "'" in text:
+        raise ValueError(f"Unterminated quote in '{text}'")
+    return text
+
+def _term(token):
+    key, sep, value = token.partition(':')
+    if sep and key.lower() in TERMS:
+        if not value:
+            raise ValueError(f"Missing value after '{key}:'")
+        return TERMS[key.lower()](_unquote(value))  # ext:"" is no extension
+    word = _unquote(token)
+    if any(char in word for char in WILDCARDS):
+        return Glob(word)
+    return Name(word)
+
+
+def parse_query(text):
+    """Parse a query string into a tree of query nodes"""
+    tokens = TOKEN.findall(text)
+    pos = 0
+    
+    def peek():
+        return tokens[pos] if pos < len(tokens) else None
+    
+    def take():
+        nonlocal pos
+        pos += 1
+        return tokens[pos - 1]
+    
+    def parse_or():
+        children = [parse_and()]
+        while peek() == "OR":
+            take()
+            children.append(parse_and())
+        return children[0] if len(children) == 1 else Or(children)
+    
+    def parse_and():
+        children = [parse_not()]
+        while peek() not in (None, "OR", ")"):
+            if peek() == "AND":
+                take()
+            children.append(parse_not())
+        return children[0] if len(children) == 1 else And(children)
+    
+    def parse_not():
+        token = peek()
+        if token is None or token in ("AND", "OR", ")"):
+            raise ValueError(f"Expected a term in query '{text}'")
+        take()
+        if token == "NOT":
+            return Not(parse_not())
+        if token == "(":
+            node = parse_or()
+            if peek() != ")":
+                raise ValueError(f"Missing ')' in query '{text}'")
+            take()
+            return node
+        return _term(token)
+    
+    if not tokens:
+        raise ValueError("Empty query")
+    node = parse_or()
+    if pos < len(tokens):
+        raise ValueError(f"Unexpected '{tokens[pos]}' in query '{text}'")
+    return node
+
+
+class _Plan:
+    def __init__(self, organizer):
+        self.organizer = organizer
+        self.bound = None  # more candidate names than this: walk the scope instead
+
+
+def run_query(organizer, query, limit=None):
+    """Yield {'file', 'path', 'full_path'} for every file matching query.
+    Candidates come from the indexes or from the subtree of a required
+    under: scope, whichever is smaller, else from every name. An index
+    stops listing names once it has more than the scope has files.
+    Index candidates are listed in name order; with a limit they are
+    popped from a heap, so the work stops early instead of sorting
+    every candidate first"""
+    plan = _Plan(organizer)
+    matches = query.predicate(plan)
+    scope = query.scope(plan) if isinstance(query, (Under, And)) else None
+    if scope is not None:
+        plan.bound = scope.total_files
+    names = query.candidates(plan)
+    
+    def files():
+        if names is not None and limit is None:
+            for name in sorted(names):
+                yield from organizer.locations.get(name, {}).items()
+        elif names is not None:
+            heap = list(names)
+            heapify(heap)
+            while heap:
+                yield from organizer.locations.get(heappop(heap), {}).items()
+        elif scope is not None:
+            stack = [scope]
+            while stack:
+                folder = stack.pop()
+                for filename in folder.files:
+                    yield folder, filename
+                stack.extend(reversed(folder.subfolders))
+        else:
+            for name in list(organizer.locations):
+                yield from organizer.locations.get(name, {}).items()
+    
+    found = 0
+    for folder, filename in files():
+        if matches(folder, filename):
+            path = folder.get_path()
+            yield {'file': filename, 'path': path, 'full_path': f"{path}/{filename}"}
+            found += 1
+            if limit and found >= limit:
+                return
@@ -0,0 +1,190 @@
+# Real directory importer for the File Organizer
+# Walks a directory tree with os.scandir on a thread pool and feeds
+# the results, with each file's size and mtime, to FileOrganizer.add_files
+# from a single writer thread
+
+import fnmatch
+import gc
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+SYMLINK_POLICIES = ('skip', 'file', 'follow')
+
+
+class DirectoryScanner:
+    def __init__(self, organizer, max_depth=None, exclude=(), symlinks='skip',
+                 workers=8, batch_size=1000, metadata=True, freeze=False):
+        """max_depth=0 imports only the files directly in the scanned
+        directory. exclude holds glob patterns matched against both the
+        entry name and its path relative to the scan root. symlinks is
+        'skip' (ignore them), 'file' (list them as files, never descend)
+        or 'follow' (descend, each real directory at most once).
+        metadata=False skips the stat call per file (no size or mtime).
+        freeze=True calls gc.freeze() once the scan has finished, so the
+        imported catalogue is left out of later full collections"""
+        if symlinks not in SYMLINK_POLICIES:
+            raise ValueError(f"Unknown symlink policy '{symlinks}'")
+        self.organizer = organizer
+        self.max_depth = max_depth
+        self.exclude = list(exclude)
+        self.symlinks = symlinks
+        self.workers = workers
+        self.batch_size = batch_size
+        self.metadata = metadata
+        self.freeze = freeze
+    
+    def scan(self, root_path, dest=None, progress=None, cancel=None):
+        """Import root_path into the folder dest (default: the directory's
+        own name under Root). progress(report) is called after every
+        batch. Setting the cancel event stops the scan; what was already
+        imported stays. Returns the add_files counts plus 'folders',
+        'errors' and 'cancelled'"""
+        root_path = os.path.abspath(root_path)
+        if dest is None:
+            dest = os.path.basename(root_path.rstrip(os.sep)) or "Imported"
+        
+        self._results = queue.Queue(maxsize=self.workers * 4)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._visited = set()  # (st_dev, st_ino) of followed directories
+        self._cancel = cancel
+        self._aborted = threading.Event()  # set when the writer fails
+        report = {'added': 0, 'duplicates': 0, 'failed': 0, 'folders': 0, 'errors': [],
+                  'cancelled': False}
+        
+        if self.symlinks == 'follow':
+            self._first_visit(root_path)
+        # Lets the organizer find the files on disk again (duplicate finder)
+        self.organizer.set_import_root(dest, root_path)
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            self._pool = pool
+            self._submit(root_path, "", dest, 0)
+            
+            # Single writer: only this thread touches the organizer. After a
+            # cancel or a failure the queue is still drained, so no worker
+            # stays blocked on put() and the pool can shut down
+            failure = None
+            finished = False
+            while not finished:
+                item = self._results.get()
+                if item is None:
+                    finished = True
+                elif failure is not None:
+                    pass
+                elif cancel is not None and cancel.is_set():
+                    report['cancelled'] = True
+                else:
+                    try:
+                        self._write(item, report, progress)
+                    except BaseException as error:
+                        failure = error
+                        self._aborted.set()
+        
+        if failure is not None:
+            raise failure
+        if self.freeze:
+            gc.freeze()
+        return report
+    
+    def _write(self, item, report, progress):
+        """Apply one queued worker result to the organizer"""
+        if item[0] == 'error':
+            report['errors'].append(item[1:])
+        elif item[0] == 'folder':
+            self.organizer.create_folders(item[1])
+            report['folders'] += 1
+        else:
+            counts = self.organizer.add_files(item[1], count_hint=len(item[1]))
+            for key, value in counts.items():
+                report[key] += value
+            if progress:
+                progress(report)
+    
+    def _submit(self, path, rel_path, folder_path, depth):
+        with self._lock:
+            self._pending += 1
+        self._pool.submit(self._scan_dir, path, rel_path, folder_path, depth)
+    
+    def _excluded(self, name, rel_path):
+        for pattern in self.exclude:
+            if fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(rel_path, pattern):
+                return True
+        return False
+    
+    def _scan_dir(self, path, rel_path, folder_path, depth):
+        """Worker: list one directory, queue its files in batches of
+        (name, folder_path, size, mtime) and hand each subdirectory to the pool"""
+        try:
+            if self._aborted.is_set() or (self._cancel is not None and self._cancel.is_set()):
+                return
+            self._results.put(('folder', folder_path))
+            files = []
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    entry_rel = f"{rel_path}/{entry.name}" if rel_path else entry.name
+                    if self._excluded(entry.name, entry_rel):
+                        continue
+                    
+                    try:
+                        is_link = entry.is_symlink()
+                        if is_link and self.symlinks == 'skip':
+                            continue
+                        is_dir = entry.is_dir(follow_symlinks=self.symlinks == 'follow')
+                    except OSError as error:
+                        self._results.put(('error', entry.path, str(error)))
+                        continue
+                    
+                    if not is_dir:
+                        files.append(self._file_record(entry, folder_path))
+                        if len(files) >= self.batch_size:
+                            self._results.put(('files', files))
+                            files = []
+                    elif self.max_depth is None or depth < self.max_depth:
+                        if self.symlinks == 'follow' and not self._first_visit(entry.path):
+                            continue
+                        self._submit(entry.path, entry_rel, f"{folder_path}/{entry.name}", depth + 1)
+            if files:
+                self._results.put(('files', files))
+        except OSError as error:
+            self._results.put(('error', path, str(error)))
+        finally:
+            with self._lock:
+                self._pending -= 1
+                done = self._pending == 0
+            if done:
+                self._results.put(None)
+    
+    def _file_record(self, entry, folder_path):
+        """add_files item for a directory entry. A file that cannot be
+        stat'ed (say, a dangling symlink) is still listed, without metadata"""
+        if self.metadata:
+            try:
+                stat = entry.stat(follow_symlinks=self.symlinks == 'follow')
+            except OSError:
+                pass
+            else:
+                return entry.name, folder_path, stat.st_size, stat.st_mtime
+        return entry.name, folder_path
+    
+    def _first_visit(self, path):
+        """Guard against symlink loops: True the first time a real
+        directory is reached"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        key = (stat.st_dev, stat.st_ino)
+        with self._lock:
+            if key in self._visited:
+                return False
+            self._visited.add(key)
+            return True
+
+
+def import_directory(organizer, root_path, dest=None, **options):
+    """Scan root_path into organizer with a DirectoryScanner"""
+    return DirectoryScanner(organizer, **options).scan(root_path, dest)
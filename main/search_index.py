@@ -0,0 +1,397 @@
+# Search indexes for the File Organizer
+# NameLocations maps each name to its copies; TrigramIndex answers
+# substring queries, PrefixTrie prefix queries and ExtensionIndex
+# extension queries over file names without walking the folder tree
+
+from bisect import bisect_left
+from collections import defaultdict
+from heapq import merge
+from itertools import islice
+
+from gc_pause import gc_paused
+
+
+def trigrams(text):
+    """Set of the 3-character substrings of text"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def trigram_code(gram):
+    """Pack a trigram into one integer (21 bits per code point)"""
+    return ord(gram[0]) << 42 | ord(gram[1]) << 21 | ord(gram[2])
+
+def extension(name):
+    """Extension of a file name without the dot, '' if there is none.
+    A leading dot (.bashrc) does not start an extension"""
+    dot = name.rfind('.')
+    return name[dot + 1:] if dot > 0 else ""
+
+def _sorted_contains(values, value):
+    i = bisect_left(values, value)
+    return i < len(values) and values[i] == value
+
+
+class NameLocations(dict):
+    """basename (lowercased) -> {folder: filename} for every copy"""
+    
+    def add_copy(self, name, folder, filename):
+        """Record a copy; True if it is the first with this name"""
+        copies = self.get(name)
+        if copies is None:
+            self[name] = {folder: filename}
+            return True
+        copies[folder] = filename
+        return False
+    
+    def remove_copy(self, name, folder):
+        """Forget the copy in folder; True if it was the last one"""
+        copies = self[name]
+        del copies[folder]
+        if copies:
+            return False
+        del self[name]
+        return True
+
+
+class TrigramIndex:
+    """Inverted index from trigrams to the lowercased file names that
+    contain them. Each distinct name is indexed once, however many
+    folders hold a copy.
+    
+    With a snapshot as base, the postings saved in the snapshot are used
+    as is; names added since live in memory and names deleted since are
+    masked out"""
+    
+    def __init__(self, base=None):
+        self._base = base
+        self._postings = {}  # trigram -> set of names
+        self._names = set()  # names indexed in memory
+        self._removed = set()  # base names deleted since loading
+    
+    def add_names(self, names):
+        """Index many names at once, extending each posting set once
+        instead of once per name"""
+        with gc_paused():  # nothing to collect, only many new sets
+            self._index_names(names)
+    
+    def _index_names(self, names):
+        grouped = defaultdict(list)  # trigram -> new names containing it
+        for name in names:
+            if name in self._removed:
+                self._removed.discard(name)  # still indexed in the base
+                continue
+            if name in self._names:
+                continue
+            self._names.add(name)
+            # A trigram seen twice in name appends it twice; the posting
+            # set keeps one
+            for append in [grouped[name[i:i + 3]].append for i in range(len(name) - 2)]:
+                append(name)
+        postings = self._postings
+        for gram, group in grouped.items():
+            names = postings.get(gram)
+            if names is None:
+                postings[gram] = set(group)
+            else:
+                names.update(group)
+    
+    def add_name(self, name):
+        if name in self._removed:
+            self._removed.discard(name)  # still indexed in the base
+            return
+        if name in self._names:
+            return
+        self._names.add(name)
+        for gram in trigrams(name):
+            names = self._postings.get(gram)
+            if names is None:
+                self._postings[gram] = {name}
+            else:
+                names.add(name)
+    
+    def remove_name(self, name):
+        if name in self._names:
+            self._names.discard(name)
+            for gram in trigrams(name):
+                names = self._postings[gram]
+                names.discard(name)
+                if not names:
+                    del self._postings[gram]
+        elif self._base is not None:
+            self._removed.add(name)
+    
+    def search(self, pattern):
+        """Yield the indexed names containing pattern (already lowercased)"""
+        grams = trigrams(pattern)
+        if not grams:
+            # Too short for trigrams: check every name
+            for name in self._names:
+                if pattern in name:
+                    yield name
+            if self._base is not None:
+                for name in self._base.names():
+                    if pattern in name and name not in self._removed:
+                        yield name
+            return
+        
+        # Intersect posting sets smallest first, then verify candidates
+        postings = [self._postings.get(gram) for gram in grams]
+        if all(postings):
+            postings.sort(key=len)
+            for name in postings[0].intersection(*postings[1:]):
+                if pattern in name:
+                    yield name
+        
+        if self._base is not None:
+            yield from self._search_base(grams, pattern)
+    
+    def _search_base(self, grams, pattern):
+        base = self._base
+        postings = [base.trigram_postings(trigram_code(gram)) for gram in grams]
+        if not all(postings):
+            return
+        postings.sort(key=len)
+        others = postings[1:]
+        for string_id in postings[0]:
+            if all(_sorted_contains(ids, string_id) for ids in others):
+                name = base.string(string_id)
+                if pattern in name and name not in self._removed:
+                    yield name
+
+
+class ExtensionIndex:
+    """Lowercased file names grouped by extension. With a snapshot as
+    base, the saved names are grouped in one pass on the first lookup"""
+    
+    def __init__(self, base=None):
+        self._base = base
+        self._base_names = None  # extension -> base names, once grouped
+        self._names = {}  # extension -> set of names added in memory
+        self._removed = set()  # base names deleted since loading
+    
+    def add_name(self, name):
+        if name in self._removed:
+            self._removed.discard(name)  # still listed in the base
+            return
+        names = self._names.get(extension(name))
+        if names is None:
+            self._names[extension(name)] = {name}
+        else:
+            names.add(name)
+    
+    def add_names(self, names):
+        """Index many names at once, grouped by extension first"""
+        grouped = {}
+        for name in names:
+            if name in self._removed:
+                self._removed.discard(name)
+            else:
+                grouped.setdefault(extension(name), []).append(name)
+        for ext, group in grouped.items():
+            names = self._names.get(ext)
+            if names is None:
+                self._names[ext] = set(group)
+            else:
+                names.update(group)
+    
+    def remove_name(self, name):
+        names = self._names.get(extension(name))
+        if names is not None and name in names:
+            names.discard(name)
+            if not names:
+                del self._names[extension(name)]
+        elif self._base is not None:
+            self._removed.add(name)
+    
+    def names(self, ext):
+        """Yield the indexed names with extension ext (lowercased)"""
+        yield from self._names.get(ext, ())
+        if self._base is not None:
+            if self._base_names is None:
+                grouped = {}
+                for name in self._base.names():
+                    grouped.setdefault(extension(name), []).append(name)
+                self._base_names = grouped
+            for name in self._base_names.get(ext, ()):
+                if name not in self._removed:
+                    yield name
+
+
+class _RadixNode:
+    __slots__ = ('edges', 'terminal', '_order')
+    
+    def __init__(self, terminal=False):
+        self.edges = {}  # first character -> [label, child]
+        self.terminal = terminal
+        self._order = None  # sorted edge keys, rebuilt after a change
+    
+    def ordered_edges(self):
+        if self._order is None:
+            self._order = sorted(self.edges)
+        edges = self.edges
+        return [edges[key] for key in self._order]
+
+
+class PrefixTrie:
+    """Compressed prefix trie (radix tree) of lowercased file names.
+    Chains of single-child nodes are merged into one edge label, so
+    listing k completions visits O(k) nodes after the prefix is matched
+    
+    Names added in bulk skip the trie: each batch becomes a sorted run,
+    and runs of similar length are merged, so n names cost O(n log n)
+    comparisons inside list.sort. With a snapshot as base, the
+    snapshot's sorted name list answers for the names saved in it.
+    Names deleted from a run or the base are masked out until a merge"""
+    
+    def __init__(self, base=None):
+        self._base = base
+        self._root = _RadixNode()
+        self._runs = []  # sorted lists from add_names, longest first
+        self._removed = set()  # run and base names deleted since
+        self._count = 0
+    
+    @property
+    def count(self):
+        """Names held in the trie itself"""
+        return self._count
+    
+    def add_names(self, names):
+        """Add many names at once as a new sorted run"""
+        run = []
+        for name in names:
+            if name in self._removed:
+                self._removed.discard(name)  # still listed in a run or the base
+            else:
+                run.append(name)
+        if not run:
+            return
+        run.sort()
+        self._runs.append(run)
+        # Keep each run at least twice as long as the next one, so there
+        # are O(log n) runs and each name is merged O(log n) times
+        runs = self._runs
+        while len(runs) > 1 and len(runs[-2]) < 2 * len(runs[-1]):
+            last = runs.pop()
+            runs[-1] = self._merge_runs(runs[-1], last)
+    
+    def _merge_runs(self, first, second):
+        merged = first + second
+        merged.sort()  # two sorted runs: one linear merge
+        removed = self._removed
+        if removed:
+            # Deleted names in these runs are in no other run or the base
+            dropped = removed.intersection(merged)
+            if dropped:
+                removed -= dropped
+                merged = [name for name in merged if name not in dropped]
+        return merged
+    
+    def add_name(self, name):
+        if name in self._removed:
+            self._removed.discard(name)  # still listed in a run or the base
+            return
+        node = self._root
+        rest = name
+        while rest:
+            edge = node.edges.get(rest[0])
+            if edge is None:
+                node.edges[rest[0]] = [rest, _RadixNode(terminal=True)]
+                node._order = None
+                self._count += 1
+                return
+            label, child = edge
+            common = _common_prefix_length(label, rest)
+            if common < len(label):
+                # Split the edge where the new name branches off
+                middle = _RadixNode()
+                middle.edges[label[common]] = [label[common:], child]
+                edge[0], edge[1] = label[:common], middle
+                child = middle
+            node = child
+            rest = rest[common:]
+        if not node.terminal:
+            node.terminal = True
+            self._count += 1
+    
+    def remove_name(self, name):
+        path = []  # (node, edge key) pairs from the root
+        node = self._root
+        rest = name
+        while rest:
+            edge = node.edges.get(rest[0])
+            if edge is None or not rest.startswith(edge[0]):
+                break
+            path.append((node, rest[0]))
+            node = edge[1]
+            rest = rest[len(edge[0]):]
+        
+        if rest or not node.terminal:
+            if self._runs or self._base is not None:
+                self._removed.add(name)
+            return
+        node.terminal = False
+        self._count -= 1
+        
+        # Drop the leaf, then merge a remaining single-child node into its edge
+        if path and not node.edges:
+            parent, key = path.pop()
+            del parent.edges[key]
+            parent._order = None
+            node = parent
+        if path and not node.terminal and len(node.edges) == 1:
+            parent, key = path[-1]
+            edge = parent.edges[key]
+            (label, child), = node.edges.values()
+            edge[0], edge[1] = edge[0] + label, child
+    
+    def complete(self, prefix, limit=10):
+        """The first limit names starting with prefix (already lowercased),
+        in sorted order"""
+        sources = [self._complete_trie(prefix)]
+        sources.extend(_run_names_with_prefix(run, prefix) for run in self._runs)
+        if self._base is not None:
+            sources.append(self._base.names_with_prefix(prefix))
+        names = merge(*sources)
+        if self._removed:
+            names = (name for name in names if name not in self._removed)
+        return list(islice(names, limit))
+    
+    def _complete_trie(self, prefix):
+        node = self._root
+        rest = prefix
+        spelled = ""
+        while rest:
+            edge = node.edges.get(rest[0])
+            if edge is None:
+                return
+            label, child = edge
+            if rest.startswith(label):
+                rest = rest[len(label):]
+            elif label.startswith(rest):
+                rest = ""
+            else:
+                return
+            spelled += label
+            node = child
+        
+        # Preorder walk in key order yields names sorted
+        stack = [(spelled, node)]
+        while stack:
+            spelled, node = stack.pop()
+            if node.terminal:
+                yield spelled
+            for label, child in reversed(node.ordered_edges()):
+                stack.append((spelled + label, child))
+
+
+def _run_names_with_prefix(run, prefix):
+    i = bisect_left(run, prefix)
+    while i < len(run) and run[i].startswith(prefix):
+        yield run[i]
+        i += 1
+
+def _common_prefix_length(a, b):
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
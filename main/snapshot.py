@@ -0,0 +1,595 @@
+# Binary snapshots of a FileOrganizer
+# A snapshot holds a string table, the folder and file arrays, the hash
+# slot array, a basename index, the name search indexes and, when known,
+# file sizes and mtimes. Loading memory-maps the file and builds folder
+# nodes and hash entries only when they are first touched; compact
+# storage is built from it in one pass instead
+
+import json
+import mmap
+import os
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+from itertools import count
+from math import isnan
+
+from gc_pause import gc_paused
+from metadata import MetadataIndex
+from search_index import (ExtensionIndex, NameLocations, PrefixTrie, TrigramIndex, trigram_code,
+                          trigrams)
+
+
+MAGIC = b'FOSNAP\x00\x01'
+VERSION = 1  # bump on any layout change; other versions are rejected
+NO_PARENT = 0xFFFFFFFF
+EMPTY = 0xFFFFFFFF
+
+FOLDER_FIELDS = 6  # parent, name, first_child, child_count, first_file, file_count
+FILE_FIELDS = 2  # name, folder
+NAME_FIELDS = 3  # lowercased name, first, count (into the NLST section)
+TOTAL_FIELDS = 2  # folders, files in the subtree of each folder
+NO_MTIME = float('nan')  # FMTM value of files without metadata
+
+# Sections every snapshot has; FSIZ/TBYT, FMTM and DIST are written
+# only when there are sizes, mtimes or Robin Hood distances
+REQUIRED_SECTIONS = (b'META', b'STRO', b'STRB', b'FOLD', b'FILE', b'TOTL', b'SLOT',
+                     b'NIDX', b'NLST', b'TRIK', b'TRIO', b'TRIL', b'NSRT')
+
+# Hashes that give the same value in every process, so a saved slot
+# array can be used as is
+STABLE_HASHES = ('fnv1a', 'crc32', 'additive')
+
+
+class _StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.offsets = array('Q', [0])
+        self.blob = bytearray()
+    
+    def add(self, text):
+        string_id = self.ids.get(text)
+        if string_id is None:
+            string_id = self.ids[text] = len(self.ids)
+            self.blob += text.encode('utf-8')
+            self.offsets.append(len(self.blob))
+        return string_id
+
+
+def _name_hash(name):
+    return zlib.crc32(name.encode('utf-8'))
+
+
+def _subtree_totals(folders, count):
+    """Folder and file totals of every subtree from the FOLD array.
+    Children come after their parent in BFS order, so one backward
+    pass adds each folder into its parent after it is complete"""
+    totals = array('I', [1, 0]) * count
+    for n in range(count - 1, -1, -1):
+        base = n * FOLDER_FIELDS
+        totals[n * TOTAL_FIELDS + 1] += folders[base + 5]
+        parent = folders[base]
+        if parent != NO_PARENT:
+            totals[parent * TOTAL_FIELDS] += totals[n * TOTAL_FIELDS]
+            totals[parent * TOTAL_FIELDS + 1] += totals[n * TOTAL_FIELDS + 1]
+    return totals
+
+
+def _place_slots(table, keys):
+    """Slot array (file numbers, -1 for empty) and Robin Hood distances
+    for the given entry keys, placed the way table would place them"""
+    mask = table.mask
+    slots = array('i', [-1]) * table.size
+    distances = array('I', [0]) * table.size if table.robin_hood else None
+    for number, key in enumerate(keys):
+        pos = table._hash(key) & mask
+        distance = 0
+        while slots[pos] != -1:
+            if distances is not None and distances[pos] < distance:
+                slots[pos], number = number, slots[pos]
+                distances[pos], distance = distance, distances[pos]
+            pos = (pos + 1) & mask
+            distance += 1
+        slots[pos] = number
+        if distances is not None:
+            distances[pos] = distance
+    return slots, distances
+
+
+def write_snapshot(organizer, path):
+    """Write organizer to path (atomically, through a temporary file)"""
+    with gc_paused():  # nothing to collect, only millions of new objects
+        _write_snapshot(organizer, path)
+
+
+def _write_snapshot(organizer, path):
+    tree = organizer.tree
+    table = organizer.hash_table
+    metadata = organizer.metadata
+    strings = _StringTable()
+    folders = array('I')
+    files = array('I')
+    # Sizes and mtimes per file, only written when there are any
+    sizes = array('Q') if tree.total_bytes else None
+    mtimes = array('d') if len(metadata) else None
+    roots = organizer.import_roots
+    import_roots = {}  # folder number -> real directory
+    file_keys = []  # hash key of each file number
+    names = {}  # lowercased basename -> [file numbers]
+    
+    add_string = strings.add
+    
+    # Breadth-first, so the children of each folder are contiguous
+    order = [tree]
+    parents = [NO_PARENT]
+    number = 0
+    i = 0
+    while i < len(order):
+        node = order[i]
+        first_child = len(order)
+        for child in node.subfolders:
+            order.append(child)
+            parents.append(i)
+        
+        # Entries are keyed by folder id; in the file that is the number
+        first_file = number
+        prefix = f"{i}/"
+        for filename in node.files:
+            lower = filename.lower()
+            file_keys.append(prefix + lower)
+            numbers = names.get(lower)
+            if numbers is None:
+                names[lower] = [number]
+            else:
+                numbers.append(number)
+            files.append(add_string(filename))
+            files.append(i)
+            if sizes is not None:
+                sizes.append(node.file_size(filename))
+            if mtimes is not None:
+                info = metadata.get(node, filename)
+                mtimes.append(NO_MTIME if info is None else info[1])
+            number += 1
+        
+        folders.extend((parents[i], add_string(node.name), first_child,
+                        len(node.subfolders), first_file, len(node.files)))
+        if roots and node in roots:
+            import_roots[i] = roots[node]
+        i += 1
+    
+    totals = _subtree_totals(folders, len(order))
+    
+    # Hash slots hold file numbers, -1 for empty. Live folder ids don't
+    # survive a reload, so every file is placed again under its new key
+    slots, distances = _place_slots(table, file_keys)
+    
+    # Basename index: open addressing over (name, first, count) triples
+    name_slots = 8
+    while name_slots < len(names) * 2:
+        name_slots <<= 1
+    name_table = array('I', [EMPTY, 0, 0]) * name_slots
+    name_lists = array('I')
+    mask = name_slots - 1
+    postings = {}  # trigram code -> ids of the names containing it
+    for name, numbers in names.items():
+        pos = _name_hash(name) & mask
+        while name_table[pos * NAME_FIELDS] != EMPTY:
+            pos = (pos + 1) & mask
+        base = pos * NAME_FIELDS
+        name_id = add_string(name)
+        name_table[base] = name_id
+        name_table[base + 1] = len(name_lists)
+        name_table[base + 2] = len(numbers)
+        name_lists.extend(numbers)
+        
+        for gram in trigrams(name):
+            code = trigram_code(gram)
+            ids = postings.get(code)
+            if ids is None:
+                postings[code] = [name_id]
+            else:
+                ids.append(name_id)
+    
+    # Trigram postings: sorted codes, offsets into one sorted id list each
+    trigram_codes = array('Q', sorted(postings))
+    trigram_offsets = array('I', [0])
+    trigram_ids = array('I')
+    for code in trigram_codes:
+        trigram_ids.extend(sorted(postings[code]))
+        trigram_offsets.append(len(trigram_ids))
+    
+    # Name ids in name order, for prefix queries
+    string_ids = strings.ids
+    sorted_names = array('I', [string_ids[name] for name in sorted(names)])
+    
+    meta = {
+        'root': tree.name,
+        'byteorder': sys.byteorder,
+        'folders': len(order),
+        'files': number,
+        'hash_func': table.hash_name,
+        'probing': table.probing,
+        'max_load': table.max_load,
+        'size': table.size,
+        'min_size': table.min_size,
+        'count': table.count,
+        'collision_count': table.collision_count,
+        'name_slots': name_slots,
+        'import_roots': import_roots,
+        'lsn': organizer.applied_lsn,  # last journal record included
+    }
+    sections = [
+        (b'META', json.dumps(meta).encode('utf-8')),
+        (b'STRO', strings.offsets.tobytes()),
+        (b'STRB', bytes(strings.blob)),
+        (b'FOLD', folders.tobytes()),
+        (b'FILE', files.tobytes()),
+        (b'TOTL', totals.tobytes()),
+        (b'SLOT', slots.tobytes()),
+        (b'NIDX', name_table.tobytes()),
+        (b'NLST', name_lists.tobytes()),
+        (b'TRIK', trigram_codes.tobytes()),
+        (b'TRIO', trigram_offsets.tobytes()),
+        (b'TRIL', trigram_ids.tobytes()),
+        (b'NSRT', sorted_names.tobytes()),
+    ]
+    if distances is not None:
+        sections.append((b'DIST', distances.tobytes()))
+    if sizes is not None:
+        sections.append((b'FSIZ', sizes.tobytes()))
+        sections.append((b'TBYT', array('Q', (node.total_bytes for node in order)).tobytes()))
+    if mtimes is not None:
+        sections.append((b'FMTM', mtimes.tobytes()))
+    
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as out:
+        header_size = 16 + 20 * len(sections)
+        out.write(MAGIC + VERSION.to_bytes(4, 'little') + len(sections).to_bytes(4, 'little'))
+        offset = (header_size + 7) & ~7
+        for tag, data in sections:
+            out.write(tag + offset.to_bytes(8, 'little') + len(data).to_bytes(8, 'little'))
+            offset = (offset + len(data) + 7) & ~7
+        for tag, data in sections:
+            out.write(b'\x00' * (-out.tell() % 8))  # keep every section 8-byte aligned
+            out.write(data)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp_path, path)
+
+
+class Snapshot:
+    """Read-only view of a snapshot file through mmap"""
+    
+    def __init__(self, path):
+        with open(path, 'rb') as source:
+            # Copy-on-write: arrays such as DIST can be modified in place
+            self._mmap = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_COPY)
+        data = memoryview(self._mmap)
+        if bytes(data[:8]) != MAGIC:
+            raise ValueError(f"'{path}' is not a File Organizer snapshot")
+        version = int.from_bytes(data[8:12], 'little')
+        if version != VERSION:
+            raise ValueError(f"Unsupported snapshot version {version}")
+        
+        self.sections = {}
+        for n in range(int.from_bytes(data[12:16], 'little')):
+            start = 16 + 20 * n
+            tag = bytes(data[start:start + 4])
+            offset = int.from_bytes(data[start + 4:start + 12], 'little')
+            length = int.from_bytes(data[start + 12:start + 20], 'little')
+            self.sections[tag] = data[offset:offset + length]
+        missing = [tag.decode('ascii') for tag in REQUIRED_SECTIONS if tag not in self.sections]
+        if missing:
+            raise ValueError(f"Snapshot '{path}' lacks sections {', '.join(missing)}")
+        
+        self.meta = json.loads(bytes(self.sections[b'META']))
+        if self.meta['byteorder'] != sys.byteorder:
+            raise ValueError("Snapshot was written on a machine with another byte order")
+        self.string_offsets = self.sections[b'STRO'].cast('Q')
+        self.string_blob = self.sections[b'STRB']
+        self.folders = self.sections[b'FOLD'].cast('I')
+        self.files = self.sections[b'FILE'].cast('I')
+        self.totals = self.sections[b'TOTL'].cast('I')
+        self.slots = self.sections[b'SLOT'].cast('i')
+        self.name_table = self.sections[b'NIDX'].cast('I')
+        self.name_lists = self.sections[b'NLST'].cast('I')
+        self.trigram_codes = self.sections[b'TRIK'].cast('Q')
+        self.trigram_offsets = self.sections[b'TRIO'].cast('I')
+        self.trigram_ids = self.sections[b'TRIL'].cast('I')
+        self.sorted_names = self.sections[b'NSRT'].cast('I')
+        self.file_sizes = self.folder_bytes = self.file_mtimes = None
+        if b'FSIZ' in self.sections:
+            self.file_sizes = self.sections[b'FSIZ'].cast('Q')
+            self.folder_bytes = self.sections[b'TBYT'].cast('Q')
+        if b'FMTM' in self.sections:
+            self.file_mtimes = self.sections[b'FMTM'].cast('d')
+        
+        self.folder_class = None
+        self.store = None  # CompactTree holding the folders, if any
+        self.nodes = {}  # folder number -> node, once built
+        # Folder ids: loaded folders keep their number, new ones follow
+        self.folder_ids = count(self.meta['folders'])
+    
+    def string(self, string_id):
+        start = self.string_offsets[string_id]
+        return str(self.string_blob[start:self.string_offsets[string_id + 1]], 'utf-8')
+    
+    def root(self):
+        return self._new_node(0, None)
+    
+    def node(self, number):
+        """The node of a folder, building it and its ancestors if needed"""
+        if self.store is not None:
+            return self.store.folder(number)
+        missing = []
+        while number not in self.nodes:
+            missing.append(number)
+            number = self.folders[number * FOLDER_FIELDS]
+        for number in reversed(missing):
+            # Filling the parent builds all of its children
+            self.nodes[self.folders[number * FOLDER_FIELDS]].subfolders
+        return self.nodes[missing[0]] if missing else self.nodes[number]
+    
+    def _new_node(self, number, parent):
+        node = self.folder_class.__new__(self.folder_class)
+        node.name = self.string(self.folders[number * FOLDER_FIELDS + 1])
+        node.parent = parent
+        node._loader = self
+        node._snapshot_number = number
+        node.folder_id = number
+        node._ids = self.folder_ids
+        node.total_folders = self.totals[number * TOTAL_FIELDS]
+        node.total_files = self.totals[number * TOTAL_FIELDS + 1]
+        node.total_bytes = self.folder_bytes[number] if self.folder_bytes is not None else 0
+        self.nodes[number] = node
+        return node
+    
+    def load_folder(self, node):
+        """Fill in the subfolders and files of a lazily built node. The
+        caller holds the tree's load lock; each field is assigned once
+        complete, so readers without the lock never see a partial list"""
+        base = node._snapshot_number * FOLDER_FIELDS
+        _, _, first_child, child_count, first_file, file_count = self.folders[base:base + FOLDER_FIELDS]
+        
+        subfolders = []
+        children = {}
+        for number in range(first_child, first_child + child_count):
+            child = self._new_node(number, node)
+            subfolders.append(child)
+            children.setdefault(child.name, child)
+        
+        file_list = self.files
+        files = [self.string(file_list[n * FILE_FIELDS])
+                 for n in range(first_file, first_file + file_count)]
+        if self.file_sizes is not None:
+            sizes = self.file_sizes[first_file:first_file + file_count]
+            node._sizes = {filename: size for filename, size in zip(files, sizes) if size}
+        node._children = children
+        node._file_names = set(files)
+        node.files = files
+        node.subfolders = subfolders
+        del node._snapshot_number
+    
+    def entry(self, number):
+        """Hash table entry of a file"""
+        filename = self.string(self.files[number * FILE_FIELDS])
+        folder_number = self.files[number * FILE_FIELDS + 1]
+        return {
+            'filename': filename,
+            'folder': self.node(folder_number),
+            'key': f"{folder_number}/{filename.lower()}",
+            'deleted': False
+        }
+    
+    def file_metadata(self):
+        """Yield (folder, filename, size, mtime) of the files saved with metadata"""
+        mtimes = self.file_mtimes
+        if mtimes is None:
+            return
+        sizes = self.file_sizes
+        files = self.files
+        for number in range(self.meta['files']):
+            mtime = mtimes[number]
+            if not isnan(mtime):
+                base = number * FILE_FIELDS
+                yield (self.node(files[base + 1]), self.string(files[base]),
+                       sizes[number] if sizes is not None else 0, mtime)
+    
+    def name_numbers(self, name):
+        """File numbers of every file called name (lowercased)"""
+        table = self.name_table
+        mask = self.meta['name_slots'] - 1
+        pos = _name_hash(name) & mask
+        while table[pos * NAME_FIELDS] != EMPTY:
+            if self.string(table[pos * NAME_FIELDS]) == name:
+                first, count = table[pos * NAME_FIELDS + 1], table[pos * NAME_FIELDS + 2]
+                return self.name_lists[first:first + count]
+            pos = (pos + 1) & mask
+        return ()
+    
+    def trigram_postings(self, code):
+        """Sorted string ids of the names containing a trigram"""
+        i = bisect_left(self.trigram_codes, code)
+        if i == len(self.trigram_codes) or self.trigram_codes[i] != code:
+            return ()
+        return self.trigram_ids[self.trigram_offsets[i]:self.trigram_offsets[i + 1]]
+    
+    def names_with_prefix(self, prefix):
+        """Names starting with prefix, in sorted order"""
+        ids = self.sorted_names
+        i = bisect_left(ids, prefix, key=self.string)
+        while i < len(ids):
+            name = self.string(ids[i])
+            if not name.startswith(prefix):
+                return
+            yield name
+            i += 1
+    
+    def names(self):
+        table = self.name_table
+        for pos in range(self.meta['name_slots']):
+            if table[pos * NAME_FIELDS] != EMPTY:
+                yield self.string(table[pos * NAME_FIELDS])
+
+
+class LazySlots:
+    """Hash slot array whose entries are decoded from the snapshot on
+    first access; writes go to an overlay"""
+    
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+        self._slots = snapshot.slots
+        self._loaded = {}
+    
+    def __len__(self):
+        return len(self._slots)
+    
+    def __getitem__(self, pos):
+        try:
+            return self._loaded[pos]
+        except KeyError:
+            number = self._slots[pos]
+            entry = None if number < 0 else self._snapshot.entry(number)
+            self._loaded[pos] = entry
+            return entry
+    
+    def __setitem__(self, pos, entry):
+        self._loaded[pos] = entry
+    
+    def __iter__(self):
+        for pos in range(len(self._slots)):
+            yield self[pos]
+
+
+_UNLOADED = object()
+
+class SnapshotLocations:
+    """basename -> {folder: filename} multimap, read lazily from a snapshot"""
+    
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+        self._loaded = {}  # name -> copies, or None once deleted
+    
+    def get(self, name, default=None):
+        copies = self._loaded.get(name, _UNLOADED)
+        if copies is _UNLOADED:
+            copies = None
+            snapshot = self._snapshot
+            for number in snapshot.name_numbers(name):
+                if copies is None:
+                    copies = {}
+                base = number * FILE_FIELDS
+                folder = snapshot.node(snapshot.files[base + 1])
+                copies[folder] = snapshot.string(snapshot.files[base])
+            self._loaded[name] = copies
+        return default if copies is None else copies
+    
+    def __getitem__(self, name):
+        copies = self.get(name)
+        if copies is None:
+            raise KeyError(name)
+        return copies
+    
+    def __setitem__(self, name, copies):
+        self._loaded[name] = copies
+    
+    def __delitem__(self, name):
+        self[name]
+        self._loaded[name] = None
+    
+    def __contains__(self, name):
+        return self.get(name) is not None
+    
+    # Copy bookkeeping only needs get, [] and del
+    add_copy = NameLocations.add_copy
+    remove_copy = NameLocations.remove_copy
+    
+    def __iter__(self):
+        for name in self._snapshot.names():
+            if name not in self._loaded:
+                yield name
+        for name, copies in self._loaded.items():
+            if copies is not None:
+                yield name
+    
+    def items(self):
+        for name in self:
+            yield name, self[name]
+
+
+def read_snapshot(organizer, path):
+    """Replace the contents of organizer with the snapshot at path"""
+    snapshot = Snapshot(path)
+    meta = snapshot.meta
+    snapshot.folder_class = type(organizer.tree)
+    from_snapshot = getattr(snapshot.folder_class, 'from_snapshot', None)
+    if from_snapshot is not None:
+        _read_compact(organizer, snapshot, from_snapshot)
+        return snapshot
+    
+    table = type(organizer.hash_table)(meta['size'], hash_func=meta['hash_func'],
+                                       probing=meta['probing'], max_load=meta['max_load'],
+                                       key_by='folder')
+    table.min_size = meta['min_size']
+    table.count = meta['count']
+    table.collision_count = meta['collision_count']
+    
+    organizer.tree = snapshot.root()
+    organizer.hash_table = table
+    organizer.locations = SnapshotLocations(snapshot)
+    organizer.name_index = TrigramIndex(base=snapshot)
+    organizer.prefix_index = PrefixTrie(base=snapshot)
+    organizer.extension_index = ExtensionIndex(base=snapshot)
+    _read_metadata(organizer, snapshot)
+    
+    if meta['hash_func'] in STABLE_HASHES:
+        table.table = LazySlots(snapshot)
+        if table.robin_hood:
+            table.distances = snapshot.sections[b'DIST'].cast('I')
+    else:
+        # Slot positions depend on this process's hash seed, re-place
+        # every file (slow path, one pass over the file array)
+        table.count = 0
+        table.table = [None] * table.size
+        if table.robin_hood:
+            table.distances = [0] * table.size
+        for number in range(meta['files']):
+            entry = snapshot.entry(number)
+            table.insert(entry['filename'], entry['folder'])
+    return snapshot
+
+
+def _read_metadata(organizer, snapshot):
+    meta = snapshot.meta
+    organizer.metadata = MetadataIndex(base=snapshot if snapshot.file_mtimes is not None else None)
+    organizer.import_roots = {snapshot.node(int(number)): path
+                              for number, path in meta['import_roots'].items()}
+    organizer.applied_lsn = meta['lsn']
+
+
+def _read_compact(organizer, snapshot, from_snapshot):
+    """Compact storage is built in one pass, keeping folder and file
+    numbers. The hash slots are taken as they are when the table would
+    place files the same way; the name chains are rebuilt from the file
+    rows, and the search indexes catch up on first use (the snapshot's
+    postings hold string ids, not name ids)"""
+    meta = snapshot.meta
+    organizer._build_indexes(from_snapshot(snapshot, FOLDER_FIELDS, FILE_FIELDS))
+    store = snapshot.store = organizer.tree.store
+    table = organizer.hash_table
+    add_copy = organizer.locations.add_file_copy
+    file_name = store.file_name
+    with gc_paused():
+        if meta['hash_func'] == table.hash_name and meta['probing'] == 'linear':
+            # File numbers are the tree's file ids, so the slots fit as they are
+            table.load_slots(snapshot.slots, meta['count'])
+            table.min_size = meta['min_size']
+            table.collision_count = meta['collision_count']
+        else:
+            table.reserve(meta['files'])
+            for file in range(meta['files']):
+                table.insert_file(file)
+        for file in range(meta['files']):
+            add_copy(file_name(file).lower(), file)
+    _read_metadata(organizer, snapshot)
@@ -0,0 +1,110 @@
+# Background tasks for the File Organizer GUI
+# A single worker thread runs backend operations one at a time, so the
+# organizer still has one writer. Results, progress and errors come
+# back through a queue that the Tk thread drains with root.after; no Tk
+# call is ever made from the worker
+
+import queue
+import threading
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task that noticed it was cancelled"""
+
+
+class Task:
+    def __init__(self, runner, name, func, on_done=None, on_error=None, on_progress=None):
+        self.runner = runner
+        self.name = name
+        self.func = func
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        # Event, so it can be handed to code that polls is_set()
+        self.cancel_event = threading.Event()
+    
+    def cancel(self):
+        self.cancel_event.set()
+    
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+    
+    def check(self):
+        """Call from the task between steps: stops it once cancelled"""
+        if self.cancel_event.is_set():
+            raise TaskCancelled(self.name)
+    
+    def report(self, progress):
+        """Call from the task: on_progress(progress) runs on the Tk thread"""
+        if self.on_progress:
+            self.runner.results.put(('progress', self, progress))
+
+
+class TaskRunner:
+    def __init__(self):
+        self.results = queue.Queue()
+        self._tasks = queue.Queue()
+        self._queued = []  # submitted and not finished, oldest first
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+    
+    @property
+    def busy(self):
+        return bool(self._queued)
+    
+    @property
+    def current(self):
+        """The task running or next to run, or None"""
+        return self._queued[0] if self._queued else None
+    
+    def submit(self, name, func, on_done=None, on_error=None, on_progress=None):
+        """Queue func(task) for the worker thread. on_done(result) or
+        on_error(error) is called from drain(); a cancelled task reports
+        a TaskCancelled error"""
+        task = Task(self, name, func, on_done, on_error, on_progress)
+        self._queued.append(task)
+        self._tasks.put(task)
+        return task
+    
+    def _run(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            try:
+                task.check()
+                self.results.put(('done', task, task.func(task)))
+            except Exception as error:
+                self.results.put(('error', task, error))
+    
+    def drain(self):
+        """Deliver finished tasks and progress reports. Call on the Tk
+        thread; returns the number of tasks that finished"""
+        finished = 0
+        while True:
+            try:
+                kind, task, value = self.results.get_nowait()
+            except queue.Empty:
+                return finished
+            if kind == 'progress':
+                task.on_progress(value)
+                continue
+            
+            self._queued.remove(task)
+            finished += 1
+            if kind == 'done':
+                if task.on_done:
+                    task.on_done(value)
+            elif task.on_error:
+                task.on_error(value)
+    
+    def cancel_all(self):
+        for task in list(self._queued):
+            task.cancel()
+    
+    def shutdown(self):
+        """Cancel everything and wait for the worker to stop"""
+        self.cancel_all()
+        self._tasks.put(None)
+        self._worker.join()
@@ -0,0 +1,8 @@
+# Test setup for the File Organizer
+# The modules in main/ import each other as top-level modules, the way
+# file_organizer.py runs them, so main/ goes on the import path
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main'))
@@ -0,0 +1,27 @@
+# Tests for the benchmark suite
+# A tiny run of every benchmark, saved and compared with itself
+
+import pytest
+
+from benchmark import HIERARCHIES, compare_results, load_results, run_suite, save_results
+from file_organizer import FileOrganizer
+
+
+@pytest.fixture(scope='module')
+def results():
+    return run_suite(sizes=(200,), storages=FileOrganizer.STORAGE_ENGINES, memory=False, report=None)
+
+
+def test_suite_covers_every_hierarchy_and_storage(results):
+    assert {entry['hierarchy'] for entry in results} == set(HIERARCHIES)
+    assert {entry.get('storage') for entry in results} == {None, *FileOrganizer.STORAGE_ENGINES}
+    for entry in results:
+        assert entry['size'] == 200
+        assert entry['p50_us'] <= entry['p99_us'] <= entry['max_us']
+
+
+def test_saved_results_compare_with_themselves(results, tmp_path):
+    path = str(tmp_path / "results.json")
+    save_results(results, path, seed=42)
+    rows = compare_results(load_results(path), results)
+    assert rows and all(change == 0 for _, _, _, change, _, _ in rows)
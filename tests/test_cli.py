@@ -0,0 +1,28 @@
+# Tests for starting file_organizer.py as a script
+# Run in a subprocess, the way a user starts it
+
+import os
+import subprocess
+import sys
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                      'main', 'file_organizer.py')
+
+
+def run_script(*args, stdin=""):
+    return subprocess.run([sys.executable, *args, SCRIPT], input=stdin, capture_output=True,
+                          text=True, encoding='utf-8', timeout=60)
+
+
+def test_piped_commands_run_the_cli():
+    result = run_script(stdin="add Docs/a.txt\nsearch a.txt\n")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines() == ["Added 'a.txt' to Root/Docs", "Found: a.txt at Root/Docs/a.txt"]
+
+
+def test_the_backend_is_loaded_once():
+    # -X importtime lists every module import on stderr
+    result = run_script('-X', 'importtime', stdin="stats\n")
+    assert result.returncode == 0, result.stderr
+    imported = [line.rsplit('|', 1)[-1].strip() for line in result.stderr.splitlines()]
+    assert 'cli' in imported and 'file_organizer' not in imported
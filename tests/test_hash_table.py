@@ -1 +1,191 @@
+# Tests for FileHashTable
+# Random inserts and deletes are checked against a dict, in both probing
+# modes; the tombstone, shrink and backward-shift cases use a constant
+# hash so every key lands in one probe chain
 
+import random
+import zlib
+
+import pytest
+
+from compact_tree import CompactTree
+from file_organizer import HASH_FUNCTIONS, CompactFileTable, FileHashTable
+
+
+def same_bucket(key):
+    return 0
+
+
+def check_against(table, model):
+    """Every key of model (lowercased name -> name) is found, nothing else
+    is live, and robin_hood distances match the slots"""
+    assert table.count == len(model)
+    for key, filename in model.items():
+        entry = table.search(key)
+        assert entry is not None and entry['filename'] == filename
+    live = [entry['key'] for entry in table.table if entry is not None and not entry['deleted']]
+    assert sorted(live) == sorted(model)
+    if table.robin_hood:
+        assert table.tombstones == 0
+        for pos, entry in enumerate(table.table):
+            if entry is not None:
+                assert not entry['deleted']
+                home = table._hash(entry['key']) & table.mask
+                assert table.distances[pos] == (pos - home) & table.mask
+
+
+@pytest.mark.parametrize('probing', FileHashTable.PROBING_MODES)
+def test_random_operations_match_dict(probing):
+    rng = random.Random(13)
+    table = FileHashTable(probing=probing)
+    model = {}
+    for step in range(4000):
+        name = f"File{rng.randrange(600)}.txt"
+        if rng.random() < 0.6:
+            inserted = table.insert(name, f"Root/{name}", replace=False)
+            assert inserted == (name.lower() not in model)
+            model.setdefault(name.lower(), name)
+        else:
+            assert table.delete(name) == (model.pop(name.lower(), None) is not None)
+        if step % 500 == 0:
+            check_against(table, model)
+    check_against(table, model)
+    assert table.load_factor() < table.max_load
+
+
+def test_compact_table_matches_dict():
+    rng = random.Random(17)
+    tree = CompactTree()
+    folders = [tree.root, tree.root.add_folder("A"), tree.root.add_folder("B")]
+    table = CompactFileTable(tree)
+    model = {}  # key -> (folder, filename)
+    for step in range(4000):
+        folder = rng.choice(folders)
+        name = f"File{rng.randrange(300)}.txt"
+        key = f"{folder.folder_id}/{name}".lower()
+        if rng.random() < 0.6:
+            if key not in model:
+                folder.add_file(name)  # the tree row comes first
+                assert table.insert(name, folder, replace=False)
+                model[key] = (folder, name)
+            else:
+                assert not table.insert(name, folder, replace=False)
+        elif key in model:
+            assert table.delete(key)
+            folder.remove_file(model.pop(key)[1])
+        else:
+            assert not table.delete(key)
+    assert table.count == len(model)
+    for key, (folder, name) in model.items():
+        entry = table.search(key)
+        assert (entry['folder'], entry['filename'], entry['key']) == (folder, name, key)
+    live = [entry['key'] for entry in table.table if entry is not None and not entry['deleted']]
+    assert sorted(live) == sorted(model)
+    assert table.load_factor() < table.max_load
+
+
+@pytest.mark.parametrize('probing', FileHashTable.PROBING_MODES)
+def test_replace_updates_the_entry(probing):
+    table = FileHashTable(probing=probing)
+    table.insert("a.txt", "Root/x/a.txt")
+    assert table.insert("A.TXT", "Root/y/A.TXT")
+    assert table.count == 1
+    assert table.search("a.txt")['filepath'] == "Root/y/A.TXT"
+
+
+@pytest.mark.parametrize('size', [1, 10, 16, 1000])
+def test_size_is_a_power_of_two(size):
+    table = FileHashTable(size=size)
+    assert table.size >= size and table.size & (table.size - 1) == 0
+    assert table.mask == table.size - 1
+
+
+@pytest.mark.parametrize('hash_name', sorted(HASH_FUNCTIONS))
+def test_every_hash_function_works(hash_name):
+    table = FileHashTable(hash_func=hash_name)
+    for i in range(200):
+        table.insert(f"f{i}.txt", "x")
+    check_against(table, {f"f{i}.txt": f"f{i}.txt" for i in range(200)})
+
+
+def test_stable_hashes_do_not_depend_on_the_process():
+    assert HASH_FUNCTIONS['crc32']("a.txt") == zlib.crc32(b"a.txt")
+    assert HASH_FUNCTIONS['fnv1a']("") == 0xcbf29ce484222325
+
+
+def test_linear_delete_leaves_a_reusable_tombstone():
+    table = FileHashTable(size=16, hash_func=same_bucket)
+    for name in ("a", "b", "c"):
+        table.insert(name, name)
+    assert table.delete("b")
+    assert table.tombstones == 1
+    assert table.table[1]['deleted'] and table.table[1]['filepath'] is None
+    assert table.search("c")['filename'] == "c"  # found past the tombstone
+    
+    table.insert("d", "d")
+    assert table.tombstones == 0
+    assert table.table[1]['filename'] == "d"
+    check_against(table, {"a": "a", "c": "c", "d": "d"})
+
+
+def test_linear_tombstones_are_cleared_by_a_rebuild():
+    table = FileHashTable(size=64)
+    names = [f"f{i}" for i in range(40)]
+    for name in names:
+        table.insert(name, name)
+    for name in names[:20]:
+        table.delete(name)
+    assert table.tombstones <= table.size * table.MAX_TOMBSTONES
+    check_against(table, {name: name for name in names[20:]})
+
+
+@pytest.mark.parametrize('probing', FileHashTable.PROBING_MODES)
+def test_table_shrinks_after_mass_delete(probing):
+    table = FileHashTable(probing=probing)
+    names = [f"f{i}" for i in range(2000)]
+    for name in names:
+        table.insert(name, name)
+    peak = table.size
+    for name in names[:1990]:
+        table.delete(name)
+    assert table.size < peak
+    assert table.count >= table.size * table.MIN_LOAD
+    check_against(table, {name: name for name in names[1990:]})
+
+
+def test_shrink_stops_at_the_requested_size():
+    table = FileHashTable(size=1024)
+    for i in range(10):
+        table.insert(f"f{i}", "x")
+    for i in range(10):
+        table.delete(f"f{i}")
+    assert table.size == 1024
+
+
+def test_robin_hood_delete_shifts_the_chain_back():
+    table = FileHashTable(size=16, probing='robin_hood', hash_func=same_bucket)
+    for name in ("a", "b", "c"):
+        table.insert(name, name)
+    assert list(table.distances[:3]) == [0, 1, 2]
+    
+    assert table.delete("a")
+    assert [entry['filename'] for entry in table.table[:2]] == ["b", "c"]
+    assert table.table[2] is None
+    assert list(table.distances[:3]) == [0, 1, 0]
+    check_against(table, {"b": "b", "c": "c"})
+
+
+def test_robin_hood_search_stops_early():
+    table = FileHashTable(size=16, probing='robin_hood', hash_func=same_bucket)
+    table.insert("a", "a")
+    assert table.search("missing") is None
+    assert table.probe_length("missing") <= 2
+
+
+def test_reserve_avoids_rehashing():
+    table = FileHashTable()
+    table.reserve(5000)
+    size = table.size
+    for i in range(5000):
+        table.insert(f"f{i}", "x")
+    assert table.size == size
@@ -0,0 +1,79 @@
+# Tests for the operation journal
+# A catalogue rebuilt from its journal, with or without a compaction in
+# between, must match the one that wrote it
+
+import os
+import random
+
+import pytest
+
+from file_organizer import FileOrganizer
+from journal import journal_segments
+from test_snapshot import populate, state
+
+
+STORAGES = FileOrganizer.STORAGE_ENGINES
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_journal_replay(storage, tmp_path):
+    snapshot_path = str(tmp_path / "catalogue.snap")
+    journal_path = str(tmp_path / "journal")
+    organizer = FileOrganizer(storage)
+    assert organizer.open_store(snapshot_path, journal_path, fsync='never') == 0
+    populate(organizer, random.Random(4))
+    expected = state(organizer)
+    organizer.close_store()
+    
+    reopened = FileOrganizer(storage)
+    assert reopened.open_store(snapshot_path, journal_path, fsync='never') > 0
+    assert state(reopened) == expected
+    assert reopened.tree.check_statistics() == []
+    reopened.close_store()
+
+
+def test_journal_replay_ignores_a_torn_last_record(tmp_path):
+    snapshot_path = str(tmp_path / "catalogue.snap")
+    journal_path = str(tmp_path / "journal")
+    organizer = FileOrganizer()
+    organizer.open_store(snapshot_path, journal_path, fsync='never')
+    organizer.add_file("kept.txt", "Docs")
+    organizer.close_store()
+    segment = f"{journal_path}.{journal_segments(journal_path)[-1]:06d}.log"
+    with open(segment, 'a', encoding='utf-8') as out:
+        out.write('[99, "add", "Root/Docs/lost')
+    
+    reopened = FileOrganizer()
+    reopened.open_store(snapshot_path, journal_path, fsync='never')
+    assert state(reopened)['files'] == {"Root/Docs/kept.txt": None}
+    reopened.close_store()
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_compaction_folds_the_journal_into_the_snapshot(storage, tmp_path):
+    snapshot_path = str(tmp_path / "catalogue.snap")
+    journal_path = str(tmp_path / "journal")
+    organizer = FileOrganizer(storage)
+    organizer.open_store(snapshot_path, journal_path, fsync='never')
+    rng = random.Random(5)
+    populate(organizer, rng)
+    organizer.compact().join()
+    assert os.path.exists(snapshot_path)
+    populate(organizer, rng, steps=100)  # after the compaction, journal only
+    expected = state(organizer)
+    organizer.close_store()
+    assert len(journal_segments(journal_path)) == 1
+    
+    reopened = FileOrganizer(storage)
+    reopened.open_store(snapshot_path, journal_path, fsync='never')
+    assert state(reopened) == expected
+    assert reopened.tree.check_statistics() == []
+    reopened.close_store()
+
+
+@pytest.mark.parametrize('filename', ["", "a/b"])
+def test_add_file_rejects_names_a_journal_path_cannot_hold(filename):
+    organizer = FileOrganizer()
+    success, message = organizer.add_file(filename, "Docs")
+    assert not success and "Invalid" in message
+    assert organizer.get_folder("Docs") is None
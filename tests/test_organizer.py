@@ -0,0 +1,201 @@
+# Tests for FileOrganizer's file and folder operations
+# Random adds, deletes, renames, moves and folder deletes on both storage
+# engines, checked against a set of paths after every step, with the
+# stored subtree totals recounted each time
+
+import gc
+import random
+
+import pytest
+
+import compact_index
+import compact_tree
+from file_organizer import FileOrganizer
+from gc_pause import gc_paused
+
+
+STORAGES = FileOrganizer.STORAGE_ENGINES
+
+
+def file_paths(organizer):
+    """Every file's full path, read from the tree"""
+    paths = set()
+    order = [organizer.tree]
+    for folder in order:
+        order.extend(folder.subfolders)
+        paths.update(f"{folder.get_path()}/{filename}" for filename in folder.files)
+    return paths
+
+def folder_paths(organizer):
+    order = [organizer.tree]
+    for folder in order:
+        order.extend(folder.subfolders)
+    return {folder.get_path() for folder in order}
+
+def check(organizer, files):
+    assert organizer.tree.check_statistics() == []
+    assert file_paths(organizer) == files
+    assert organizer.hash_table.count == len(files)
+    assert organizer.get_statistics()['files'] == len(files)
+    for path in files:
+        assert organizer.search_file(path)[0], path
+
+def moved(paths, old, new):
+    """paths with the folder old (and everything under it) now at new"""
+    return {new + path[len(old):] if path == old or path.startswith(old + "/") else path
+            for path in paths}
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_random_operations_keep_totals(storage):
+    rng = random.Random(7)
+    organizer = FileOrganizer(storage)
+    files = set()
+    names = ["a", "b", "c", "d"]
+    for step in range(600):
+        folders = sorted(folder_paths(organizer))
+        op = rng.random()
+        if op < 0.45:
+            folder = rng.choice(folders + ["Root/" + rng.choice(names)])
+            filename = rng.choice(names) + rng.choice([".txt", ".jpg"])
+            success, _ = organizer.add_file(filename, folder[len("Root/"):], size=rng.randrange(1000))
+            assert success == (f"{folder}/{filename}" not in files)
+            files.add(f"{folder}/{filename}")
+        elif op < 0.65 and files:
+            path = rng.choice(sorted(files))
+            folder, _, filename = path.rpartition('/')
+            assert organizer.delete_file(filename, folder)[0]
+            files.discard(path)
+        elif op < 0.8 and len(folders) > 1:
+            folder = rng.choice(folders[1:])
+            new_name = rng.choice(names)
+            new_path = folder.rpartition('/')[0] + "/" + new_name
+            success, _ = organizer.rename_folder(folder, new_name)
+            assert success == (new_path not in folders)
+            if success:
+                files = moved(files, folder, new_path)
+        elif op < 0.93 and len(folders) > 1:
+            folder = rng.choice(folders[1:])
+            dest = rng.choice(folders)
+            success, _ = organizer.move_folder(folder, dest)
+            if success:
+                files = moved(files, folder, dest + "/" + folder.rpartition('/')[2])
+        elif len(folders) > 1:
+            folder = rng.choice(folders[1:])
+            assert organizer.delete_folder(folder)[0]
+            files = {path for path in files if not path.startswith(folder + "/")}
+        check(organizer, files)
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_statistics_cover_the_subtree(storage):
+    organizer = FileOrganizer(storage)
+    organizer.add_file("a.txt", "A", size=5)
+    organizer.add_file("b.txt", "A/B", size=7)
+    organizer.add_file("c.txt", "C", size=11)
+    assert organizer.get_statistics() == {'folders': 4, 'files': 3, 'bytes': 23}
+    assert organizer.get_statistics(organizer.get_folder("A")) == {'folders': 2, 'files': 2, 'bytes': 12}
+    assert organizer.get_statistics(organizer.get_folder("A/B")) == {'folders': 1, 'files': 1, 'bytes': 7}
+
+
+def test_check_statistics_reports_a_wrong_total():
+    organizer = FileOrganizer()
+    organizer.add_file("a.txt", "A/B", size=5)
+    organizer.get_folder("A").total_bytes += 1
+    assert organizer.tree.check_statistics() == ["Root/A"]
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_equal_names_in_different_folders_coexist(storage):
+    organizer = FileOrganizer(storage)
+    assert organizer.add_file("a.txt", "X")[0]
+    assert organizer.add_file("A.txt", "Y/Z")[0]
+    assert not organizer.add_file("A.TXT", "X")[0]  # same path ignoring case
+    assert sorted(organizer.find_copies("a.TXT")) == ["Root/X/a.txt", "Root/Y/Z/A.txt"]
+    assert organizer.search_file("Root/Y/Z/a.txt")[0]
+    assert not organizer.search_file("Root/Y/a.txt")[0]
+    
+    success, message = organizer.delete_file("a.txt")
+    assert not success and "2 folders" in message
+    assert organizer.delete_file("a.txt", "Y/Z")[0]
+    assert organizer.delete_file("a.txt")[0]  # unique now
+    check(organizer, set())
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_add_files_reports_counts(storage):
+    organizer = FileOrganizer(storage)
+    report = organizer.add_files([("a.txt", "Docs"), ("A.TXT", "Docs"), ("a.txt", "Docs/Old"),
+                                  ("", "Docs"), ("x/y", "Bad"), ("b.jpg", "", 10, 1.0)])
+    assert report == {'added': 3, 'duplicates': 1, 'failed': 2}
+    assert organizer.get_folder("Bad") is None
+    check(organizer, {"Root/Docs/a.txt", "Root/Docs/Old/a.txt", "Root/b.jpg"})
+    assert organizer.get_statistics()['bytes'] == 10
+
+
+def test_overlapping_gc_pauses_keep_the_collector_off():
+    assert gc.isenabled()
+    outer = gc_paused()
+    outer.__enter__()
+    with gc_paused():
+        assert not gc.isenabled()
+    assert not gc.isenabled()  # the outer pause is still running
+    outer.__exit__(None, None, None)
+    assert gc.isenabled()
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_folder_cannot_move_into_itself(storage):
+    organizer = FileOrganizer(storage)
+    organizer.add_file("f.txt", "A/B/C")
+    assert not organizer.move_folder("A", "A/B/C")[0]
+    assert not organizer.rename_folder("Root", "Other")[0]
+    assert not organizer.rename_folder("A/B", "x/y")[0]
+    check(organizer, {"Root/A/B/C/f.txt"})
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_rename_and_move_keep_files_findable(storage):
+    organizer = FileOrganizer(storage)
+    organizer.add_files([("report.pdf", "Work/2024"), ("notes.txt", "Work/2024/Drafts")])
+    assert organizer.rename_folder("Work/2024", "Archive")[0]
+    assert organizer.move_folder("Work/Archive", "")[0]
+    check(organizer, {"Root/Archive/report.pdf", "Root/Archive/Drafts/notes.txt"})
+    assert organizer.find_copies("NOTES.TXT") == ["Root/Archive/Drafts/notes.txt"]
+    assert [match['full_path'] for match in organizer.search_files("report")] == \
+        ["Root/Archive/report.pdf"]
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_delete_folder_forgets_its_files(storage):
+    organizer = FileOrganizer(storage)
+    organizer.add_files([("a.txt", "Keep"), ("a.txt", "Drop"), ("b.txt", "Drop/Sub")])
+    assert organizer.delete_folder("Drop")[0]
+    check(organizer, {"Root/Keep/a.txt"})
+    assert organizer.search_files("b.txt") == []
+    assert organizer.complete_filename("b") == []
+    assert organizer.delete_file("a.txt")[0]  # the only copy left
+    check(organizer, set())
+
+
+def test_compact_storage_reuses_rows_and_compacts_names(monkeypatch):
+    monkeypatch.setattr(compact_tree, 'NAMES_COMPACT_MIN', 0)
+    monkeypatch.setattr(compact_index, 'COMPACT_MIN', 0)
+    organizer = FileOrganizer('compact')
+    store = organizer.tree.store
+    organizer.add_files([("keep.txt", "Keep")])
+    sizes = []
+    for batch in range(6):
+        organizer.add_files([(f"f{batch}_{i}.txt", f"Tmp/S{i % 5}") for i in range(50)])
+        sizes.append((len(store.parent), len(store.file_folder), len(store.names)))
+        assert organizer.delete_folder("Tmp")[0]
+        check(organizer, {"Root/Keep/keep.txt"})
+    # The freed folder and file rows and the name bytes are used again
+    assert sizes[1:] == sizes[:1] * 5
+    assert store.dead_bytes < len(store.names)
+    assert organizer.locations.name_table.generation > 0
+    assert [match['full_path'] for match in organizer.search_files("keep")] == ["Root/Keep/keep.txt"]
+    assert organizer.complete_filename("k") == ["keep.txt"]
+    assert organizer.complete_filename("f") == []
+    assert organizer.find_copies("keep.txt") == ["Root/Keep/keep.txt"]
+    assert [match['file'] for match in organizer.query("ext:txt")] == ["keep.txt"]
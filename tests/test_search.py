@@ -0,0 +1,174 @@
+# Tests for name search, completion, queries and metadata queries
+# Each answer is compared with a brute-force walk over every file
+
+import fnmatch
+import random
+
+import pytest
+
+from file_organizer import FileOrganizer
+from metadata import size_bucket
+from search_index import PrefixTrie
+
+
+STORAGES = FileOrganizer.STORAGE_ENGINES
+FOLDERS = ["", "A", "A/B", "A/B/C", "D", "D/E"]
+
+
+def build(storage, seed, bulk):
+    """Organizer with random files, some with size and mtime, added one
+    by one or with add_files; returns it with a list of (folder path,
+    filename, size or None, mtime or None)"""
+    rng = random.Random(seed)
+    organizer = FileOrganizer(storage)
+    files = {}
+    batch = []
+    for _ in range(1500):
+        folder = rng.choice(FOLDERS)
+        filename = ("".join(rng.choice("abcAB") for _ in range(rng.randint(1, 5)))
+                    + rng.choice([".jpg", ".txt", ".JPG", ""]))
+        info = (rng.randrange(1 << 16), rng.uniform(0, 1000)) if rng.random() < 0.7 else ()
+        batch.append((filename, folder, *info))
+        files.setdefault((folder, filename.lower()), (filename, *(info or (None, None))))
+    if bulk:
+        organizer.add_files(batch)
+    else:
+        for filename, folder, *info in batch:
+            organizer.add_file(filename, folder, *info)
+    # Delete some, so the indexes see removals too
+    for key in rng.sample(sorted(files), 200):
+        folder, _ = key
+        assert organizer.delete_file(files.pop(key)[0], folder)[0]
+    return organizer, [(folder, *info) for (folder, _), info in files.items()]
+
+def full_path(folder, filename):
+    return f"Root/{folder}/{filename}" if folder else f"Root/{filename}"
+
+def under(folder, scope):
+    return scope == "" or folder == scope or folder.startswith(scope + "/")
+
+
+@pytest.fixture(params=[(storage, bulk) for storage in STORAGES for bulk in (False, True)],
+                ids=lambda param: f"{param[0]}-{'bulk' if param[1] else 'single'}")
+def catalogue(request):
+    storage, bulk = request.param
+    return build(storage, 11, bulk)
+
+
+def test_search_files(catalogue):
+    organizer, files = catalogue
+    for pattern in ["a", "B", "ab", "aba", ".jpg", "b.t", "zzz"]:
+        expected = {full_path(folder, name) for folder, name, *_ in files if pattern.lower() in name.lower()}
+        found = [match['full_path'] for match in organizer.search_files(pattern)]
+        assert sorted(found) == sorted(expected), pattern
+
+
+def test_complete_filename(catalogue):
+    organizer, files = catalogue
+    names = sorted({name.lower() for _, name, *_ in files})
+    for prefix in ["", "a", "ab", "BA", "abab", "c"]:
+        for limit in (1, 10, 1000):
+            expected = [name for name in names if name.startswith(prefix.lower())][:limit]
+            found = organizer.complete_filename(prefix, limit)
+            assert [name.lower() for name in found] == expected, (prefix, limit)
+
+
+def test_prefix_trie_runs_match_a_sorted_list():
+    rng = random.Random(5)
+    trie = PrefixTrie()
+    names = set()
+    for _ in range(60):
+        batch = {"".join(rng.choice("abc") for _ in range(rng.randint(1, 6))) for _ in range(rng.randint(1, 40))}
+        batch -= names
+        if rng.random() < 0.5:
+            trie.add_names(batch)
+        else:
+            for name in batch:
+                trie.add_name(name)
+        names |= batch
+        for name in rng.sample(sorted(names), min(len(names), 5)):
+            trie.remove_name(name)
+            names.discard(name)
+        for prefix in ["", "a", "ab", "cab"]:
+            assert trie.complete(prefix, 1000) == sorted(name for name in names if name.startswith(prefix))
+
+
+QUERIES = {
+    'ext:jpg': lambda folder, name: name.lower().endswith('.jpg'),
+    'ext:jpg under:A/B': lambda folder, name: name.lower().endswith('.jpg') and under(folder, "A/B"),
+    'name:ab under:D': lambda folder, name: 'ab' in name.lower() and under(folder, "D"),
+    'a*.txt': lambda folder, name: fnmatch.fnmatchcase(name.lower(), 'a*.txt'),
+    'a*.txt under:A': lambda folder, name: fnmatch.fnmatchcase(name.lower(), 'a*.txt') and under(folder, "A"),
+    '(ext:txt OR name:bb) under:A/B/C':
+        lambda folder, name: (name.lower().endswith('.txt') or 'bb' in name.lower()) and under(folder, "A/B/C"),
+    'NOT ext:jpg under:D/E': lambda folder, name: not name.lower().endswith('.jpg') and under(folder, "D/E"),
+    'under:A ext:""': lambda folder, name: '.' not in name and under(folder, "A"),
+    'glob:"Root/A/*/*.txt"':
+        lambda folder, name: fnmatch.fnmatchcase(full_path(folder, name).lower(), 'root/a/*/*.txt'),
+}
+
+
+@pytest.mark.parametrize('query', sorted(QUERIES))
+def test_query(catalogue, query):
+    organizer, files = catalogue
+    expected = {full_path(folder, name) for folder, name, *_ in files if QUERIES[query](folder, name)}
+    found = [match['full_path'] for match in organizer.query(query)]
+    assert len(found) == len(set(found))
+    assert set(found) == expected
+    for limit in (1, 5, 50):
+        found = [match['full_path'] for match in organizer.query(query, limit)]
+        assert len(found) == min(limit, len(expected)) and set(found) <= expected
+
+
+@pytest.mark.parametrize('scope', FOLDERS)
+def test_metadata_queries(catalogue, scope):
+    organizer, files = catalogue
+    known = [(full_path(folder, name), size, mtime) for folder, name, size, mtime in files
+             if size is not None and under(folder, scope)]
+    folder_path = scope or None
+    
+    for k in (1, 7, 2000):
+        largest = organizer.largest_files(k, folder_path)
+        assert [match['size'] for match in largest] == sorted((size for _, size, _ in known), reverse=True)[:k]
+        newest = organizer.newest_files(k, folder_path)
+        assert [match['mtime'] for match in newest] == sorted((mtime for *_, mtime in known), reverse=True)[:k]
+    
+    for since in (0, 500, 999.5):
+        found = organizer.modified_since(since, folder_path)
+        assert sorted(match['full_path'] for match in found) == \
+            sorted(path for path, _, mtime in known if mtime >= since)
+    
+    histogram = {}
+    for _, size, _ in known:
+        row = histogram.setdefault(size_bucket(size), [0, 0])
+        row[0] += 1
+        row[1] += size
+    rows = organizer.size_histogram(folder_path)
+    assert {size_bucket(row['max']): [row['files'], row['bytes']] for row in rows} == histogram
+    by_folder = organizer.size_histogram(folder_path, by_folder=True)
+    assert sum(row['files'] for rows in by_folder.values() for row in rows) == len(known)
+
+
+def test_metadata_replaces_a_folders_only_file():
+    organizer = FileOrganizer()
+    organizer.add_file("a.bin", "A", 10, 1.0)
+    folder = organizer.get_folder("A")
+    organizer.metadata.add(folder, "a.bin", 20, 2.0)
+    assert organizer.metadata.get(folder, "a.bin") == (20, 2.0)
+    assert len(organizer.metadata) == 1
+    assert [match['size'] for match in organizer.largest_files(5, "A")] == [20]
+
+
+def test_metadata_follows_renames_and_moves():
+    organizer = FileOrganizer()
+    organizer.add_file("big.bin", "A/B", 5000, 10.0)
+    organizer.add_file("small.bin", "C", 10, 20.0)
+    organizer.add_file("big.bin", "A/B", 7000, 30.0)  # already there: unchanged
+    assert organizer.rename_folder("A/B", "X")[0]
+    assert organizer.move_folder("A/X", "C")[0]
+    assert [match['full_path'] for match in organizer.largest_files(5, "C")] == \
+        ["Root/C/X/big.bin", "Root/C/small.bin"]
+    assert organizer.largest_files(5, "A") == []
+    assert sum(row['files'] for row in organizer.size_histogram("A")) == 0
+    assert organizer.delete_folder("C/X")[0]
+    assert [match['file'] for match in organizer.newest_files(5)] == ["small.bin"]
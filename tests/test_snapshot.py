@@ -0,0 +1,138 @@
+# Tests for snapshots
+# A catalogue loaded from a snapshot must match the one that saved it,
+# and keep matching it through later changes
+
+import random
+import threading
+import time
+
+import pytest
+
+from file_organizer import FileOrganizer
+from snapshot import VERSION
+
+
+STORAGES = FileOrganizer.STORAGE_ENGINES
+
+
+def state(organizer):
+    """Everything the tests compare: files with their metadata, folders,
+    totals and what the search indexes return"""
+    files = {}
+    folders = []
+    order = [organizer.tree]
+    for folder in order:
+        order.extend(folder.subfolders)
+        folders.append(folder.get_path())
+        for filename in folder.files:
+            files[f"{folder.get_path()}/{filename}"] = organizer.metadata.get(folder, filename)
+    return {
+        'files': files,
+        'folders': sorted(folders),
+        'totals': organizer.get_statistics(),
+        'search': sorted(match['full_path'] for match in organizer.search_files("a")),
+        'complete': organizer.complete_filename("b", 50),
+        'query': sorted(match['full_path'] for match in organizer.query("ext:jpg")),
+    }
+
+def populate(organizer, rng, steps=300):
+    """Random adds (some with metadata), deletes and folder changes"""
+    for _ in range(steps):
+        op = rng.random()
+        order = [organizer.tree]
+        for folder in order:
+            order.extend(folder.subfolders)
+        folders = [folder.get_path() for folder in order]
+        if op < 0.6:
+            folder = rng.choice(folders + ["Root/" + rng.choice("abc")])[len("Root/"):]
+            filename = "".join(rng.choice("abc") for _ in range(3)) + rng.choice([".txt", ".jpg"])
+            if rng.random() < 0.5:
+                organizer.add_file(filename, folder, rng.randrange(5000), rng.uniform(0, 1000))
+            else:
+                organizer.add_file(filename, folder)
+        elif op < 0.8:
+            folder = organizer.get_folder(rng.choice(folders))
+            if folder.files:
+                organizer.delete_file(rng.choice(folder.files), folder.get_path())
+        elif op < 0.9 and len(folders) > 1:
+            organizer.rename_folder(rng.choice(folders[1:]), rng.choice("abcd"))
+        elif op < 0.97 and len(folders) > 1:
+            organizer.move_folder(rng.choice(folders[1:]), rng.choice(folders))
+        elif len(folders) > 1:
+            organizer.delete_folder(rng.choice(folders[1:]))
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_snapshot_round_trip(storage, tmp_path):
+    organizer = FileOrganizer(storage)
+    populate(organizer, random.Random(1))
+    path = str(tmp_path / "catalogue.snap")
+    organizer.save_snapshot(path)
+    
+    loaded = FileOrganizer(storage)
+    loaded.load_snapshot(path)
+    assert state(loaded) == state(organizer)
+    assert loaded.tree.check_statistics() == []
+    for file_path in state(organizer)['files']:
+        assert loaded.search_file(file_path)[0]
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_snapshot_can_be_changed_after_loading(storage, tmp_path):
+    organizer = FileOrganizer(storage)
+    populate(organizer, random.Random(2))
+    path = str(tmp_path / "catalogue.snap")
+    organizer.save_snapshot(path)
+    loaded = FileOrganizer(storage)
+    loaded.load_snapshot(path)
+    
+    # The same changes on both: the loaded one starts from lazy snapshot data
+    populate(organizer, random.Random(3), steps=150)
+    populate(loaded, random.Random(3), steps=150)
+    assert state(loaded) == state(organizer)
+    assert loaded.tree.check_statistics() == []
+
+
+def test_lazy_nodes_load_once_across_threads(tmp_path, monkeypatch):
+    organizer = FileOrganizer()
+    populate(organizer, random.Random(6))
+    path = str(tmp_path / "catalogue.snap")
+    organizer.save_snapshot(path)
+    loaded = FileOrganizer()
+    loaded.load_snapshot(path)
+    
+    loads = []
+    load_folder = type(loaded.snapshot).load_folder
+    
+    def slow_load(self, node):
+        loads.append(node)
+        time.sleep(0.001)  # widen the window for a second loader
+        load_folder(self, node)
+    monkeypatch.setattr(type(loaded.snapshot), 'load_folder', slow_load)
+    
+    def walk(found):
+        order = [loaded.tree]
+        for folder in order:
+            order.extend(folder.subfolders)
+        found.append(sorted(f"{folder.get_path()}/{name}" for folder in order for name in folder.files))
+    found = []
+    threads = [threading.Thread(target=walk, args=(found,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == len(set(map(id, loads)))
+    assert len(found) == 4 and all(paths == found[0] for paths in found)
+    assert found[0] == sorted(state(organizer)['files'])
+
+
+def test_other_snapshot_versions_are_rejected(tmp_path):
+    organizer = FileOrganizer()
+    organizer.add_file("a.txt", "Docs")
+    path = str(tmp_path / "catalogue.snap")
+    organizer.save_snapshot(path)
+    with open(path, 'r+b') as snap:
+        snap.seek(8)
+        snap.write((VERSION + 1).to_bytes(4, 'little'))
+    with pytest.raises(ValueError, match="version"):
+        FileOrganizer().load_snapshot(path)
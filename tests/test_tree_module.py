@@ -0,0 +1,30 @@
+# Tests for the iterative traversals of tree_module's Folder
+# Deep trees must not hit the recursion limit, and the traversals must
+# not cache a path on the folders they visit
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tree_module.tree_module import FileSystemTree
+
+
+def test_search_files_in_a_deep_tree_builds_paths_from_the_traversal():
+    tree = FileSystemTree()
+    path = "/".join(f"d{i}" for i in range(3000))  # deeper than the recursion limit
+    leaf = tree.create_folder_path(path)
+    leaf.add_file("deep.txt")
+    tree.create_folder_path("d0/side").add_file("Side.TXT")
+    
+    found = tree.root.search_files(".txt")
+    assert sorted(match['full_path'] for match in found) == \
+        sorted([f"Root/{path}/deep.txt", "Root/d0/side/Side.TXT"])
+    assert leaf._path is None  # nothing cached below the root
+
+
+def test_search_files_skips_pruned_subtrees():
+    tree = FileSystemTree()
+    tree.create_folder_path("a/b").add_file("x.txt")
+    tree.create_folder_path("c").add_file("x.txt")
+    found = tree.root.iter_search_files("x", prune=lambda folder: folder.name == "a")
+    assert [match['full_path'] for match in found] == ["Root/c/x.txt"]
@@ -1,131 +1,310 @@
+from collections import deque
+
+
 class Folder:
+    # Bumped by every rename or move; cached paths stamped with an older
+    # epoch are checked against their parent's path before use
+    _epoch = 0
+    
     def __init__(self, name, parent=None):
         self.name = name
         self.parent = parent
         self.subfolders = []
         self.files = []  # Store files in this folder
+        # name -> subfolder and file name set, for O(1) lookups
+        self._children = {}
+        self._file_names = set()
+        # Cached path and depth (see get_path)
+        self._path = None
+        self._parent_path = None
+        self._depth = 0
+        self._path_epoch = -1
+        # Totals for the subtree rooted here (this folder included),
+        # updated along the ancestor chain on every change
+        self.total_folders = 1
+        self.total_files = 0
+        self.total_bytes = 0
+        self._sizes = {}  # filename -> bytes, for files added with a size
+    
+    # Add to the subtree totals of this folder and its ancestors
+    def _add_totals(self, folders, files, size):
+        node = self
+        while node is not None:
+            node.total_folders += folders
+            node.total_files += files
+            node.total_bytes += size
+            node = node.parent
     
     # Add a subfolder
     def add_subfolder(self, folder_name):
         new_folder = Folder(folder_name, parent=self)
         self.subfolders.append(new_folder)
+        self._children.setdefault(folder_name, new_folder)
+        self._add_totals(1, 0, 0)
         return new_folder
     
+    # Get a direct subfolder by name
+    def get_subfolder(self, folder_name):
+        return self._children.get(folder_name)
+    
     # Remove a subfolder
     def remove_subfolder(self, folder_name):
-        for i, subfolder in enumerate(self.subfolders):
-            if subfolder.name == folder_name:
-                del self.subfolders[i]
-                return True
-        return False
+        subfolder = self._children.get(folder_name)
+        if subfolder is None:
+            return False
+        self._unlink_child(subfolder)
+        self.subfolders.remove(subfolder)
+        self._add_totals(-subfolder.total_folders, -subfolder.total_files,
+                         -subfolder.total_bytes)
+        return True
+    
+    # Drop a child from the name index, keeping a same-named sibling
+    # (add_subfolder allows duplicate names)
+    def _unlink_child(self, child):
+        if self._children.get(child.name) is not child:
+            return
+        del self._children[child.name]
+        for other in self.subfolders:
+            if other is not child and other.name == child.name:
+                self._children[child.name] = other
+                break
+    
+    # Rename this folder; paths below it are refreshed on next use
+    def rename(self, new_name):
+        if self.parent is not None:
+            self.parent._unlink_child(self)
+            self.parent._children.setdefault(new_name, self)
+        self.name = new_name
+        self._path = None
+        Folder._epoch += 1
     
-    # Add file to folder
-    def add_file(self, filename):
-        if filename not in self.files:
+    # Move this folder under new_parent (not into its own subtree)
+    def move_to(self, new_parent):
+        node = new_parent
+        while node is not None:
+            if node is self:
+                return False
+            node = node.parent
+        
+        totals = (self.total_folders, self.total_files, self.total_bytes)
+        if self.parent is not None:
+            self.parent._unlink_child(self)
+            self.parent.subfolders.remove(self)
+            self.parent._add_totals(-totals[0], -totals[1], -totals[2])
+        new_parent.subfolders.append(self)
+        new_parent._children.setdefault(self.name, self)
+        new_parent._add_totals(*totals)
+        self.parent = new_parent
+        self._path = None
+        Folder._epoch += 1
+        return True
+    
+    # Add file to folder (size in bytes is optional)
+    def add_file(self, filename, size=0):
+        if filename not in self._file_names:
+            self._file_names.add(filename)
             self.files.append(filename)
+            if size:
+                self._sizes[filename] = size
+            self._add_totals(0, 1, size)
             return True
         return False
     
     # Remove file from folder
     def remove_file(self, filename):
-        if filename in self.files:
+        if filename in self._file_names:
+            self._file_names.discard(filename)
             self.files.remove(filename)
+            self._add_totals(0, -1, -self._sizes.pop(filename, 0))
             return True
         return False
     
     # Find a folder by name (DFS traversal)
     def find_folder(self, folder_name):
-        if self.name == folder_name:
-            return self
-        
-        for subfolder in self.subfolders:
-            result = subfolder.find_folder(folder_name)
-            if result:
-                return result
+        for folder in self.iter_preorder():
+            if folder.name == folder_name:
+                return folder
         return None
     
-    # Get full path from root
+    # Get full path from root (cached, O(1) until an ancestor changes)
     def get_path(self):
-        if self.parent is None:
-            return self.name
-        return self.parent.get_path() + "/" + self.name
+        if self._path_epoch != Folder._epoch:
+            self._refresh_path()
+        return self._path
+    
+    # Number of folders above this one
+    def get_depth(self):
+        if self._path_epoch != Folder._epoch:
+            self._refresh_path()
+        return self._depth
+    
+    # Refresh the stale caches from the nearest current ancestor down;
+    # a path is rebuilt only if its parent's path object changed
+    def _refresh_path(self):
+        epoch = Folder._epoch
+        stale = []
+        node = self
+        while node is not None and node._path_epoch != epoch:
+            stale.append(node)
+            node = node.parent
+        
+        for node in reversed(stale):
+            parent = node.parent
+            if parent is None:
+                node._path = node.name
+                node._depth = 0
+            elif node._path is None or node._parent_path is not parent._path:
+                node._path = parent._path + "/" + node.name
+                node._parent_path = parent._path
+                node._depth = parent._depth + 1
+            node._path_epoch = epoch
+    
+    # Generator traversals. They keep an explicit stack of child
+    # iterators (memory grows with depth, not size) and never recurse.
+    # A folder for which prune(folder) is true is skipped together with
+    # everything below it
+    
+    # Preorder: each folder before its subfolders
+    def iter_preorder(self, prune=None):
+        for folder, _ in self._iter_preorder_depth(prune):
+            yield folder
+    
+    # Preorder as (folder, depth below this folder) pairs. The depth is
+    # the stack height, so no path is built or cached on the nodes
+    def _iter_preorder_depth(self, prune=None):
+        stack = [iter((self,))]
+        while stack:
+            for folder in stack[-1]:
+                if prune is not None and prune(folder):
+                    continue
+                yield folder, len(stack) - 1
+                stack.append(iter(folder.subfolders))
+                break
+            else:
+                stack.pop()
+    
+    # Postorder: each folder after all of its subfolders
+    def iter_postorder(self, prune=None):
+        if prune is not None and prune(self):
+            return
+        stack = [(self, iter(self.subfolders))]
+        while stack:
+            folder, children = stack[-1]
+            for child in children:
+                if prune is not None and prune(child):
+                    continue
+                stack.append((child, iter(child.subfolders)))
+                break
+            else:
+                stack.pop()
+                yield folder
+    
+    # Level order: (folder, depth below this folder) pairs, breadth first
+    def iter_level_order(self, prune=None):
+        if prune is not None and prune(self):
+            return
+        queue = deque([(self, 0)])
+        while queue:
+            folder, depth = queue.popleft()
+            yield folder, depth
+            for child in folder.subfolders:
+                if prune is None or not prune(child):
+                    queue.append((child, depth + 1))
+    
+    # Path of a folder below this one, joined from the names up to here.
+    # Unlike get_path it caches nothing, so printing a whole deep tree
+    # doesn't leave a path string on every node
+    def _path_below(self, folder, base_path):
+        names = []
+        while folder is not self:
+            names.append(folder.name)
+            folder = folder.parent
+        names.append(base_path)
+        return "/".join(reversed(names))
     
     # Preorder traversal (Root -> Left -> Right)
     def preorder_traversal(self, visit_func=None):
         if visit_func:
-            visit_func(self)
-        else:
-            print(f"Visiting: {self.get_path()}")
-        
-        for subfolder in self.subfolders:
-            subfolder.preorder_traversal(visit_func)
+            for folder in self.iter_preorder():
+                visit_func(folder)
+            return
+        names = [self.get_path()]  # path of the current folder, by name
+        for folder, depth in self._iter_preorder_depth():
+            if depth:
+                del names[depth:]
+                names.append(folder.name)
+            print(f"Visiting: {'/'.join(names)}")
     
     # Postorder traversal (Left -> Right -> Root)
     def postorder_traversal(self, visit_func=None):
-        for subfolder in self.subfolders:
-            subfolder.postorder_traversal(visit_func)
-        
-        if visit_func:
-            visit_func(self)
-        else:
-            print(f"Visiting: {self.get_path()}")
+        base_path = self.get_path()
+        for folder in self.iter_postorder():
+            if visit_func:
+                visit_func(folder)
+            else:
+                print(f"Visiting: {self._path_below(folder, base_path)}")
     
     # Level-order traversal (BFS)
     def level_order_traversal(self):
-        queue = [self]
-        while queue:
-            current = queue.pop(0)
-            print(f"Level {self._get_depth(current)}: {current.get_path()}")
-            queue.extend(current.subfolders)
-    
-    def _get_depth(self, node):
-        depth = 0
-        while node.parent:
-            depth += 1
-            node = node.parent
-        return depth
+        base = self.get_depth()
+        base_path = self.get_path()
+        for folder, depth in self.iter_level_order():
+            print(f"Level {base + depth}: {self._path_below(folder, base_path)}")
     
     # Print the folder hierarchy with files
     def print_hierarchy(self, indent="", show_files=True):
-        print(f"{indent}📁 {self.name}")
-        
-        if show_files and self.files:
-            for file in self.files:
-                print(f"{indent}    📄 {file}")
-        
-        for sub in self.subfolders:
-            sub.print_hierarchy(indent + "    ", show_files)
+        for folder, depth in self._iter_preorder_depth():
+            folder_indent = indent + "    " * depth
+            print(f"{folder_indent}📁 {folder.name}")
+            
+            if show_files and folder.files:
+                for file in folder.files:
+                    print(f"{folder_indent}    📄 {file}")
     
-    # Count total folders and files
+    # Total folders, files and bytes in this subtree (kept up to date, O(1))
     def get_statistics(self):
-        folder_count = 1  # Count self
-        file_count = len(self.files)
-        
-        for subfolder in self.subfolders:
-            sub_stats = subfolder.get_statistics()
-            folder_count += sub_stats['folders']
-            file_count += sub_stats['files']
-        
-        return {'folders': folder_count, 'files': file_count}
+        return {'folders': self.total_folders, 'files': self.total_files,
+                'bytes': self.total_bytes}
+    
+    # Recount every subtree and compare with the stored totals; returns
+    # the paths whose totals disagree (empty when consistent)
+    def check_statistics(self):
+        errors = []
+        counted = {}  # node -> [folders, files, bytes]
+        for node in self.iter_postorder():
+            totals = [1, len(node.files), sum(node._sizes.values())]
+            for child in node.subfolders:
+                child_totals = counted.pop(child)
+                for i in range(3):
+                    totals[i] += child_totals[i]
+            counted[node] = totals
+            if totals != [node.total_folders, node.total_files, node.total_bytes]:
+                errors.append(node.get_path())
+        return errors
     
     # Search for files containing a pattern
     def search_files(self, pattern):
-        results = []
-        
-        # Search in current folder
-        for file in self.files:
-            if pattern.lower() in file.lower():
-                results.append({
-                    'file': file,
-                    'path': self.get_path(),
-                    'full_path': f"{self.get_path()}/{file}"
-                })
-        
-        # Search in subfolders
-        for subfolder in self.subfolders:
-            results.extend(subfolder.search_files(pattern))
-        
-        return results
+        return list(self.iter_search_files(pattern))
+    
+    # Yield matches one at a time, folders in preorder. Paths are joined
+    # from the names on the traversal stack, so none is cached on a node
+    def iter_search_files(self, pattern, prune=None):
+        pattern = pattern.lower()
+        names = [self.get_path()]  # path of the current folder, by name
+        for folder, depth in self._iter_preorder_depth(prune):
+            if depth:
+                del names[depth:]
+                names.append(folder.name)
+            path = None
+            for file in folder.files:
+                if pattern in file.lower():
+                    if path is None:
+                        path = "/".join(names)
+                    yield {
+                        'file': file,
+                        'path': path,
+                        'full_path': f"{path}/{file}"
+                    }
 
 # File System Manager Class
 class FileSystemTree:
@@ -138,11 +317,7 @@ class FileSystemTree:
         current = self.root
         
         for folder_name in folders:
-            existing = None
-            for subfolder in current.subfolders:
-                if subfolder.name == folder_name:
-                    existing = subfolder
-                    break
+            existing = current.get_subfolder(folder_name)
             
             if existing:
                 current = existing
@@ -161,13 +336,8 @@ class FileSystemTree:
         
         for folder_name in folders:
             if folder_name:  # Skip empty strings
-                found = False
-                for subfolder in current.subfolders:
-                    if subfolder.name == folder_name:
-                        current = subfolder
-                        found = True
-                        break
-                if not found:
+                current = current.get_subfolder(folder_name)
+                if current is None:
                     return None
         
         return current